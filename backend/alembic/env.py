@@ -0,0 +1,59 @@
+"""
+Alembic environment
+Runs migrations against the engine from app.db.base, or against a connection
+handed in by app.db.migrations.upgrade_database()
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.db.base import Base, engine
+from app.db import models  # noqa: F401 - register all tables on Base.metadata
+
+config = context.config
+
+# Only configure logging when invoked from the alembic CLI, so the app's
+# logging setup is left alone when migrations run on startup
+connection = config.attributes.get("connection")
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit SQL to stdout instead of executing it"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(conn) -> None:
+    context.configure(
+        connection=conn,
+        target_metadata=target_metadata,
+        # SQLite can't ALTER most constraints in place; batch mode recreates the table
+        render_as_batch=conn.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    if connection is not None:
+        _run(connection)
+        return
+    with engine.connect() as conn:
+        _run(conn)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
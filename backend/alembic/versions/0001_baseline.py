@@ -0,0 +1,113 @@
+"""Baseline schema as created by Base.metadata.create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "states",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("code", sa.String(2), nullable=False, unique=True),
+        sa.Column("created_at", sa.Date()),
+        sa.Column("updated_at", sa.Date()),
+    )
+    op.create_index("ix_states_id", "states", ["id"])
+    op.create_index("ix_states_name", "states", ["name"], unique=True)
+
+    op.create_table(
+        "districts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("code", sa.String(10), nullable=True),
+        sa.Column("state_id", sa.Integer(), sa.ForeignKey("states.id"), nullable=False),
+        sa.Column("centroid_lat", sa.Float(), nullable=True),
+        sa.Column("centroid_lon", sa.Float(), nullable=True),
+        sa.Column("boundary", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.Date()),
+        sa.Column("updated_at", sa.Date()),
+    )
+    op.create_index("ix_districts_id", "districts", ["id"])
+    op.create_index("ix_districts_name", "districts", ["name"])
+    op.create_index("ix_districts_code", "districts", ["code"])
+
+    op.create_table(
+        "monthly_metrics",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("district_id", sa.Integer(), sa.ForeignKey("districts.id"), nullable=False),
+        sa.Column("state_id", sa.Integer(), sa.ForeignKey("states.id"), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("total_households", sa.Integer()),
+        sa.Column("sc_households", sa.Integer()),
+        sa.Column("st_households", sa.Integer()),
+        sa.Column("women_households", sa.Integer()),
+        sa.Column("total_works", sa.Integer()),
+        sa.Column("completed_works", sa.Integer()),
+        sa.Column("in_progress_works", sa.Integer()),
+        sa.Column("total_funds", sa.Float()),
+        sa.Column("funds_utilized", sa.Float()),
+        sa.Column("wage_expenditure", sa.Float()),
+        sa.Column("material_expenditure", sa.Float()),
+        sa.Column("total_person_days", sa.Integer()),
+        sa.Column("sc_person_days", sa.Integer()),
+        sa.Column("st_person_days", sa.Integer()),
+        sa.Column("women_person_days", sa.Integer()),
+        sa.Column("is_latest", sa.Boolean()),
+        sa.Column("source_url", sa.String(500), nullable=True),
+        sa.Column("raw_data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.Date()),
+        sa.Column("updated_at", sa.Date()),
+    )
+    op.create_index("ix_monthly_metrics_id", "monthly_metrics", ["id"])
+
+    op.create_table(
+        "api_cache",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("endpoint", sa.String(200), nullable=False),
+        sa.Column("parameters", sa.JSON(), nullable=False),
+        sa.Column("response", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.Date()),
+        sa.Column("expires_at", sa.Date(), nullable=False),
+    )
+    op.create_index("ix_api_cache_id", "api_cache", ["id"])
+    op.create_index("ix_api_cache_endpoint", "api_cache", ["endpoint"])
+
+    op.create_table(
+        "data_snapshots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("snapshot_date", sa.Date(), nullable=False),
+        sa.Column("state_id", sa.Integer(), sa.ForeignKey("states.id"), nullable=True),
+        sa.Column("district_id", sa.Integer(), sa.ForeignKey("districts.id"), nullable=True),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("data_type", sa.String(50), nullable=False),
+        sa.Column("s3_path", sa.String(500), nullable=True),
+        sa.Column("row_count", sa.Integer()),
+        sa.Column("status", sa.String(20)),
+        sa.Column("error_message", sa.String(500), nullable=True),
+        sa.Column("created_at", sa.Date()),
+        sa.Column("updated_at", sa.Date()),
+    )
+    op.create_index("ix_data_snapshots_id", "data_snapshots", ["id"])
+    op.create_index("ix_data_snapshots_snapshot_date", "data_snapshots", ["snapshot_date"])
+
+
+def downgrade() -> None:
+    op.drop_table("data_snapshots")
+    op.drop_table("api_cache")
+    op.drop_table("monthly_metrics")
+    op.drop_table("districts")
+    op.drop_table("states")
@@ -0,0 +1,56 @@
+"""Add integer period key and composite period indexes to monthly_metrics
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("monthly_metrics", sa.Column("period", sa.Integer(), nullable=True))
+    op.execute("UPDATE monthly_metrics SET period = year * 100 + month")
+
+    # The unique index below would fail on duplicate (district, month) rows that
+    # the old per-row existence check could let through; keep the newest one
+    op.execute(
+        """
+        DELETE FROM monthly_metrics
+        WHERE id NOT IN (
+            SELECT max_id FROM (
+                SELECT MAX(id) AS max_id FROM monthly_metrics
+                GROUP BY district_id, period
+            ) AS keep
+        )
+        """
+    )
+
+    with op.batch_alter_table("monthly_metrics") as batch_op:
+        batch_op.alter_column("period", existing_type=sa.Integer(), nullable=False)
+
+    op.create_index(
+        "ix_monthly_metrics_district_period",
+        "monthly_metrics",
+        ["district_id", "period"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_monthly_metrics_state_period",
+        "monthly_metrics",
+        ["state_id", "period"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_monthly_metrics_state_period", table_name="monthly_metrics")
+    op.drop_index("ix_monthly_metrics_district_period", table_name="monthly_metrics")
+    with op.batch_alter_table("monthly_metrics") as batch_op:
+        batch_op.drop_column("period")
@@ -0,0 +1,61 @@
+"""Add unique (state_id, name) index to districts for the ingestion upsert
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Merge duplicate districts into the oldest row before the index can be
+    # created. Their metrics move across unless the kept district already has
+    # that month, in which case the duplicate's row is dropped.
+    bind = op.get_bind()
+    duplicates = bind.execute(sa.text(
+        """
+        SELECT d.id, keep.id
+        FROM districts d
+        JOIN (
+            SELECT state_id, name, MIN(id) AS id FROM districts
+            GROUP BY state_id, name HAVING COUNT(*) > 1
+        ) AS keep ON keep.state_id = d.state_id AND keep.name = d.name
+        WHERE d.id <> keep.id
+        """
+    )).fetchall()
+    for duplicate_id, keep_id in duplicates:
+        params = {"duplicate_id": duplicate_id, "keep_id": keep_id}
+        bind.execute(sa.text(
+            """
+            DELETE FROM monthly_metrics
+            WHERE district_id = :duplicate_id AND period IN (
+                SELECT period FROM monthly_metrics WHERE district_id = :keep_id
+            )
+            """
+        ), params)
+        bind.execute(sa.text(
+            "UPDATE monthly_metrics SET district_id = :keep_id WHERE district_id = :duplicate_id"
+        ), params)
+        bind.execute(sa.text(
+            "UPDATE data_snapshots SET district_id = :keep_id WHERE district_id = :duplicate_id"
+        ), params)
+        bind.execute(sa.text("DELETE FROM districts WHERE id = :duplicate_id"), params)
+
+    op.create_index(
+        "ix_districts_state_name",
+        "districts",
+        ["state_id", "name"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_districts_state_name", table_name="districts")
@@ -0,0 +1,58 @@
+"""Rebuild api_cache around a hashed key with compressed payloads
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Cached upstream responses are disposable, so the old table (which never
+    # evicted anything) is replaced rather than converted
+    op.drop_index("ix_api_cache_endpoint", table_name="api_cache")
+    op.drop_index("ix_api_cache_id", table_name="api_cache")
+    op.drop_table("api_cache")
+
+    op.create_table(
+        "api_cache",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("cache_key", sa.String(64), nullable=False),
+        sa.Column("endpoint", sa.String(200), nullable=False),
+        sa.Column("parameters", sa.JSON(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("encoding", sa.String(10), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("hits", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_accessed_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_api_cache_id", "api_cache", ["id"])
+    op.create_index("ix_api_cache_cache_key", "api_cache", ["cache_key"], unique=True)
+    op.create_index("ix_api_cache_endpoint", "api_cache", ["endpoint"])
+    op.create_index("ix_api_cache_last_accessed_at", "api_cache", ["last_accessed_at"])
+    op.create_index("ix_api_cache_expires_at", "api_cache", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("api_cache")
+    op.create_table(
+        "api_cache",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("endpoint", sa.String(200), nullable=False),
+        sa.Column("parameters", sa.JSON(), nullable=False),
+        sa.Column("response", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.Date()),
+        sa.Column("expires_at", sa.Date(), nullable=False),
+    )
+    op.create_index("ix_api_cache_id", "api_cache", ["id"])
+    op.create_index("ix_api_cache_endpoint", "api_cache", ["endpoint"])
@@ -0,0 +1,85 @@
+"""Add state and national monthly rollup tables, filled from monthly_metrics
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+COUNT_FIELDS = (
+    "total_households", "sc_households", "st_households", "women_households",
+    "total_works", "completed_works", "in_progress_works",
+    "total_person_days", "sc_person_days", "st_person_days", "women_person_days",
+)
+AMOUNT_FIELDS = ("total_funds", "funds_utilized", "wage_expenditure", "material_expenditure")
+
+
+def metric_columns():
+    return [sa.Column(name, sa.BigInteger()) for name in COUNT_FIELDS] + [
+        sa.Column(name, sa.Float()) for name in AMOUNT_FIELDS
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "state_monthly_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("state_id", sa.Integer(), sa.ForeignKey("states.id"), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("period", sa.Integer(), nullable=False),
+        sa.Column("district_count", sa.Integer(), nullable=False),
+        *metric_columns(),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_state_monthly_rollups_id", "state_monthly_rollups", ["id"])
+    op.create_index(
+        "ix_state_monthly_rollups_state_period", "state_monthly_rollups", ["state_id", "period"], unique=True
+    )
+
+    op.create_table(
+        "national_monthly_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("period", sa.Integer(), nullable=False),
+        sa.Column("state_count", sa.Integer(), nullable=False),
+        sa.Column("district_count", sa.Integer(), nullable=False),
+        *metric_columns(),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_national_monthly_rollups_id", "national_monthly_rollups", ["id"])
+    op.create_index("ix_national_monthly_rollups_period", "national_monthly_rollups", ["period"], unique=True)
+
+    # Fill both from the existing metrics; ingestion keeps them current from here
+    fields = COUNT_FIELDS + AMOUNT_FIELDS
+    columns = ", ".join(fields)
+    sums = ", ".join(f"COALESCE(SUM({name}), 0)" for name in fields)
+    op.execute(
+        f"""
+        INSERT INTO state_monthly_rollups (state_id, year, month, period, district_count, {columns}, updated_at)
+        SELECT state_id, MIN(year), MIN(month), period, COUNT(*), {sums}, CURRENT_TIMESTAMP
+        FROM monthly_metrics GROUP BY state_id, period
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO national_monthly_rollups
+            (year, month, period, state_count, district_count, {columns}, updated_at)
+        SELECT MIN(year), MIN(month), period, COUNT(*), SUM(district_count), {sums}, CURRENT_TIMESTAMP
+        FROM state_monthly_rollups GROUP BY period
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("national_monthly_rollups")
+    op.drop_table("state_monthly_rollups")
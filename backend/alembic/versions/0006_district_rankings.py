@@ -0,0 +1,81 @@
+"""Add district_rankings, filled from monthly_metrics
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Ranked metric -> value expression over monthly_metrics
+METRICS = {
+    "person_days": ("total_person_days", sa.Integer()),
+    "fund_utilization": (
+        "CASE WHEN total_funds > 0 THEN funds_utilized * 100.0 / total_funds END", sa.Float()
+    ),
+    "works_completed": ("completed_works", sa.Integer()),
+}
+SCOPES = {"state": "state_id, period", "national": "period"}
+
+
+def upgrade() -> None:
+    columns = []
+    for name, (_, value_type) in METRICS.items():
+        columns.append(sa.Column(f"{name}_value", value_type, nullable=True))
+        for scope in SCOPES:
+            columns.append(sa.Column(f"{name}_{scope}_rank", sa.Integer(), nullable=True))
+            columns.append(sa.Column(f"{name}_{scope}_count", sa.Integer(), nullable=False))
+    op.create_table(
+        "district_rankings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("district_id", sa.Integer(), sa.ForeignKey("districts.id"), nullable=False),
+        sa.Column("state_id", sa.Integer(), sa.ForeignKey("states.id"), nullable=False),
+        sa.Column("period", sa.Integer(), nullable=False),
+        *columns,
+    )
+    op.create_index("ix_district_rankings_id", "district_rankings", ["id"])
+    op.create_index(
+        "ix_district_rankings_district_period", "district_rankings", ["district_id", "period"], unique=True
+    )
+    for name in METRICS:
+        op.create_index(
+            f"ix_district_rankings_{name}_national", "district_rankings", ["period", f"{name}_national_rank"]
+        )
+        op.create_index(
+            f"ix_district_rankings_{name}_state", "district_rankings", ["state_id", "period", f"{name}_state_rank"]
+        )
+
+    # Same ranking as services/rankings.py: unique positions, ties to the
+    # lower district id, NULL values unranked
+    names = ["district_id", "state_id", "period"]
+    selects = ["district_id", "state_id", "period"]
+    for name, (value, _) in METRICS.items():
+        names.append(f"{name}_value")
+        selects.append(f"{name}_value")
+        for scope, partition in SCOPES.items():
+            names += [f"{name}_{scope}_rank", f"{name}_{scope}_count"]
+            selects += [
+                f"CASE WHEN {name}_value IS NOT NULL THEN ROW_NUMBER() OVER ("
+                f"PARTITION BY {partition}, {name}_value IS NULL "
+                f"ORDER BY {name}_value DESC, district_id) END",
+                f"COUNT({name}_value) OVER (PARTITION BY {partition})",
+            ]
+    values = ", ".join(f"{value} AS {name}_value" for name, (value, _) in METRICS.items())
+    op.execute(
+        f"""
+        INSERT INTO district_rankings ({", ".join(names)})
+        SELECT {", ".join(selects)}
+        FROM (SELECT district_id, state_id, period, {values} FROM monthly_metrics) AS source
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("district_rankings")
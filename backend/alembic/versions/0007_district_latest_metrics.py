@@ -0,0 +1,49 @@
+"""Add district_latest_metrics and make monthly_metrics.is_latest consistent
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "district_latest_metrics",
+        sa.Column("district_id", sa.Integer(), sa.ForeignKey("districts.id"), primary_key=True),
+        sa.Column("state_id", sa.Integer(), sa.ForeignKey("states.id"), nullable=False),
+        sa.Column("period", sa.Integer(), nullable=False),
+        sa.Column("metric_id", sa.Integer(), sa.ForeignKey("monthly_metrics.id"), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    # Same pointers as services/latest_metrics.py
+    op.execute(
+        """
+        INSERT INTO district_latest_metrics (district_id, state_id, period, metric_id, updated_at)
+        SELECT m.district_id, m.state_id, m.period, m.id, CURRENT_TIMESTAMP
+        FROM monthly_metrics AS m
+        JOIN (
+            SELECT district_id, MAX(period) AS period FROM monthly_metrics GROUP BY district_id
+        ) AS newest ON newest.district_id = m.district_id AND newest.period = m.period
+        """
+    )
+    op.execute(
+        """
+        UPDATE monthly_metrics SET is_latest = (
+            id IN (SELECT metric_id FROM district_latest_metrics)
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("district_latest_metrics")
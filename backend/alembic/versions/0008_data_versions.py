@@ -0,0 +1,67 @@
+"""Add data_versions, seeded from the latest monthly_metrics update of each tag's data
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from datetime import date, datetime, time
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def _as_datetime(value) -> datetime:
+    # monthly_metrics.updated_at is a Date; tags without metrics get the migration time
+    return datetime.combine(value, time.min) if isinstance(value, date) else datetime.utcnow()
+
+
+def upgrade() -> None:
+    data_versions = op.create_table(
+        "data_versions",
+        sa.Column("tag", sa.String(100), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+    # Every tag starts at version 1, last modified when its metrics were
+    bind = op.get_bind()
+    states = sa.table("states", sa.column("id", sa.Integer()))
+    districts = sa.table("districts", sa.column("id", sa.Integer()), sa.column("state_id", sa.Integer()))
+    metrics = sa.table(
+        "monthly_metrics",
+        sa.column("district_id", sa.Integer()),
+        sa.column("state_id", sa.Integer()),
+        sa.column("updated_at", sa.Date()),
+    )
+    district_rows = bind.execute(
+        sa.select(districts.c.id, sa.func.max(metrics.c.updated_at))
+        .select_from(districts.outerjoin(metrics, metrics.c.district_id == districts.c.id))
+        .group_by(districts.c.id)
+    ).all()
+    state_rows = bind.execute(
+        sa.select(states.c.id, sa.func.max(metrics.c.updated_at))
+        .select_from(states.outerjoin(metrics, metrics.c.state_id == states.c.id))
+        .group_by(states.c.id)
+    ).all()
+    latest = bind.execute(sa.select(sa.func.max(metrics.c.updated_at))).scalar()
+
+    rows = [{"tag": tag, "updated_at": latest} for tag in ("states", "rankings", "rollups:national")]
+    for state_id, updated_at in state_rows:
+        rows.append({"tag": f"state:{state_id}", "updated_at": updated_at})
+        rows.append({"tag": f"rollups:state:{state_id}", "updated_at": updated_at})
+    rows.extend({"tag": f"district:{district_id}", "updated_at": updated_at} for district_id, updated_at in district_rows)
+    op.bulk_insert(data_versions, [
+        {"tag": row["tag"], "version": 1, "updated_at": _as_datetime(row["updated_at"])}
+        for row in rows
+    ])
+
+
+def downgrade() -> None:
+    op.drop_table("data_versions")
@@ -0,0 +1,46 @@
+"""Seed the per-month and latest-month ranking tags of data_versions from the rankings tag
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+data_versions = sa.table(
+    "data_versions",
+    sa.column("tag", sa.String(100)),
+    sa.column("version", sa.BigInteger()),
+    sa.column("updated_at", sa.DateTime()),
+)
+
+
+def upgrade() -> None:
+    # District responses now carry rankings:<period> / rankings:latest rather
+    # than rankings; they start out last modified when rankings was
+    bind = op.get_bind()
+    rankings = sa.table("district_rankings", sa.column("period", sa.Integer()))
+    updated_at = bind.execute(
+        sa.select(data_versions.c.updated_at).where(data_versions.c.tag == "rankings")
+    ).scalar() or datetime.utcnow()
+    periods = bind.execute(sa.select(rankings.c.period).distinct()).scalars().all()
+    op.bulk_insert(data_versions, [
+        {"tag": tag, "version": 1, "updated_at": updated_at}
+        for tag in ["rankings:latest", *(f"rankings:{period}" for period in periods)]
+    ])
+
+
+def downgrade() -> None:
+    op.execute(data_versions.delete().where(
+        data_versions.c.tag.like("rankings:%")
+    ))
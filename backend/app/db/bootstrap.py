@@ -0,0 +1,94 @@
+"""
+Database Bootstrap
+One-time schema migration and initial seeding, run from the app's
+lifespan hook. Every worker calls it, but only one does the work at a
+time: the rest wait on a lock and then find nothing left to do.
+
+The lock is a PostgreSQL advisory lock, or an flock()ed file next to the
+database for SQLite.
+"""
+import contextlib
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Engine, make_url
+
+from .base import SessionLocal, engine as default_engine
+from .migrations import upgrade_database
+from .models import State
+
+logger = logging.getLogger(__name__)
+
+# Seed an empty database on startup (disable when data comes from ingestion)
+SEED_ON_STARTUP = os.getenv("SEED_ON_STARTUP", "true").lower() == "true"
+
+# Arbitrary application-wide key for pg_advisory_lock
+ADVISORY_LOCK_KEY = 7_264_301
+
+SCRIPTS_PATH = Path(__file__).resolve().parents[2] / "scripts"
+
+
+@contextlib.contextmanager
+def bootstrap_lock(engine: Engine = default_engine) -> Iterator[None]:
+    """Hold a cross-process lock for the duration of the bootstrap"""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        return
+
+    database = make_url(str(engine.url)).database
+    try:
+        import fcntl
+    except ImportError:  # Windows: single-worker development only
+        fcntl = None
+    if engine.dialect.name != "sqlite" or not database or database == ":memory:" or fcntl is None:
+        yield
+        return
+
+    with open(f"{database}.bootstrap.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def seed_database() -> None:
+    """Run scripts/seed_data.py; imported lazily as only an empty database needs it"""
+    if str(SCRIPTS_PATH) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_PATH))
+    from seed_data import main as seed_main
+    seed_main()
+
+
+def bootstrap_database(engine: Engine = default_engine, seed: bool = SEED_ON_STARTUP) -> Dict[str, Any]:
+    """Migrate the schema and seed an empty database, once across all workers"""
+    started = time.perf_counter()
+    with bootstrap_lock(engine):
+        waited = time.perf_counter() - started
+        upgrade_database(engine)
+
+        seeded = False
+        if seed:
+            with SessionLocal() as db:
+                state_count = db.execute(select(func.count(State.id))).scalar()
+            if state_count == 0:
+                logger.info("No data found. Running initial seed...")
+                seed_database()
+                seeded = True
+                logger.info("Initial data seeded successfully!")
+            else:
+                logger.info(f"Database already has {state_count} states")
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Database bootstrap finished in {elapsed:.2f}s (waited {waited:.2f}s for lock)")
+    return {"seconds": round(elapsed, 3), "lock_wait_seconds": round(waited, 3), "seeded": seeded}
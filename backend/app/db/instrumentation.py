@@ -0,0 +1,236 @@
+"""
+Database Instrumentation
+Per-request / per-job SQL accounting, slow-query logging and N+1
+detection, plus Prometheus metrics for queries and connection pools.
+
+Every statement run through an instrumented engine is timed. While a
+request or job is being tracked (see track_queries), its statements are
+also added to that context's QueryStats: count, total time, and how often
+each statement shape (the SQL with IN / VALUES lists collapsed) ran. A
+shape repeated N_PLUS_ONE_THRESHOLD times or more in one context is logged
+as an N+1 suspect. Statements slower than SLOW_QUERY_MS are logged with
+their parameters and, for SELECTs, the EXPLAIN plan.
+InstrumentedAsyncQueuePool records how long callers waited to check a
+connection out of the pool.
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter as ShapeCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Iterator, List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+logger = logging.getLogger(__name__)
+
+# Statements at least this slow are logged (0 disables)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+# Include the EXPLAIN plan of slow SELECTs (runs one extra statement)
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+# Runs of one statement shape within a request / job that flag an N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+# Add X-DB-Queries / X-DB-Time-Ms / Server-Timing headers to API responses
+QUERY_DEBUG_HEADER = os.getenv("QUERY_DEBUG_HEADER", "false").lower() == "true"
+
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the API engine's pool",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+SLOW_QUERIES = Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS", ["engine"])
+N_PLUS_ONE_SUSPECTS = Counter(
+    "db_n_plus_one_suspects_total",
+    "Statement shapes repeated N_PLUS_ONE_THRESHOLD+ times in one request / job",
+    ["context"],
+)
+
+# A parenthesised list of bind placeholders in any DBAPI paramstyle
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+EXPLAIN_PREFIX = {"postgresql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN "}
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """Statement with IN lists and multi-row VALUES collapsed, so batches of any size match"""
+    shape = _PLACEHOLDER_LIST.sub("(...)", statement)
+    return " ".join(_REPEATED_LISTS.sub("(...)", shape).split())
+
+
+@dataclass
+class QueryStats:
+    """Statements run while handling one request or job"""
+    label: str = ""
+    count: int = 0
+    seconds: float = 0.0
+    shapes: ShapeCounter = field(default_factory=ShapeCounter)
+
+    def n_plus_one_suspects(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """(shape, runs) for statement shapes run at least `threshold` times"""
+        return [(shape, runs) for shape, runs in self.shapes.most_common() if runs >= threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries(label: str = "") -> Iterator[QueryStats]:
+    """
+    Collect the statements run in this context (including tasks and
+    to_thread calls it starts), then report N+1 suspects. `label` names the
+    route or job in logs and metrics, so keep it low-cardinality.
+    """
+    stats = QueryStats(label)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        report_n_plus_one(stats)
+
+
+def report_n_plus_one(stats: QueryStats) -> None:
+    if N_PLUS_ONE_THRESHOLD <= 0:
+        return
+    for shape, runs in stats.n_plus_one_suspects():
+        N_PLUS_ONE_SUSPECTS.labels(context=stats.label or "untracked").inc()
+        logger.warning(
+            f"Possible N+1 in {stats.label or 'untracked context'}: statement ran {runs} times "
+            f"({stats.count} statements total): {shape[:500]}"
+        )
+
+
+def _truncate(value: Any, limit: int = 500) -> str:
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def explain(conn: Any, statement: str, parameters: Any) -> Optional[str]:
+    """
+    Query plan for a SELECT, run on the statement's own connection through a
+    raw cursor (so it isn't instrumented itself). On PostgreSQL it runs in a
+    savepoint so a failure can't abort the surrounding transaction.
+    """
+    prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    postgres = conn.dialect.name == "postgresql"
+    cursor = conn.connection.cursor()
+    try:
+        if postgres:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as e:
+            if postgres:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return f"(EXPLAIN failed: {e})"
+        if postgres:
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        # PostgreSQL: one text column; SQLite: (id, parent, notused, detail)
+        return "\n".join(f"    {row[-1]}" for row in rows)
+    finally:
+        cursor.close()
+
+
+def log_slow_query(conn: Any, statement: str, parameters: Any, executemany: bool,
+                   elapsed: float, engine_name: str) -> None:
+    SLOW_QUERIES.labels(engine=engine_name).inc()
+    stats = _current_stats.get()
+    where = f" in {stats.label}" if stats is not None and stats.label else ""
+    message = (
+        f"Slow query ({elapsed * 1000:.1f} ms{where}): {' '.join(statement.split())}\n"
+        f"  parameters: {_truncate(parameters)}"
+    )
+    if SLOW_QUERY_EXPLAIN and not executemany:
+        plan = explain(conn, statement, parameters)
+        if plan:
+            message += f"\n  plan:\n{plan}"
+    logger.warning(message)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Time every statement executed through engine and feed the current QueryStats"""
+    histogram = QUERY_DURATION.labels(engine=name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        histogram.observe(elapsed)
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+            stats.shapes[statement_shape(statement)] += 1
+        if SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS:
+            try:
+                log_slow_query(conn, statement, parameters, executemany, elapsed, name)
+            except Exception as e:
+                logger.warning(f"Could not log slow query: {e}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # after_cursor_execute doesn't run for failed statements
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait times"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+class PoolCollector:
+    """Reports a pool's current usage at scrape time"""
+
+    def __init__(self, pool: Pool, name: str):
+        self.pool = pool
+        self.name = name
+
+    def collect(self):
+        gauges = {
+            "db_pool_size": ("Configured pool size", "size"),
+            "db_pool_checked_out": ("Connections currently checked out", "checkedout"),
+            # The pool's counter starts at -size; report only real overflow
+            "db_pool_overflow": ("Connections open beyond the pool size", "overflow"),
+        }
+        for metric, (documentation, method) in gauges.items():
+            reader = getattr(self.pool, method, None)
+            if reader is None:
+                continue
+            gauge = GaugeMetricFamily(metric, documentation, labels=["engine"])
+            gauge.add_metric([self.name], max(0, reader()))
+            yield gauge
@@ -0,0 +1,49 @@
+"""
+Schema migrations
+Brings any database (fresh, created by create_all before Alembic was
+introduced, or already Alembic-managed) up to the latest revision
+"""
+import logging
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from .base import Base, engine as default_engine
+from . import models  # noqa: F401 - register all tables on Base.metadata
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# Revision matching the schema that Base.metadata.create_all produced before
+# migrations existed
+BASELINE_REVISION = "0001"
+
+def get_alembic_config() -> Config:
+    """Alembic config that works regardless of the current working directory"""
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return config
+
+def upgrade_database(engine: Engine = default_engine) -> None:
+    """Create or migrate the schema to the latest revision"""
+    config = get_alembic_config()
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        tables = set(inspect(conn).get_table_names())
+
+        if "alembic_version" not in tables:
+            if "states" not in tables:
+                # Empty database: build the current schema directly
+                logger.info("Creating database schema")
+                Base.metadata.create_all(bind=conn)
+                command.stamp(config, "head")
+                return
+            # Tables from the pre-Alembic create_all era
+            logger.info("Stamping existing database at baseline revision %s", BASELINE_REVISION)
+            command.stamp(config, BASELINE_REVISION)
+
+        command.upgrade(config, "head")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, JSON, BigInteger, Boolean, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, JSON, BigInteger, Boolean, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from .base import Base
 from datetime import datetime
@@ -6,6 +6,22 @@ from datetime import datetime
 # Use JSON for SQLite compatibility (instead of JSONB)
 JSONType = JSON
 
+def period_key(year: int, month: int) -> int:
+    """Integer period key (YYYYMM) used for indexed range scans"""
+    return year * 100 + month
+
+# Metric columns of monthly_metrics, also summed into the rollup tables
+METRIC_FIELDS = (
+    "total_households", "sc_households", "st_households", "women_households",
+    "total_works", "completed_works", "in_progress_works",
+    "total_funds", "funds_utilized", "wage_expenditure", "material_expenditure",
+    "total_person_days", "sc_person_days", "st_person_days", "women_person_days",
+)
+
+def _default_period(context):
+    params = context.get_current_parameters()
+    return period_key(params["year"], params["month"])
+
 class State(Base):
     __tablename__ = "states"
     
@@ -35,6 +51,11 @@ class District(Base):
     # Relationships
     state = relationship("State", back_populates="districts")
     metrics = relationship("MonthlyMetric", back_populates="district")
+    
+    # Natural key used by the ingestion upsert
+    __table_args__ = (
+        Index("ix_districts_state_name", "state_id", "name", unique=True),
+    )
 
 class MonthlyMetric(Base):
     __tablename__ = "monthly_metrics"
@@ -44,6 +65,7 @@ class MonthlyMetric(Base):
     state_id = Column(Integer, ForeignKey("states.id"), nullable=False)
     year = Column(Integer, nullable=False)
     month = Column(Integer, nullable=False)  # 1-12
+    period = Column(Integer, nullable=False, default=_default_period)  # year * 100 + month
     
     # Beneficiary metrics
     total_households = Column(Integer, default=0)
@@ -79,22 +101,163 @@ class MonthlyMetric(Base):
     district = relationship("District", back_populates="metrics")
     state = relationship("State", back_populates="metrics")
     
-    # Composite index for faster lookups
-    # __table_args__ removed for SQLite compatibility
+    # Composite indexes for latest-row and history range scans
+    __table_args__ = (
+        Index("ix_monthly_metrics_district_period", "district_id", "period", unique=True),
+        Index("ix_monthly_metrics_state_period", "state_id", "period"),
+    )
+
+class StateMonthlyRollup(Base):
+    """Monthly metrics summed over a state's districts (see services/rollups.py)"""
+    __tablename__ = "state_monthly_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    state_id = Column(Integer, ForeignKey("states.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    period = Column(Integer, nullable=False)  # year * 100 + month
+    district_count = Column(Integer, nullable=False, default=0)  # Districts reporting that month
+    
+    total_households = Column(BigInteger, default=0)
+    sc_households = Column(BigInteger, default=0)
+    st_households = Column(BigInteger, default=0)
+    women_households = Column(BigInteger, default=0)
+    total_works = Column(BigInteger, default=0)
+    completed_works = Column(BigInteger, default=0)
+    in_progress_works = Column(BigInteger, default=0)
+    total_funds = Column(Float, default=0.0)
+    funds_utilized = Column(Float, default=0.0)
+    wage_expenditure = Column(Float, default=0.0)
+    material_expenditure = Column(Float, default=0.0)
+    total_person_days = Column(BigInteger, default=0)
+    sc_person_days = Column(BigInteger, default=0)
+    st_person_days = Column(BigInteger, default=0)
+    women_person_days = Column(BigInteger, default=0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_state_monthly_rollups_state_period", "state_id", "period", unique=True),
+    )
+
+class NationalMonthlyRollup(Base):
+    """Monthly metrics summed over every state"""
+    __tablename__ = "national_monthly_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    period = Column(Integer, nullable=False)  # year * 100 + month
+    state_count = Column(Integer, nullable=False, default=0)  # States reporting that month
+    district_count = Column(Integer, nullable=False, default=0)
+    
+    total_households = Column(BigInteger, default=0)
+    sc_households = Column(BigInteger, default=0)
+    st_households = Column(BigInteger, default=0)
+    women_households = Column(BigInteger, default=0)
+    total_works = Column(BigInteger, default=0)
+    completed_works = Column(BigInteger, default=0)
+    in_progress_works = Column(BigInteger, default=0)
+    total_funds = Column(Float, default=0.0)
+    funds_utilized = Column(Float, default=0.0)
+    wage_expenditure = Column(Float, default=0.0)
+    material_expenditure = Column(Float, default=0.0)
+    total_person_days = Column(BigInteger, default=0)
+    sc_person_days = Column(BigInteger, default=0)
+    st_person_days = Column(BigInteger, default=0)
+    women_person_days = Column(BigInteger, default=0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_national_monthly_rollups_period", "period", unique=True),
+    )
+
+class DistrictRanking(Base):
+    """
+    A district's rank within its state and nationally for one month, per
+    ranked metric (see services/rankings.py). Ranks are unique positions
+    (ties broken by district id), so leaderboards are index range scans.
+    """
+    __tablename__ = "district_rankings"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    district_id = Column(Integer, ForeignKey("districts.id"), nullable=False)
+    state_id = Column(Integer, ForeignKey("states.id"), nullable=False)
+    period = Column(Integer, nullable=False)  # year * 100 + month
+    
+    # Person days (total_person_days)
+    person_days_value = Column(Integer, nullable=True)
+    person_days_state_rank = Column(Integer, nullable=True)
+    person_days_state_count = Column(Integer, nullable=False, default=0)
+    person_days_national_rank = Column(Integer, nullable=True)
+    person_days_national_count = Column(Integer, nullable=False, default=0)
+    
+    # Fund utilization (funds_utilized as % of total_funds)
+    fund_utilization_value = Column(Float, nullable=True)
+    fund_utilization_state_rank = Column(Integer, nullable=True)
+    fund_utilization_state_count = Column(Integer, nullable=False, default=0)
+    fund_utilization_national_rank = Column(Integer, nullable=True)
+    fund_utilization_national_count = Column(Integer, nullable=False, default=0)
+    
+    # Works completed (completed_works)
+    works_completed_value = Column(Integer, nullable=True)
+    works_completed_state_rank = Column(Integer, nullable=True)
+    works_completed_state_count = Column(Integer, nullable=False, default=0)
+    works_completed_national_rank = Column(Integer, nullable=True)
+    works_completed_national_count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index("ix_district_rankings_district_period", "district_id", "period", unique=True),
+        Index("ix_district_rankings_person_days_national", "period", "person_days_national_rank"),
+        Index("ix_district_rankings_person_days_state", "state_id", "period", "person_days_state_rank"),
+        Index("ix_district_rankings_fund_utilization_national", "period", "fund_utilization_national_rank"),
+        Index("ix_district_rankings_fund_utilization_state", "state_id", "period", "fund_utilization_state_rank"),
+        Index("ix_district_rankings_works_completed_national", "period", "works_completed_national_rank"),
+        Index("ix_district_rankings_works_completed_state", "state_id", "period", "works_completed_state_rank"),
+    )
+
+class DistrictLatestMetric(Base):
+    """
+    Pointer to each district's latest monthly_metrics row, kept in step by
+    the ingestion upsert (see services/latest_metrics.py), so "latest"
+    reads are primary-key lookups
+    """
+    __tablename__ = "district_latest_metrics"
+    
+    district_id = Column(Integer, ForeignKey("districts.id"), primary_key=True)
+    state_id = Column(Integer, ForeignKey("states.id"), nullable=False)
+    period = Column(Integer, nullable=False)  # year * 100 + month
+    metric_id = Column(Integer, ForeignKey("monthly_metrics.id"), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DataVersion(Base):
+    """
+    Version of one response-cache tag (e.g. district:12), bumped in the
+    transaction that changes its data; HTTP ETags are derived from it
+    (see services/data_versions.py)
+    """
+    __tablename__ = "data_versions"
+    
+    tag = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 class APICache(Base):
     """For caching API responses to reduce load on data.gov.in"""
     __tablename__ = "api_cache"
     
     id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)  # sha256 of endpoint + canonical parameters
     endpoint = Column(String(200), nullable=False, index=True)
-    parameters = Column(JSONType, nullable=False)  # JSON-serialized request parameters
-    response = Column(JSONType, nullable=False)    # JSON response
-    created_at = Column(Date, default=datetime.utcnow)
-    expires_at = Column(Date, nullable=False)   # When this cache entry should expire
-    
-    # Index for faster lookups
-    # __table_args__ removed for SQLite compatibility
+    parameters = Column(JSONType, nullable=False)  # Request parameters, kept for inspection
+    payload = Column(LargeBinary, nullable=False)  # Compressed JSON response
+    encoding = Column(String(10), nullable=False)  # Compression codec: 'zstd' or 'gzip'
+    size_bytes = Column(Integer, nullable=False, default=0)  # Compressed payload size
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)   # When this cache entry should expire
 
 class DataSnapshot(Base):
     """For storing raw data snapshots from data.gov.in"""
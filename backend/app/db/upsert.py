@@ -0,0 +1,361 @@
+"""
+Bulk Upsert
+Batched INSERT ... ON CONFLICT DO UPDATE for PostgreSQL and SQLite, used by
+the ingestion write path instead of a SELECT / add / commit per row.
+
+Each batch is written by one cached statement (executed as multi-row
+INSERTs) in its own transaction. Conflicting rows are
+only rewritten when a compared column actually differs, so re-ingesting
+unchanged data causes no writes. The rows a batch wrote come back through
+RETURNING, and a single key lookup before the write tells inserts apart
+from updates. An on_write hook can make dependent writes (e.g. derived
+pointers) in the same transaction, before the batch commits. On PostgreSQL, large batches can instead be streamed with
+COPY into a temporary staging table and merged from there.
+
+bulk_insert is the fast path for loading rows that can't conflict (e.g. a
+fresh seed): no key lookup, conflict clause or RETURNING, and no per-row
+statement processing in SQLAlchemy.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+from operator import itemgetter
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import JSON, Column, MetaData, Table, Text, cast, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Rows per batch / transaction; capped further by the bind-parameter limit
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "1000"))
+# Use COPY into a staging table on PostgreSQL
+UPSERT_USE_COPY = os.getenv("UPSERT_USE_COPY", "false").lower() == "true"
+
+# Bind parameters allowed in one statement
+MAX_BIND_PARAMS = {
+    "postgresql": 65535,
+    "sqlite": 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999,
+}
+
+# Filled in when the caller doesn't supply them
+TIMESTAMP_COLUMNS = ("created_at", "updated_at")
+
+# Called with the session and the conflict keys a batch wrote, before it commits
+WriteHook = Callable[[Session, List[Tuple[Any, ...]]], None]
+
+
+@dataclass
+class UpsertResult:
+    """Row counts for one batch, or summed over several"""
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    batches: int = 0
+
+    @property
+    def written(self) -> int:
+        return self.inserted + self.updated
+
+    def __iadd__(self, other: "UpsertResult") -> "UpsertResult":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.batches += other.batches
+        return self
+
+
+def _insert_for(dialect: str):
+    if dialect == "postgresql":
+        return pg_insert
+    if dialect == "sqlite":
+        return sqlite_insert
+    raise NotImplementedError(f"Bulk upsert is not supported on {dialect}")
+
+
+def _comparable(column: Any, col_type: Any) -> Any:
+    # PostgreSQL json has no equality operator; compare the serialized text
+    return cast(column, Text) if isinstance(col_type, JSON) else column
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BulkUpserter:
+    """Upserts row dicts into one table, keyed on a unique column set"""
+
+    def __init__(
+        self,
+        db: Session,
+        table: Any,
+        conflict_columns: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+        batch_size: int = UPSERT_BATCH_SIZE,
+        use_copy: bool = UPSERT_USE_COPY,
+        on_write: Optional[WriteHook] = None,
+    ):
+        """
+        table: ORM model or Core Table. conflict_columns must be covered by a
+        unique index. update_columns defaults to every supplied column that
+        isn't part of the key or a timestamp. on_write runs in each batch's
+        transaction when the batch wrote any rows.
+        """
+        self.db = db
+        self.table: Table = getattr(table, "__table__", table)
+        self.conflict_columns = list(conflict_columns)
+        self.update_columns = list(update_columns) if update_columns is not None else None
+        self.batch_size = max(1, batch_size)
+        self.dialect = db.get_bind().dialect.name
+        self.use_copy = use_copy and self.dialect == "postgresql"
+        self.on_write = on_write
+        self._insert = _insert_for(self.dialect)
+
+    def upsert(self, rows: Iterable[Dict[str, Any]]) -> UpsertResult:
+        """Write rows in batches, committing after each; returns the totals"""
+        total = UpsertResult()
+        batch_size = None
+        for batch in _batches(rows, self.batch_size):
+            batch = self._prepare(batch)
+            if batch_size is None:
+                limit = MAX_BIND_PARAMS.get(self.dialect, 999) // len(batch[0])
+                batch_size = max(1, min(self.batch_size, limit))
+            for start in range(0, len(batch), batch_size):
+                total += self._write_batch(batch[start:start + batch_size])
+        return total
+
+    def _prepare(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop in-batch duplicate keys (last wins) and fill defaults so every row has the same columns"""
+        unique: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for row in batch:
+            unique[tuple(row[name] for name in self.conflict_columns)] = row
+        now = datetime.utcnow()
+        names = set().union(*unique.values())
+        prepared = []
+        for row in unique.values():
+            row = dict(row)
+            for name in names.difference(row):
+                default = self.table.c[name].default
+                row[name] = default.arg if default is not None and default.is_scalar else None
+            for name in TIMESTAMP_COLUMNS:
+                if name in self.table.c and name not in row:
+                    row[name] = now
+            prepared.append(row)
+        return prepared
+
+    def _key_clause(self, keys: List[Tuple[Any, ...]]):
+        columns = [self.table.c[name] for name in self.conflict_columns]
+        if len(columns) == 1:
+            return columns[0].in_([key[0] for key in keys])
+        return tuple_(*columns).in_(keys)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> UpsertResult:
+        keys = [tuple(row[name] for name in self.conflict_columns) for row in batch]
+        names = list(batch[0])
+        update_columns = self.update_columns
+        if update_columns is None:
+            update_columns = [
+                name for name in names
+                if name not in self.conflict_columns and name not in TIMESTAMP_COLUMNS
+                and not self.table.c[name].primary_key
+            ]
+        try:
+            existing = set(
+                tuple(row) for row in self.db.execute(
+                    select(*[self.table.c[name] for name in self.conflict_columns])
+                    .where(self._key_clause(keys))
+                )
+            )
+            if self.use_copy:
+                stmt = self._insert(self.table).from_select(names, self._copy_to_staging(names, batch))
+                rows = self.db.execute(self._on_conflict(stmt, update_columns, names))
+            else:
+                # executemany of one cached statement; SQLAlchemy packs it into
+                # multi-row INSERTs and still collects RETURNING rows
+                stmt = self._on_conflict(self._insert(self.table), update_columns, names)
+                rows = self.db.execute(stmt, batch)
+            written = set(tuple(row) for row in rows)
+            if written and self.on_write is not None:
+                self.on_write(self.db, sorted(written))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        result = UpsertResult(
+            inserted=len(written - existing),
+            updated=len(written & existing),
+            unchanged=len(batch) - len(written),
+            batches=1,
+        )
+        logger.info(
+            f"Upserted {len(batch)} rows into {self.table.name}: {result.inserted} inserted, "
+            f"{result.updated} updated, {result.unchanged} unchanged"
+        )
+        return result
+
+    def _on_conflict(self, stmt: Any, update_columns: List[str], names: List[str]) -> Any:
+        returning = [self.table.c[name] for name in self.conflict_columns]
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=self.conflict_columns).returning(*returning)
+        excluded = stmt.excluded
+        changed = or_(*[
+            _comparable(self.table.c[name], self.table.c[name].type).is_distinct_from(
+                _comparable(excluded[name], self.table.c[name].type)
+            )
+            for name in update_columns
+        ])
+        set_ = {name: excluded[name] for name in update_columns}
+        if "updated_at" in self.table.c and "updated_at" in names:
+            set_["updated_at"] = excluded["updated_at"]
+        return stmt.on_conflict_do_update(
+            index_elements=self.conflict_columns, set_=set_, where=changed
+        ).returning(*returning)
+
+    def _copy_to_staging(self, names: List[str], batch: List[Dict[str, Any]]) -> Any:
+        """COPY the batch into a temporary table dropped at commit; returns a SELECT over it"""
+        staging = Table(
+            f"_upsert_{self.table.name}",
+            MetaData(),
+            *[Column(name, self.table.c[name].type) for name in names],
+            prefixes=["TEMPORARY"],
+            postgresql_on_commit="DROP",
+        )
+        connection = self.db.connection()
+        staging.create(connection)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow([_copy_value(row[name]) for name in names])
+        buffer.seek(0)
+        column_list = ", ".join(f'"{name}"' for name in names)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {staging.name} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+        finally:
+            cursor.close()
+        return select(*[staging.c[name] for name in names])
+
+
+def _copy_value(value: Any) -> Any:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def bulk_upsert(
+    db: Session,
+    table: Any,
+    rows: Iterable[Dict[str, Any]],
+    conflict_columns: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+    batch_size: int = UPSERT_BATCH_SIZE,
+    use_copy: bool = UPSERT_USE_COPY,
+    on_write: Optional[WriteHook] = None,
+) -> UpsertResult:
+    """Upsert rows into table in batches of batch_size, one transaction each"""
+    return BulkUpserter(
+        db, table, conflict_columns, update_columns, batch_size=batch_size, use_copy=use_copy,
+        on_write=on_write,
+    ).upsert(rows)
+
+
+def bulk_insert(
+    db: Session,
+    table: Any,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = UPSERT_BATCH_SIZE * 10,
+) -> int:
+    """
+    Plain INSERT of rows into a table known to hold none of them: COPY on
+    PostgreSQL, a DBAPI executemany on SQLite. Every row must have the same
+    keys. Values go through the column types' bind processors so they are
+    stored as ORM writes would store them; missing timestamps are filled
+    in. Commits after each batch and returns the number of rows written.
+    """
+    table = getattr(table, "__table__", table)
+    dialect = db.get_bind().dialect
+    _insert_for(dialect.name)
+    preparer = dialect.identifier_preparer
+
+    def processor(name: str) -> Any:
+        return table.c[name].type.dialect_impl(dialect).bind_processor(dialect)
+
+    names: List[str] = []
+    written = 0
+    for batch in _batches(rows, max(1, batch_size)):
+        if not names:
+            supplied = list(batch[0])
+            stamps = [name for name in TIMESTAMP_COLUMNS if name in table.c and name not in batch[0]]
+            names = supplied + stamps
+            getter = itemgetter(*supplied)
+            converted = [
+                (index, process) for index, process in enumerate(map(processor, supplied))
+                if process is not None
+            ]
+        # Convert column by column, and the shared timestamp only once
+        now = datetime.utcnow()
+        stamp_values = [
+            process(now) if process is not None else now for process in map(processor, stamps)
+        ]
+        values = [list(getter(row)) if len(supplied) > 1 else [getter(row)] for row in batch]
+        for index, process in converted:
+            for row_values in values:
+                if row_values[index] is not None:
+                    row_values[index] = process(row_values[index])
+        if stamp_values:
+            for row_values in values:
+                row_values.extend(stamp_values)
+
+        column_list = ", ".join(preparer.quote(name) for name in names)
+        cursor = db.connection().connection.cursor()
+        try:
+            if dialect.name == "postgresql":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row_values in values:
+                    writer.writerow([_copy_value(value) for value in row_values])
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {preparer.format_table(table)} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                    buffer,
+                )
+            else:
+                placeholders = ", ".join("?" for _ in names)
+                cursor.executemany(
+                    f"INSERT INTO {preparer.format_table(table)} ({column_list}) VALUES ({placeholders})",
+                    values,
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+        written += len(values)
+    logger.info(f"Inserted {written} rows into {table.name}")
+    return written
@@ -1,12 +1,13 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Bundle
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
 from typing import List, Optional
-import os
+import asyncio
 from dotenv import load_dotenv
 import logging
 
@@ -21,33 +22,68 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import database and models
-from .db.base import Base, engine, get_db, SessionLocal
-from .db.models import State, District, MonthlyMetric
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-# Initialize data on startup
-logger.info("Checking database for initial data...")
-db = SessionLocal()
-try:
-    state_count = db.query(State).count()
-    if state_count == 0:
-        logger.info("No data found. Running initial seed...")
-        # Import and run seed function
-        import sys
-        from pathlib import Path
-        scripts_path = Path(__file__).parent.parent / "scripts"
-        sys.path.insert(0, str(scripts_path))
-        from seed_data import main as seed_main
-        seed_main()
-        logger.info("Initial data seeded successfully!")
-    else:
-        logger.info(f"Database already has {state_count} states")
-except Exception as e:
-    logger.error(f"Error checking/seeding database: {e}")
-finally:
-    db.close()
+from .db.base import async_engine, get_db
+from .db.bootstrap import bootstrap_database
+from .db.models import (
+    State, District, MonthlyMetric, StateMonthlyRollup, NationalMonthlyRollup, DistrictRanking,
+    DistrictLatestMetric, METRIC_FIELDS, period_key
+)
+from .services.cache import (
+    response_cache, cache_key, STATES_TAG, NATIONAL_ROLLUP_TAG, RANKINGS_TAG,
+    state_tag, district_tag, state_rollup_tag
+)
+from .services.shared_cache import shared_cache
+from .services.api_cache import api_cache
+from .services.columnar import columnar_store
+from .services.data_versions import data_versions
+from .services.http_cache import REFERENCE_POLICY, conditional_response, http_date, not_modified, validators
+from .services.export import (
+    MEDIA_TYPES, accepts_gzip, export_filename, export_query, format_available, gzip_chunks,
+    parse_period, parse_range, read_range, spool_export, stream_export
+)
+from .services.http_client import close_http_client, upstream_stats
+from .services.spatial_index import get_spatial_index, invalidate_spatial_index
+from .services.metrics import PrometheusMiddleware, StatsCollector, metrics_payload, register_collector
+from .db.instrumentation import PoolCollector
+from .services.rankings import RANK_BLOCK_COLUMNS, leaderboard_entries, leaderboard_query, rank_block, rank_block_tags
+from .services.history import HistorySeries, history_points, history_query, parse_aggregation, series_from_rows
+from .schemas import (
+    BatchLocationRequest, DashboardOut, DashboardSection, DistrictComparison, DistrictMetricsOut,
+    DistrictOut, ExportFormat, HistoryGranularity, HistoryPoint, LeaderboardMode, NationalMetricsOut,
+    RankingMetric, RankingsOut, StateMetricsOut, StateOut
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Migrate / seed the database (once across workers, off the event loop),
+    start background tasks, and tear everything down on shutdown
+    """
+    app.state.ready = False
+    app.state.bootstrap = await asyncio.to_thread(bootstrap_database)
+    
+    # Keep this worker's response cache in step with writes made elsewhere
+    tasks = []
+    if shared_cache.configured:
+        tasks.append(asyncio.create_task(shared_cache.listen(response_cache.invalidate_tags)))
+    # Keep the upstream API cache within its size and age limits
+    tasks.append(asyncio.create_task(api_cache.run_eviction()))
+    # Serve district metrics from memory, reloaded after writes and periodically
+    if columnar_store.enabled:
+        await columnar_store.reload()
+        tasks.append(asyncio.create_task(columnar_store.run_refresh()))
+    
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        for task in tasks:
+            task.cancel()
+        await shared_cache.close()
+        await columnar_store.close()
+        await close_http_client()
+        await async_engine.dispose()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -59,7 +95,9 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -71,260 +109,647 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files (commented out - directories don't exist yet)
+# Per-route request metrics for /metrics
+app.add_middleware(PrometheusMiddleware)
+
+# Cache / upstream / pool stats, read when /metrics is scraped
+register_collector(StatsCollector({
+    "response": response_cache.stats,
+    "shared": shared_cache.stats,
+    "api": api_cache.stats,
+    "upstream": upstream_stats,
+}))
+register_collector(PoolCollector(async_engine.sync_engine.pool, "api"))
+
+# Rebuild the spatial index whenever district lists are invalidated
+response_cache.add_listener(invalidate_spatial_index)
+# Stop serving the columnar store after any write until it has been reloaded
+response_cache.add_listener(columnar_store.on_invalidate)
+# Re-read the data versions behind ETags of whatever was invalidated
+response_cache.add_listener(data_versions.invalidate)
+
+# Mount static files (commented out - directories don't exist yet; import
+# fastapi.staticfiles.StaticFiles here when enabling, not at module top)
 # app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Templates (commented out - directory doesn't exist yet)
+# Templates (commented out - directory doesn't exist yet; Jinja2 is only
+# imported when they are enabled)
 # templates = Jinja2Templates(directory="templates")
 
 # API Routes
 @app.get("/api/v1/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check: the process is up and serving"""
     return {"status": "healthy", "version": "1.0.0"}
 
-@app.get("/api/v1/states", response_model=List[dict])
+@app.get("/api/v1/ready")
+async def readiness_check():
+    """Readiness check: bootstrap finished and the database answers"""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error(f"Readiness check failed: {str(e)}")
+        return JSONResponse(status_code=503, content={"status": "unavailable", "database": "error"})
+    return {"status": "ready", "database": "ok", "bootstrap": app.state.bootstrap}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus exposition of request, database, cache and ingestion metrics"""
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
+@app.get("/api/v1/cache/stats")
+async def cache_stats():
+    """Response cache counters for sizing and hit-rate monitoring"""
+    return {
+        **response_cache.stats(),
+        "shared": shared_cache.stats(),
+        "api_cache": api_cache.stats(),
+        "upstream": upstream_stats(),
+        "columnar_store": columnar_store.stats(),
+        "data_versions": data_versions.stats(),
+    }
+
+# Columns read by format_state / format_district
+STATE_COLUMNS = (State.id, State.name, State.code, State.created_at, State.updated_at)
+DISTRICT_COLUMNS = (
+    District.id, District.name, District.code, District.state_id,
+    District.centroid_lat, District.centroid_lon, District.created_at, District.updated_at
+)
+# Columns read by format_district_metrics: the month's metrics and, outer
+# joined, its ranking row (ranking_id is None when the month isn't ranked)
+METRICS_COLUMNS = (
+    MonthlyMetric.district_id, MonthlyMetric.state_id, MonthlyMetric.year, MonthlyMetric.month,
+    MonthlyMetric.period, *(getattr(MonthlyMetric, field) for field in METRIC_FIELDS),
+    MonthlyMetric.is_latest, MonthlyMetric.source_url, MonthlyMetric.updated_at
+)
+RANKING_COLUMNS = (DistrictRanking.id.label("ranking_id"), *RANK_BLOCK_COLUMNS)
+
+class ColumnBundle(Bundle):
+    """
+    Bundle whose rows are read by column name. Plain bundles rename columns
+    another bundle in the same select also has (states.id becomes id_1).
+    """
+    def create_row_processor(self, query, procs, labels):
+        keys = [column.key for column in self.exprs]
+        return lambda row: SimpleNamespace(**dict(zip(keys, (proc(row) for proc in procs))))
+
+def format_state(state) -> dict:
+    """A State, or a row of its columns"""
+    return {
+        "id": state.id,
+        "name": state.name,
+        "code": state.code,
+        "created_at": state.created_at.isoformat() if state.created_at else None,
+        "updated_at": state.updated_at.isoformat() if state.updated_at else None
+    }
+
+def format_district(district) -> dict:
+    """A District, or a row of its columns"""
+    return {
+        "id": district.id,
+        "name": district.name,
+        "code": district.code,
+        "state_id": district.state_id,
+        "centroid": {
+            "lat": district.centroid_lat,
+            "lon": district.centroid_lon
+        } if district.centroid_lat and district.centroid_lon else None,
+        "created_at": district.created_at.isoformat() if district.created_at else None,
+        "updated_at": district.updated_at.isoformat() if district.updated_at else None
+    }
+
+def format_district_metrics(metrics, ranking) -> dict:
+    """A month of district metrics with its rank block (rows from the database or the columnar store)"""
+    return {
+        "district_id": metrics.district_id,
+        "state_id": metrics.state_id,
+        "year": metrics.year,
+        "month": metrics.month,
+        "households": {
+            "total": metrics.total_households,
+            "sc": metrics.sc_households,
+            "st": metrics.st_households,
+            "women": metrics.women_households
+        },
+        "works": {
+            "total": metrics.total_works,
+            "completed": metrics.completed_works,
+            "in_progress": metrics.in_progress_works
+        },
+        "finances": {
+            "total_funds": metrics.total_funds,
+            "funds_utilized": metrics.funds_utilized,
+            "wage_expenditure": metrics.wage_expenditure,
+            "material_expenditure": metrics.material_expenditure
+        },
+        "person_days": {
+            "total": metrics.total_person_days,
+            "sc": metrics.sc_person_days,
+            "st": metrics.st_person_days,
+            "women": metrics.women_person_days
+        },
+        "rank": rank_block(ranking),
+        "metadata": {
+            "is_latest": metrics.is_latest,
+            "source_url": metrics.source_url,
+            "updated_at": metrics.updated_at.isoformat() if metrics.updated_at else None
+        }
+    }
+
+async def load_history_series(db: AsyncSession, district_id: int, years: int) -> HistorySeries:
+    """A district's charted history columns, from the columnar store when it is serving"""
+    store = columnar_store.current()
+    if store is not None:
+        return store.history_series(district_id, years)
+    result = await db.execute(history_query(district_id, years))
+    return series_from_rows(result.all())
+
+@app.get("/api/v1/states", response_model=List[StateOut])
 async def list_states(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     skip: int = 0,
     limit: int = 100
 ):
     """Get list of all states with their basic information"""
+    async def load():
+        # Columns only: rows are formatted without building ORM instances
+        result = await db.execute(select(*STATE_COLUMNS).offset(skip).limit(limit))
+        return [format_state(state) for state in result]
+    
     try:
-        states = db.query(State).offset(skip).limit(limit).all()
-        return [
-            {
-                "id": state.id,
-                "name": state.name,
-                "code": state.code,
-                "created_at": state.created_at.isoformat() if state.created_at else None,
-                "updated_at": state.updated_at.isoformat() if state.updated_at else None
-            }
-            for state in states
-        ]
+        return await conditional_response(
+            request, db,
+            cache_key("states", skip=skip, limit=limit),
+            load,
+            tags=[STATES_TAG],
+            policy=REFERENCE_POLICY
+        )
     except Exception as e:
         logger.error(f"Error fetching states: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/api/v1/districts", response_model=List[dict])
+@app.get("/api/v1/districts", response_model=List[DistrictOut])
 async def list_districts(
+    request: Request,
     state_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     skip: int = 0,
     limit: int = 1000
 ):
     """Get list of districts for a specific state"""
+    async def load():
+        result = await db.execute(
+            select(*DISTRICT_COLUMNS).filter(
+                District.state_id == state_id
+            ).offset(skip).limit(limit)
+        )
+        return [format_district(district) for district in result]
+    
     try:
-        districts = db.query(District).filter(
-            District.state_id == state_id
-        ).offset(skip).limit(limit).all()
-        
-        return [
-            {
-                "id": district.id,
-                "name": district.name,
-                "code": district.code,
-                "state_id": district.state_id,
-                "centroid": {
-                    "lat": district.centroid_lat,
-                    "lon": district.centroid_lon
-                } if district.centroid_lat and district.centroid_lon else None,
-                "created_at": district.created_at.isoformat() if district.created_at else None,
-                "updated_at": district.updated_at.isoformat() if district.updated_at else None
-            }
-            for district in districts
-        ]
+        return await conditional_response(
+            request, db,
+            cache_key("districts", state_id=state_id, skip=skip, limit=limit),
+            load,
+            tags=[state_tag(state_id)],
+            policy=REFERENCE_POLICY
+        )
     except Exception as e:
         logger.error(f"Error fetching districts for state {state_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/api/v1/metrics/district/{district_id}", response_model=dict)
+@app.get("/api/v1/metrics/district/{district_id}", response_model=DistrictMetricsOut)
 async def get_district_metrics(
+    request: Request,
     district_id: int,
     year: Optional[int] = None,
     month: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get MGNREGA metrics for a specific district"""
-    try:
-        query = db.query(MonthlyMetric).filter(
-            MonthlyMetric.district_id == district_id
-        )
-        
-        if year:
-            query = query.filter(MonthlyMetric.year == year)
-        if month:
-            query = query.filter(MonthlyMetric.month == month)
-        
-        metrics = query.order_by(
-            MonthlyMetric.year.desc(),
-            MonthlyMetric.month.desc()
-        ).first()
+    """Get MGNREGA metrics for a specific district, with its state and national ranks"""
+    async def load():
+        store = columnar_store.current()
+        if store is not None:
+            metrics = store.latest(district_id, year, month)
+            row = (metrics, metrics if metrics.has_ranking else None) if metrics else None
+        else:
+            # The month's ranking columns come back with the metrics in one
+            # query, as plain rows (no ORM instances, no raw_data)
+            query = select(*METRICS_COLUMNS, *RANKING_COLUMNS).outerjoin(
+                DistrictRanking,
+                (DistrictRanking.district_id == MonthlyMetric.district_id) &
+                (DistrictRanking.period == MonthlyMetric.period)
+            ).filter(
+                MonthlyMetric.district_id == district_id
+            )
+            
+            # Unfiltered, the latest row is found through its pointer (two
+            # primary-key lookups); year/month become a period range so the
+            # (district_id, period) index answers with one descending range scan
+            if not year and not month:
+                query = query.join(
+                    DistrictLatestMetric, DistrictLatestMetric.metric_id == MonthlyMetric.id
+                ).filter(DistrictLatestMetric.district_id == district_id)
+            elif year and month:
+                query = query.filter(MonthlyMetric.period == period_key(year, month))
+            elif year:
+                query = query.filter(MonthlyMetric.period.between(
+                    period_key(year, 1), period_key(year, 12)
+                ))
+            elif month:
+                query = query.filter(MonthlyMetric.month == month)
+            
+            result = await db.execute(query.order_by(MonthlyMetric.period.desc()).limit(1))
+            metrics = result.first()
+            row = (metrics, metrics if metrics.ranking_id is not None else None) if metrics else None
         
-        if not metrics:
+        if not row:
             raise HTTPException(
                 status_code=404,
                 detail=f"No metrics found for district {district_id}"
             )
+        metrics, ranking = row
         
-        return {
-            "district_id": metrics.district_id,
-            "state_id": metrics.state_id,
-            "year": metrics.year,
-            "month": metrics.month,
-            "households": {
-                "total": metrics.total_households,
-                "sc": metrics.sc_households,
-                "st": metrics.st_households,
-                "women": metrics.women_households
-            },
-            "works": {
-                "total": metrics.total_works,
-                "completed": metrics.completed_works,
-                "in_progress": metrics.in_progress_works
-            },
-            "finances": {
-                "total_funds": metrics.total_funds,
-                "funds_utilized": metrics.funds_utilized,
-                "wage_expenditure": metrics.wage_expenditure,
-                "material_expenditure": metrics.material_expenditure
-            },
-            "person_days": {
-                "total": metrics.total_person_days,
-                "sc": metrics.sc_person_days,
-                "st": metrics.st_person_days,
-                "women": metrics.women_person_days
-            },
-            "metadata": {
-                "is_latest": metrics.is_latest,
-                "source_url": metrics.source_url,
-                "updated_at": metrics.updated_at.isoformat() if metrics.updated_at else None
-            }
-        }
+        return format_district_metrics(metrics, ranking)
+    
+    try:
+        return await conditional_response(
+            request, db,
+            cache_key("district_metrics", district_id=district_id, year=year, month=month),
+            load,
+            tags=[district_tag(district_id), *rank_block_tags(year, month)]
+        )
     except HTTPException as he:
         raise he
     except Exception as e:
         logger.error(f"Error fetching metrics for district {district_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/api/v1/metrics/district/{district_id}/history", response_model=List[dict])
+@app.get("/api/v1/metrics/district/{district_id}/history", response_model=List[HistoryPoint])
 async def get_district_metric_history(
+    request: Request,
     district_id: int,
-    years: int = 2,  # Default to 2 years of history
-    db: Session = Depends(get_db)
+    years: int = Query(2, ge=0, le=50),  # Default to 2 years of history
+    granularity: HistoryGranularity = HistoryGranularity.month,
+    agg: Optional[str] = None,
+    points: Optional[int] = Query(None, ge=3, le=1000),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get historical metrics for a district"""
+    """
+    Historical metrics for a district, by month or summed into fiscal
+    quarters / fiscal years (April-March). `agg` is `sum`, `avg` or
+    per-field pairs like `households:sum` (default: households averaged,
+    the rest summed); `points` downsamples long ranges to at most that
+    many points, keeping the shape of the curves.
+    """
     try:
-        # Get the most recent month's data
-        latest = db.query(MonthlyMetric).filter(
-            MonthlyMetric.district_id == district_id
-        ).order_by(
-            MonthlyMetric.year.desc(),
-            MonthlyMetric.month.desc()
-        ).first()
+        aggregation = parse_aggregation(agg)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    async def load():
+        series = await load_history_series(db, district_id, years)
         
-        if not latest:
+        if not len(series):
             raise HTTPException(
                 status_code=404,
                 detail=f"No metrics found for district {district_id}"
             )
         
-        # Calculate date range
-        from datetime import date
-        from dateutil.relativedelta import relativedelta
+        return history_points(series, granularity.value, aggregation, points)
+    
+    try:
+        return await conditional_response(
+            request, db,
+            cache_key(
+                "district_history", district_id=district_id, years=years,
+                granularity=granularity.value, agg=sorted(f"{name}:{method}" for name, method in aggregation.items()),
+                points=points
+            ),
+            load,
+            tags=[district_tag(district_id)]
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error fetching history for district {district_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/api/v1/dashboard/{district_id}", response_model=DashboardOut, response_model_exclude_unset=True)
+async def get_district_dashboard(
+    request: Request,
+    district_id: int,
+    years: int = Query(1, ge=0, le=50),
+    peers: int = Query(0, ge=0, le=10),
+    fields: Optional[str] = None,  # Comma-separated sections (default: all)
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Everything the district page shows in one response: the district, its
+    state, the latest month's metrics and ranks, `years` of history and, with
+    peers=N, the N districts ranked either side of it on person days within
+    the state. `fields` limits the response (and the queries run) to some of
+    district, state, latest, history and peers.
+    """
+    try:
+        sections = {DashboardSection(name.strip()) for name in fields.split(',') if name.strip()} \
+            if fields else set(DashboardSection)
+    except ValueError:
+        raise HTTPException(
+            status_code=422,
+            detail=f"fields must be a comma-separated subset of {', '.join(s.value for s in DashboardSection)}"
+        )
+    if not peers:
+        sections.discard(DashboardSection.peers)
+    needs_metrics = bool(sections & {DashboardSection.latest, DashboardSection.history, DashboardSection.peers})
+    
+    async def load():
+        store = columnar_store.current() if needs_metrics else None
+        
+        # District, state, latest month and its ranking row in one query,
+        # selecting only the serialized columns (no boundary or raw_data)
+        query = select(
+            ColumnBundle("district", *DISTRICT_COLUMNS), ColumnBundle("state", *STATE_COLUMNS)
+        ).join(
+            State, District.state_id == State.id
+        ).filter(District.id == district_id)
+        if needs_metrics and store is None:
+            query = query.add_columns(
+                ColumnBundle("metrics", *METRICS_COLUMNS), ColumnBundle("ranking", *RANKING_COLUMNS)
+            ).outerjoin(
+                DistrictLatestMetric, DistrictLatestMetric.district_id == District.id
+            ).outerjoin(
+                MonthlyMetric, MonthlyMetric.id == DistrictLatestMetric.metric_id
+            ).outerjoin(
+                DistrictRanking,
+                (DistrictRanking.district_id == MonthlyMetric.district_id) &
+                (DistrictRanking.period == MonthlyMetric.period)
+            )
+        row = (await db.execute(query)).first()
         
-        end_date = date(latest.year, latest.month, 1)
-        start_date = end_date - relativedelta(years=years)
+        if not row:
+            raise HTTPException(status_code=404, detail=f"District {district_id} not found")
         
-        # Get historical data
-        history = db.query(MonthlyMetric).filter(
-            MonthlyMetric.district_id == district_id,
-            (
-                (MonthlyMetric.year > start_date.year) |
-                ((MonthlyMetric.year == start_date.year) & 
-                 (MonthlyMetric.month >= start_date.month))
+        district, state = row[0], row[1]
+        metrics = ranking = None
+        if store is not None:
+            metrics = store.latest(district_id)
+            ranking = metrics if metrics and metrics.has_ranking else None
+        elif needs_metrics:
+            # Outer-joined bundles come back with every column None
+            metrics = row[2] if row[2].district_id is not None else None
+            ranking = row[3] if metrics is not None and row[3].ranking_id is not None else None
+        
+        dashboard = {}
+        if DashboardSection.district in sections:
+            dashboard["district"] = format_district(district)
+        if DashboardSection.state in sections:
+            dashboard["state"] = format_state(state)
+        if DashboardSection.latest in sections:
+            dashboard["latest"] = format_district_metrics(metrics, ranking) if metrics else None
+        if DashboardSection.history in sections:
+            dashboard["history"] = history_points(
+                await load_history_series(db, district_id, years)
+            ) if metrics else []
+        if DashboardSection.peers in sections:
+            rows = []
+            if ranking is not None and ranking.person_days_state_rank is not None:
+                result = await db.execute(leaderboard_query(
+                    "person_days", state_id=state.id, period=metrics.period, mode="around",
+                    limit=peers, district_id=district_id
+                ))
+                rows = result.all()
+            dashboard["peers"] = leaderboard_entries(rows)
+        return dashboard
+    
+    try:
+        # District renames reach cached dashboards by TTL; the state_id isn't
+        # known until the district is loaded
+        return await conditional_response(
+            request, db,
+            cache_key(
+                "dashboard", district_id=district_id, years=years, peers=peers,
+                fields=[section.value for section in sections]
+            ),
+            load,
+            tags=[district_tag(district_id), *rank_block_tags(), STATES_TAG]
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error fetching dashboard for district {district_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def format_rollup(rollup) -> dict:
+    """One month of a state / national rollup, grouped like the district metrics"""
+    return {
+        "year": rollup.year,
+        "month": rollup.month,
+        "district_count": rollup.district_count,
+        "households": {
+            "total": rollup.total_households,
+            "sc": rollup.sc_households,
+            "st": rollup.st_households,
+            "women": rollup.women_households
+        },
+        "works": {
+            "total": rollup.total_works,
+            "completed": rollup.completed_works,
+            "in_progress": rollup.in_progress_works
+        },
+        "finances": {
+            "total_funds": rollup.total_funds,
+            "funds_utilized": rollup.funds_utilized,
+            "wage_expenditure": rollup.wage_expenditure,
+            "material_expenditure": rollup.material_expenditure
+        },
+        "person_days": {
+            "total": rollup.total_person_days,
+            "sc": rollup.sc_person_days,
+            "st": rollup.st_person_days,
+            "women": rollup.women_person_days
+        }
+    }
+
+@app.get("/api/v1/metrics/state/{state_id}", response_model=StateMetricsOut)
+async def get_state_metrics(
+    request: Request,
+    state_id: int,
+    years: int = Query(2, ge=0, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """Latest month and `years` of monthly history for a state, summed over its districts"""
+    async def load():
+        # One range scan on the (state_id, period) index from the month
+        # `years` before the latest one
+        latest_period = select(func.max(StateMonthlyRollup.period)).filter(
+            StateMonthlyRollup.state_id == state_id
+        ).scalar_subquery()
+        result = await db.execute(
+            select(StateMonthlyRollup, State.name, State.code).join(
+                State, StateMonthlyRollup.state_id == State.id
+            ).filter(
+                StateMonthlyRollup.state_id == state_id,
+                StateMonthlyRollup.period >= latest_period - years * 100
+            ).order_by(StateMonthlyRollup.period.asc())
+        )
+        rows = result.all()
+        
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No metrics found for state {state_id}"
             )
-        ).order_by(
-            MonthlyMetric.year.asc(),
-            MonthlyMetric.month.asc()
-        ).all()
         
-        return [
-            {
-                "year": m.year,
-                "month": m.month,
-                "households": m.total_households,
-                "person_days": m.total_person_days,
-                "works_completed": m.completed_works,
-                "funds_utilized": m.funds_utilized
-            }
-            for m in history
+        history = [format_rollup(rollup) for rollup, _, _ in rows]
+        _, state_name, state_code = rows[-1]
+        return {
+            "state_id": state_id,
+            "state_name": state_name,
+            "state_code": state_code,
+            "latest": history[-1],
+            "history": history
+        }
+    
+    try:
+        return await conditional_response(
+            request, db,
+            cache_key("state_metrics", state_id=state_id, years=years),
+            load,
+            tags=[state_rollup_tag(state_id)]
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error fetching metrics for state {state_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/api/v1/metrics/national", response_model=NationalMetricsOut)
+async def get_national_metrics(
+    request: Request,
+    years: int = Query(2, ge=0, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """Latest month and `years` of monthly history summed over every state"""
+    async def load():
+        latest_period = select(func.max(NationalMonthlyRollup.period)).scalar_subquery()
+        result = await db.execute(
+            select(NationalMonthlyRollup).filter(
+                NationalMonthlyRollup.period >= latest_period - years * 100
+            ).order_by(NationalMonthlyRollup.period.asc())
+        )
+        rows = result.scalars().all()
+        
+        if not rows:
+            raise HTTPException(status_code=404, detail="No national metrics found")
+        
+        history = [
+            {**format_rollup(rollup), "state_count": rollup.state_count}
+            for rollup in rows
         ]
+        return {
+            "latest": history[-1],
+            "history": history
+        }
+    
+    try:
+        return await conditional_response(
+            request, db,
+            cache_key("national_metrics", years=years),
+            load,
+            tags=[NATIONAL_ROLLUP_TAG]
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error fetching national metrics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/api/v1/rankings", response_model=RankingsOut)
+async def get_rankings(
+    request: Request,
+    metric: RankingMetric = RankingMetric.person_days,
+    state_id: Optional[int] = None,
+    year: Optional[int] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    mode: LeaderboardMode = LeaderboardMode.top,
+    limit: int = Query(10, ge=1, le=100),
+    district_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    District leaderboard for one month (default: the latest ranked), within
+    a state or nationally: the `limit` best or worst districts, or with
+    mode=around, the `limit` districts either side of district_id
+    """
+    if mode == LeaderboardMode.around and district_id is None:
+        raise HTTPException(status_code=422, detail="mode=around requires district_id")
+    if (year is None) != (month is None):
+        raise HTTPException(status_code=422, detail="year and month must be given together")
+    
+    async def load():
+        period = period_key(year, month) if year else None
+        result = await db.execute(leaderboard_query(
+            metric.value, state_id=state_id, period=period, mode=mode.value,
+            limit=limit, district_id=district_id
+        ))
+        rows = result.all()
+        
+        if not rows:
+            raise HTTPException(status_code=404, detail="No rankings found")
         
+        return {
+            "metric": metric.value,
+            "scope": "state" if state_id is not None else "national",
+            "state_id": state_id,
+            "year": rows[0].period // 100,
+            "month": rows[0].period % 100,
+            "ranked": rows[0].count,
+            "entries": leaderboard_entries(rows)
+        }
+    
+    try:
+        return await conditional_response(
+            request, db,
+            cache_key(
+                "rankings", metric=metric.value, state_id=state_id, year=year, month=month,
+                mode=mode.value, limit=limit,
+                district_id=district_id if mode == LeaderboardMode.around else None
+            ),
+            load,
+            tags=[RANKINGS_TAG]
+        )
     except HTTPException as he:
         raise he
     except Exception as e:
-        logger.error(f"Error fetching history for district {district_id}: {str(e)}")
+        logger.error(f"Error fetching {metric.value} rankings: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/v1/districts/detect-by-location")
 async def detect_district_by_location(
     lat: float,
     lon: float,
-    db: Session = Depends(get_db)
+    k: int = Query(1, ge=1, le=20),
+    state_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Detect nearest district based on latitude and longitude"""
+    """
+    Detect the district containing a location (by stored boundary, falling
+    back to nearest centroid), optionally with the k nearest districts
+    """
     try:
-        from math import radians, cos, sin, asin, sqrt
-        
-        def haversine(lon1, lat1, lon2, lat2):
-            """Calculate the great circle distance between two points on earth (in km)"""
-            lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * asin(sqrt(a))
-            km = 6371 * c
-            return km
-        
-        # Get all districts with coordinates
-        districts = db.query(District, State).join(
-            State, District.state_id == State.id
-        ).filter(
-            District.centroid_lat.isnot(None),
-            District.centroid_lon.isnot(None)
-        ).all()
-        
-        if not districts:
+        index = await get_spatial_index(db)
+        if not len(index):
             raise HTTPException(status_code=404, detail="No districts with coordinates found")
         
-        # Find nearest district
-        nearest_district = None
-        min_distance = float('inf')
-        
-        for district, state in districts:
-            distance = haversine(lon, lat, district.centroid_lon, district.centroid_lat)
-            if distance < min_distance:
-                min_distance = distance
-                nearest_district = (district, state)
-        
-        if not nearest_district:
+        result = index.detect([lat], [lon], k=k, state_id=state_id)[0]
+        if result is None:
             raise HTTPException(status_code=404, detail="Could not detect district")
-        
-        district, state = nearest_district
-        
-        # Calculate confidence based on distance (closer = higher confidence)
-        # Within 50km = high confidence, beyond 200km = low confidence
-        confidence = max(0, min(100, 100 - (min_distance / 2)))
-        
-        return {
-            "id": district.id,
-            "name": district.name,
-            "state_name": state.name,
-            "state_id": state.id,
-            "distance_km": round(min_distance, 2),
-            "confidence": round(confidence, 2)
-        }
+        return result
         
     except HTTPException as he:
         raise he
@@ -332,65 +757,190 @@ async def detect_district_by_location(
         logger.error(f"Error detecting district by location: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/api/v1/metrics/compare", response_model=List[dict])
+@app.post("/api/v1/districts/detect-by-location/batch")
+async def detect_districts_by_location_batch(
+    request: BatchLocationRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Resolve many points in one call; results are in request order (null if unresolved)"""
+    try:
+        index = await get_spatial_index(db)
+        lats = [point.lat for point in request.points]
+        lons = [point.lon for point in request.points]
+        return {"results": index.detect(lats, lons, k=request.k, state_id=request.state_id)}
+    except Exception as e:
+        logger.error(f"Error detecting districts for batch of {len(request.points)} points: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# Metric columns of a comparison, after district_id and district_name
+COMPARISON_FIELDS = (
+    "year", "month", "total_households", "total_person_days", "completed_works",
+    "funds_utilized", "wage_expenditure"
+)
+COMPARISON_COLUMNS = (
+    MonthlyMetric.district_id,
+    District.name.label("district_name"),
+    *(getattr(MonthlyMetric, field) for field in COMPARISON_FIELDS),
+)
+
+def format_comparison(results) -> List[dict]:
+    """(metric row, district) pairs from the columnar store"""
+    return [
+        {
+            "district_id": metric.district_id,
+            "district_name": district.name,
+            **{field: getattr(metric, field) for field in COMPARISON_FIELDS}
+        }
+        for metric, district in results
+    ]
+
+@app.get("/api/v1/metrics/compare", response_model=List[DistrictComparison])
 async def compare_districts(
+    request: Request,
     district_ids: str,  # Comma-separated district IDs
     year: Optional[int] = None,
     month: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Compare metrics across multiple districts"""
-    try:
-        ids = [int(id.strip()) for id in district_ids.split(',')]
+    async def load(ids):
+        store = columnar_store.current()
+        if store is not None:
+            return format_comparison(store.compare(ids, year, month))
         
-        query = db.query(MonthlyMetric, District).join(
+        # Rows of the compared columns become the response items as they are
+        query = select(*COMPARISON_COLUMNS).join(
             District, MonthlyMetric.district_id == District.id
         ).filter(MonthlyMetric.district_id.in_(ids))
         
-        if year:
-            query = query.filter(MonthlyMetric.year == year)
-        if month:
+        if year and month:
+            query = query.filter(MonthlyMetric.period == period_key(year, month))
+        elif year:
+            query = query.filter(MonthlyMetric.period.between(
+                period_key(year, 1), period_key(year, 12)
+            ))
+        elif month:
             query = query.filter(MonthlyMetric.month == month)
         
-        # Get latest for each district if no year/month specified
+        # Get latest for each district if no year/month specified, through
+        # the districts' latest-row pointers
         if not year and not month:
-            from sqlalchemy import func
-            subq = db.query(
-                MonthlyMetric.district_id,
-                func.max(MonthlyMetric.year * 100 + MonthlyMetric.month).label('max_period')
-            ).filter(
-                MonthlyMetric.district_id.in_(ids)
-            ).group_by(MonthlyMetric.district_id).subquery()
-            
-            query = db.query(MonthlyMetric, District).join(
+            query = select(*COMPARISON_COLUMNS).join(
                 District, MonthlyMetric.district_id == District.id
             ).join(
-                subq,
-                (MonthlyMetric.district_id == subq.c.district_id) &
-                ((MonthlyMetric.year * 100 + MonthlyMetric.month) == subq.c.max_period)
-            )
+                DistrictLatestMetric, DistrictLatestMetric.metric_id == MonthlyMetric.id
+            ).filter(DistrictLatestMetric.district_id.in_(ids))
         
-        results = query.all()
-        
-        return [
-            {
-                "district_id": metric.district_id,
-                "district_name": district.name,
-                "year": metric.year,
-                "month": metric.month,
-                "total_households": metric.total_households,
-                "total_person_days": metric.total_person_days,
-                "completed_works": metric.completed_works,
-                "funds_utilized": metric.funds_utilized,
-                "wage_expenditure": metric.wage_expenditure
-            }
-            for metric, district in results
-        ]
+        result = await db.execute(query)
+        return [dict(row._mapping) for row in result]
+    
+    try:
+        ids = sorted({int(id.strip()) for id in district_ids.split(',')})
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid district_ids {district_ids!r}, expected comma-separated integers")
+    
+    try:
+        return await conditional_response(
+            request, db,
+            cache_key("compare", district_ids=ids, year=year, month=month),
+            lambda: load(ids),
+            tags=[district_tag(district_id) for district_id in ids]
+        )
         
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error comparing districts: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/v1/export/metrics")
+async def export_metrics(
+    request: Request,
+    format: ExportFormat = ExportFormat.csv,
+    state_id: Optional[int] = None,
+    district_ids: Optional[str] = None,  # Comma-separated district IDs
+    start: Optional[str] = None,  # First month, YYYY-MM
+    end: Optional[str] = None,  # Last month, YYYY-MM
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Monthly metrics with their district and state, streamed as CSV, NDJSON
+    or Parquet, ordered by district and month. Sent gzip-encoded when the
+    client accepts it. A Range request (e.g. resuming a download) is served
+    from a copy of the export spooled to disk for that data version.
+    """
+    try:
+        ids = sorted({int(id.strip()) for id in district_ids.split(',') if id.strip()}) if district_ids else None
+        first_period = parse_period(start) if start else None
+        last_period = parse_period(end) if end else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not format_available(format.value):
+        raise HTTPException(status_code=501, detail=f"{format.value} export is not available on this server")
+    
+    try:
+        # The export changes with its districts' data and the state names
+        districts = select(District.id)
+        if state_id is not None:
+            districts = districts.filter(District.state_id == state_id)
+        if ids:
+            districts = districts.filter(District.id.in_(ids))
+        tags = [STATES_TAG, *(district_tag(district_id) for district_id in (await db.execute(districts)).scalars())]
+        digest, last_modified = await validators(
+            db,
+            cache_key("export", format=format.value, state_id=state_id, district_ids=ids,
+                      start=first_period, end=last_period),
+            tags
+        )
+        etag = f'"{digest}"'
+        headers = {
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "no-cache",
+            "Content-Disposition": f'attachment; filename="{export_filename(format.value, state_id, start, end)}"',
+            "Vary": "Accept-Encoding",
+        }
+        if last_modified is not None:
+            headers["Last-Modified"] = http_date(last_modified)
+        query = export_query(state_id, ids, first_period, last_period)
+        media_type = MEDIA_TYPES[format.value]
+        
+        range_header = request.headers.get("range")
+        if range_header and request.headers.get("if-range", etag) == etag:
+            file, size = await spool_export(f"{digest}.{format.value}", query, format.value)
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                file.close()
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            first_byte, last_byte = byte_range or (0, size - 1)
+            if byte_range is not None:
+                headers["Content-Range"] = f"bytes {first_byte}-{last_byte}/{size}"
+            headers["Content-Length"] = str(last_byte - first_byte + 1)
+            return StreamingResponse(
+                read_range(file, first_byte, last_byte),
+                status_code=206 if byte_range is not None else 200,
+                media_type=media_type,
+                headers=headers
+            )
+        
+        # The gzip-encoded representation gets its own ETag
+        gzip = accepts_gzip(request.headers.get("accept-encoding"))
+        if gzip:
+            headers["ETag"] = f'"{digest}-gzip"'
+        if not_modified(request, headers["ETag"], last_modified):
+            return Response(status_code=304, headers=headers)
+        chunks = stream_export(query, format.value)
+        if gzip:
+            chunks = gzip_chunks(chunks)
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error exporting metrics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_exception_handler(request: Request, exc: HTTPException):
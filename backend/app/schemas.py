@@ -0,0 +1,216 @@
+"""
+Request and response schemas for the API
+"""
+from datetime import date
+from enum import Enum
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class LocationPoint(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class BatchLocationRequest(BaseModel):
+    points: List[LocationPoint] = Field(..., max_length=10000)
+    k: int = Field(1, ge=1, le=20)
+    state_id: Optional[int] = None
+
+
+class RankingMetric(str, Enum):
+    person_days = "person_days"
+    fund_utilization = "fund_utilization"
+    works_completed = "works_completed"
+
+
+class LeaderboardMode(str, Enum):
+    top = "top"
+    bottom = "bottom"
+    around = "around"
+
+
+class DashboardSection(str, Enum):
+    district = "district"
+    state = "state"
+    latest = "latest"
+    history = "history"
+    peers = "peers"
+
+
+class HistoryGranularity(str, Enum):
+    month = "month"
+    quarter = "quarter"
+    fy = "fy"
+
+
+# Response models. The routes build these payloads as plain dicts from Core
+# rows and render them with orjson, so the models document the schema (in
+# OpenAPI) rather than validate each response.
+
+class StateOut(BaseModel):
+    id: int
+    name: str
+    code: str
+    created_at: Optional[date] = None
+    updated_at: Optional[date] = None
+
+
+class Centroid(BaseModel):
+    lat: float
+    lon: float
+
+
+class DistrictOut(BaseModel):
+    id: int
+    name: str
+    code: Optional[str] = None
+    state_id: int
+    centroid: Optional[Centroid] = None
+    created_at: Optional[date] = None
+    updated_at: Optional[date] = None
+
+
+class Households(BaseModel):
+    total: Optional[int] = None
+    sc: Optional[int] = None
+    st: Optional[int] = None
+    women: Optional[int] = None
+
+
+class Works(BaseModel):
+    total: Optional[int] = None
+    completed: Optional[int] = None
+    in_progress: Optional[int] = None
+
+
+class Finances(BaseModel):
+    total_funds: Optional[float] = None
+    funds_utilized: Optional[float] = None
+    wage_expenditure: Optional[float] = None
+    material_expenditure: Optional[float] = None
+
+
+class PersonDays(BaseModel):
+    total: Optional[int] = None
+    sc: Optional[int] = None
+    st: Optional[int] = None
+    women: Optional[int] = None
+
+
+class RankPosition(BaseModel):
+    rank: Optional[int] = None
+    of: Optional[int] = None
+    percentile: Optional[float] = None
+
+
+class MetricRank(BaseModel):
+    value: Optional[float] = None
+    state: RankPosition
+    national: RankPosition
+
+
+class MetricsMetadata(BaseModel):
+    is_latest: Optional[bool] = None
+    source_url: Optional[str] = None
+    updated_at: Optional[date] = None
+
+
+class DistrictMetricsOut(BaseModel):
+    district_id: int
+    state_id: int
+    year: int
+    month: int
+    households: Households
+    works: Works
+    finances: Finances
+    person_days: PersonDays
+    rank: Optional[Dict[RankingMetric, MetricRank]] = None
+    metadata: MetricsMetadata
+
+
+class HistoryPoint(BaseModel):
+    year: int
+    month: int
+    # quarter / fy granularity only
+    fiscal_year: Optional[str] = None
+    quarter: Optional[int] = None
+    months: Optional[int] = None
+    households: Optional[float] = None
+    person_days: Optional[float] = None
+    works_completed: Optional[float] = None
+    funds_utilized: Optional[float] = None
+
+
+class DistrictComparison(BaseModel):
+    district_id: int
+    district_name: str
+    year: int
+    month: int
+    total_households: Optional[int] = None
+    total_person_days: Optional[int] = None
+    completed_works: Optional[int] = None
+    funds_utilized: Optional[float] = None
+    wage_expenditure: Optional[float] = None
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    district_id: int
+    district_name: str
+    state_id: int
+    value: Optional[float] = None
+    percentile: Optional[float] = None
+
+
+class RankingsOut(BaseModel):
+    metric: RankingMetric
+    scope: str  # "state" or "national"
+    state_id: Optional[int] = None
+    year: int
+    month: int
+    ranked: int
+    entries: List[LeaderboardEntry]
+
+
+class DashboardOut(BaseModel):
+    # Sections left out by `fields` (or peers=0) are absent
+    district: Optional[DistrictOut] = None
+    state: Optional[StateOut] = None
+    latest: Optional[DistrictMetricsOut] = None
+    history: Optional[List[HistoryPoint]] = None
+    peers: Optional[List[LeaderboardEntry]] = None
+
+
+class RollupMonth(BaseModel):
+    year: int
+    month: int
+    district_count: int
+    households: Households
+    works: Works
+    finances: Finances
+    person_days: PersonDays
+
+
+class NationalRollupMonth(RollupMonth):
+    state_count: int
+
+
+class StateMetricsOut(BaseModel):
+    state_id: int
+    state_name: str
+    state_code: str
+    latest: RollupMonth
+    history: List[RollupMonth]
+
+
+class NationalMetricsOut(BaseModel):
+    latest: NationalRollupMonth
+    history: List[NationalRollupMonth]
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    parquet = "parquet"
@@ -1,3 +1,9 @@
-from .mgnrega_api import MGNREGAAPIService
-
 __all__ = ['MGNREGAAPIService']
+
+def __getattr__(name):
+    # Imported on first use: the API routes only need the light service
+    # modules, not the ingestion stack (httpx, tenacity) behind this one
+    if name == 'MGNREGAAPIService':
+        from .mgnrega_api import MGNREGAAPIService
+        return MGNREGAAPIService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,240 @@
+"""
+API Cache
+Database-backed cache of upstream data.gov.in responses.
+
+Entries are keyed by the sha256 of the endpoint and canonically serialized
+parameters (unique index), so lookups are a single indexed equality match
+and rewriting a response upserts the existing row. Payloads are stored
+compressed: zstd when the zstandard package is installed, gzip otherwise.
+A background job deletes expired rows, rows older than the age limit, and
+least-recently-used rows beyond the size limit.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..db.base import SessionLocal
+from ..db.models import APICache
+from ..db.upsert import bulk_upsert
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+API_CACHE_TTL_HOURS = float(os.getenv("API_CACHE_TTL_HOURS", "24"))
+API_CACHE_MAX_AGE_HOURS = float(os.getenv("API_CACHE_MAX_AGE_HOURS", "168"))
+API_CACHE_MAX_BYTES = int(os.getenv("API_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+API_CACHE_EVICT_INTERVAL = float(os.getenv("API_CACHE_EVICT_INTERVAL", "900"))
+
+# Rows deleted per statement during size-based eviction
+EVICT_CHUNK_SIZE = 500
+
+
+def canonical_key(endpoint: str, parameters: Dict[str, Any]) -> str:
+    """Stable sha256 key for an endpoint and its parameters, independent of key order"""
+    canonical = json.dumps(
+        {"endpoint": endpoint, "parameters": parameters},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def compress(data: bytes) -> Tuple[bytes, str]:
+    """Compress with the best available codec; returns (payload, encoding)"""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data), "zstd"
+    return gzip.compress(data, compresslevel=6), "gzip"
+
+
+def decompress(payload: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(payload)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd payload but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown payload encoding: {encoding}")
+
+
+class APIResponseCache:
+    """Compressed, self-evicting cache of upstream responses in the api_cache table"""
+
+    def __init__(
+        self,
+        ttl: timedelta = timedelta(hours=API_CACHE_TTL_HOURS),
+        max_age: timedelta = timedelta(hours=API_CACHE_MAX_AGE_HOURS),
+        max_bytes: int = API_CACHE_MAX_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+        self.evictions = 0
+        self.raw_bytes = 0  # uncompressed bytes stored
+        self.stored_bytes = 0  # compressed bytes stored
+        self.last_eviction: Optional[Dict[str, Any]] = None
+
+    def get(self, db: Session, endpoint: str, parameters: Dict[str, Any]) -> Optional[Any]:
+        """Cached response if present and unexpired"""
+        now = datetime.utcnow()
+        entry = db.execute(
+            select(APICache.id, APICache.payload, APICache.encoding).where(
+                APICache.cache_key == canonical_key(endpoint, parameters),
+                APICache.expires_at > now,
+            )
+        ).first()
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            value = json.loads(decompress(entry.payload, entry.encoding))
+        except (ValueError, OSError) as e:
+            logger.warning(f"Discarding unreadable API cache entry for {endpoint}: {e}")
+            self.errors += 1
+            self.misses += 1
+            return None
+
+        db.execute(
+            update(APICache)
+            .where(APICache.id == entry.id)
+            .values(hits=APICache.hits + 1, last_accessed_at=now)
+        )
+        db.commit()
+        self.hits += 1
+        return value
+
+    def set(
+        self,
+        db: Session,
+        endpoint: str,
+        parameters: Dict[str, Any],
+        response: Any,
+        ttl: Optional[timedelta] = None,
+    ) -> None:
+        """Store a response, replacing any existing entry for the same key"""
+        raw = json.dumps(response, separators=(",", ":")).encode()
+        payload, encoding = compress(raw)
+        now = datetime.utcnow()
+        bulk_upsert(
+            db,
+            APICache,
+            [{
+                "cache_key": canonical_key(endpoint, parameters),
+                "endpoint": endpoint,
+                "parameters": parameters,
+                "payload": payload,
+                "encoding": encoding,
+                "size_bytes": len(payload),
+                "hits": 0,
+                "created_at": now,
+                "last_accessed_at": now,
+                "expires_at": now + (ttl or self.ttl),
+            }],
+            conflict_columns=["cache_key"],
+            # Keep the hit count of a refreshed entry
+            update_columns=[
+                "endpoint", "parameters", "payload", "encoding", "size_bytes",
+                "created_at", "last_accessed_at", "expires_at",
+            ],
+        )
+        self.stores += 1
+        self.raw_bytes += len(raw)
+        self.stored_bytes += len(payload)
+
+    def evict(self, db: Session) -> Dict[str, Any]:
+        """Delete expired and over-age rows, then LRU rows until under max_bytes"""
+        now = datetime.utcnow()
+        expired = db.execute(
+            delete(APICache).where(or_(
+                APICache.expires_at <= now,
+                APICache.created_at <= now - self.max_age,
+            ))
+        ).rowcount or 0
+
+        total_bytes = db.execute(select(func.coalesce(func.sum(APICache.size_bytes), 0))).scalar()
+        excess = total_bytes - self.max_bytes
+        over_size = []
+        if excess > 0:
+            rows = db.execute(
+                select(APICache.id, APICache.size_bytes).order_by(APICache.last_accessed_at)
+            )
+            for entry_id, size in rows:
+                if excess <= 0:
+                    break
+                over_size.append(entry_id)
+                excess -= size
+            rows.close()
+            for start in range(0, len(over_size), EVICT_CHUNK_SIZE):
+                db.execute(delete(APICache).where(APICache.id.in_(over_size[start:start + EVICT_CHUNK_SIZE])))
+        db.commit()
+
+        entries, total_bytes = db.execute(
+            select(func.count(APICache.id), func.coalesce(func.sum(APICache.size_bytes), 0))
+        ).one()
+        self.evictions += expired + len(over_size)
+        self.last_eviction = {
+            "at": now.isoformat(),
+            "expired": expired,
+            "over_size": len(over_size),
+            "entries": entries,
+            "bytes": total_bytes,
+        }
+        if expired or over_size:
+            logger.info(
+                f"API cache eviction: {expired} expired, {len(over_size)} over size; "
+                f"{entries} entries / {total_bytes} bytes remain"
+            )
+        return self.last_eviction
+
+    def _evict_with_new_session(self) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            return self.evict(db)
+        finally:
+            db.close()
+
+    async def run_eviction(self, interval: float = API_CACHE_EVICT_INTERVAL) -> None:
+        """Evict periodically until cancelled; runs each pass off the event loop"""
+        while True:
+            try:
+                await asyncio.to_thread(self._evict_with_new_session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"API cache eviction failed: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "stores": self.stores,
+            "compression_ratio": round(self.raw_bytes / self.stored_bytes, 2) if self.stored_bytes else None,
+            "codec": "zstd" if zstandard is not None else "gzip",
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "max_bytes": self.max_bytes,
+            "last_eviction": self.last_eviction,
+        }
+
+
+# Process-wide cache of data.gov.in responses
+api_cache = APIResponseCache()
@@ -0,0 +1,185 @@
+"""
+District Boundaries
+Point-in-polygon district lookup against the GeoJSON stored in
+District.boundary.
+
+Each boundary is parsed once into flat NumPy vertex arrays (all rings of
+all parts concatenated and closed), so a containment test is a single
+vectorized even-odd crossing count over the district's edges. A packed
+STR R-tree over the district bounding boxes narrows each lookup to the
+handful of districts whose box contains the point.
+"""
+import logging
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Children per R-tree node
+RTREE_NODE_SIZE = 16
+
+
+def _polygon_rings(geometry: Any) -> List[List[Sequence[float]]]:
+    """All rings (exterior and holes) of a Polygon / MultiPolygon / Feature"""
+    if not isinstance(geometry, dict):
+        return []
+    kind = geometry.get("type")
+    if kind == "Feature":
+        return _polygon_rings(geometry.get("geometry"))
+    if kind == "FeatureCollection":
+        rings = []
+        for feature in geometry.get("features") or []:
+            rings.extend(_polygon_rings(feature))
+        return rings
+    if kind == "GeometryCollection":
+        rings = []
+        for part in geometry.get("geometries") or []:
+            rings.extend(_polygon_rings(part))
+        return rings
+    if kind == "Polygon":
+        return list(geometry.get("coordinates") or [])
+    if kind == "MultiPolygon":
+        return [ring for polygon in geometry.get("coordinates") or [] for ring in polygon]
+    return []
+
+
+class DistrictShape:
+    """A district boundary as closed rings packed into flat coordinate arrays"""
+
+    __slots__ = ("xs", "ys", "bridges", "bbox")
+
+    def __init__(self, rings: List[np.ndarray]):
+        closed = []
+        for ring in rings:
+            if not np.array_equal(ring[0], ring[-1]):
+                ring = np.vstack([ring, ring[:1]])
+            closed.append(ring)
+        vertices = np.concatenate(closed)
+        self.xs = np.ascontiguousarray(vertices[:, 0])  # longitude
+        self.ys = np.ascontiguousarray(vertices[:, 1])  # latitude
+        # Edge i runs from vertex i to i + 1; edges joining the end of one
+        # ring to the start of the next are not part of the boundary
+        self.bridges = np.zeros(len(vertices) - 1, dtype=bool)
+        self.bridges[np.cumsum([len(ring) for ring in closed])[:-1] - 1] = True
+        self.bbox = (self.xs.min(), self.ys.min(), self.xs.max(), self.ys.max())
+
+    @classmethod
+    def from_geojson(cls, geometry: Any) -> Optional["DistrictShape"]:
+        rings = []
+        for ring in _polygon_rings(geometry):
+            try:
+                coords = np.asarray(ring, dtype=np.float64)[:, :2]
+            except (ValueError, IndexError, TypeError):
+                continue
+            if len(coords) >= 3:
+                rings.append(coords)
+        return cls(rings) if rings else None
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.xs)
+
+    def contains(self, lon: float, lat: float) -> bool:
+        """Even-odd rule over every ring, so holes and multi-part shapes just work"""
+        x1, x2 = self.xs[:-1], self.xs[1:]
+        y1, y2 = self.ys[:-1], self.ys[1:]
+        straddles = ((y1 > lat) != (y2 > lat)) & ~self.bridges
+        if not straddles.any():
+            return False
+        x1, x2, y1, y2 = x1[straddles], x2[straddles], y1[straddles], y2[straddles]
+        crossings = lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+        return bool(np.count_nonzero(crossings) & 1)
+
+
+class PackedRTree:
+    """Static R-tree over bounding boxes, bulk-loaded with Sort-Tile-Recursive"""
+
+    def __init__(self, boxes: np.ndarray, node_size: int = RTREE_NODE_SIZE):
+        """boxes: (N, 4) array of minx, miny, maxx, maxy"""
+        self.node_size = node_size
+        entries = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        items = np.arange(len(entries))
+        children = np.stack([items, items + 1], axis=1)
+
+        # levels[0] holds the items; each higher level holds (boxes, child ranges)
+        self.levels: List[Tuple[np.ndarray, np.ndarray]] = []
+        while True:
+            order = self._str_order(entries)
+            entries, children = entries[order], children[order]
+            if not self.levels:
+                self.items = items[order]
+            self.levels.append((entries, children))
+            if len(entries) <= 1:
+                break
+            starts = np.arange(0, len(entries), node_size)
+            ends = np.minimum(starts + node_size, len(entries))
+            entries = np.column_stack([
+                np.minimum.reduceat(entries[:, 0], starts),
+                np.minimum.reduceat(entries[:, 1], starts),
+                np.maximum.reduceat(entries[:, 2], starts),
+                np.maximum.reduceat(entries[:, 3], starts),
+            ])
+            children = np.stack([starts, ends], axis=1)
+
+    def _str_order(self, boxes: np.ndarray) -> np.ndarray:
+        """Order entries so each run of node_size forms a compact tile"""
+        count = len(boxes)
+        if count <= self.node_size:
+            return np.arange(count)
+        centers_x = (boxes[:, 0] + boxes[:, 2]) / 2
+        centers_y = (boxes[:, 1] + boxes[:, 3]) / 2
+        leaves = int(np.ceil(count / self.node_size))
+        slab_size = int(np.ceil(np.sqrt(leaves))) * self.node_size
+        by_x = np.argsort(centers_x, kind="stable")
+        slabs = [by_x[start:start + slab_size] for start in range(0, count, slab_size)]
+        return np.concatenate([slab[np.argsort(centers_y[slab], kind="stable")] for slab in slabs])
+
+    def query_point(self, x: float, y: float) -> np.ndarray:
+        """Item indices whose box contains (x, y)"""
+        if not len(self.items):
+            return self.items
+        nodes = np.arange(len(self.levels[-1][0]))
+        for depth in range(len(self.levels) - 1, -1, -1):
+            boxes, children = self.levels[depth]
+            box = boxes[nodes]
+            nodes = nodes[(box[:, 0] <= x) & (x <= box[:, 2]) & (box[:, 1] <= y) & (y <= box[:, 3])]
+            if depth == 0 or not len(nodes):
+                break
+            ranges = children[nodes]
+            nodes = np.concatenate([np.arange(start, end) for start, end in ranges])
+        if depth != 0:
+            return nodes[:0]
+        return self.items[nodes]
+
+
+class DistrictBoundaryIndex:
+    """Point-in-polygon lookup over all districts with a stored boundary"""
+
+    def __init__(self, boundaries: Sequence[Tuple[int, Any]]):
+        """boundaries: (district_id, GeoJSON) pairs; unparseable shapes are skipped"""
+        self.district_ids: List[int] = []
+        self.shapes: List[DistrictShape] = []
+        for district_id, geometry in boundaries:
+            shape = DistrictShape.from_geojson(geometry)
+            if shape is None:
+                if geometry is not None:
+                    logger.warning(f"Ignoring unusable boundary for district {district_id}")
+                continue
+            self.district_ids.append(district_id)
+            self.shapes.append(shape)
+        self.tree = PackedRTree(np.array([shape.bbox for shape in self.shapes]).reshape(-1, 4))
+
+    def __len__(self) -> int:
+        return len(self.shapes)
+
+    @property
+    def vertex_count(self) -> int:
+        return sum(shape.vertex_count for shape in self.shapes)
+
+    def locate(self, lat: float, lon: float) -> Optional[int]:
+        """District id whose boundary contains the point, if any"""
+        for item in self.tree.query_point(lon, lat):
+            if self.shapes[item].contains(lon, lat):
+                return self.district_ids[item]
+        return None
@@ -0,0 +1,285 @@
+"""
+Response Cache
+Bounded in-process LRU/TTL cache for the read endpoints, with single-flight
+loading and tag-based invalidation driven by data ingestion. Misses fall
+through to the Redis-backed shared cache (when configured) before the
+database.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import orjson
+
+from .shared_cache import SharedCache, shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Cache sizing (entries / seconds); RESPONSE_CACHE_SIZE=0 disables caching
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+# Invalidation tags
+STATES_TAG = "states"
+
+def state_tag(state_id: int) -> str:
+    return f"state:{state_id}"
+
+def district_tag(district_id: int) -> str:
+    return f"district:{district_id}"
+
+# State / national rollups; kept apart from state:<id>, which also drops the
+# spatial index
+NATIONAL_ROLLUP_TAG = "rollups:national"
+
+def state_rollup_tag(state_id: int) -> str:
+    return f"rollups:state:{state_id}"
+
+# District rankings: any re-ranking (leaderboards), the ranks of one month,
+# and the ranks of the month that is some district's latest (the rank block
+# of unfiltered district metrics and the dashboard)
+RANKINGS_TAG = "rankings"
+LATEST_RANKINGS_TAG = "rankings:latest"
+
+def ranking_period_tag(period: int) -> str:
+    return f"rankings:{period}"
+
+def cache_key(route: str, **params: Any) -> str:
+    """Build a cache key from a route name and its normalized parameters"""
+    parts = [route]
+    for name in sorted(params):
+        value = params[name]
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set, frozenset)):
+            value = ",".join(str(v) for v in sorted(value))
+        parts.append(f"{name}={value}")
+    return "|".join(parts)
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into a single execution"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.shared = 0  # calls that joined an in-flight execution
+
+    async def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() (sync or async) once for all concurrent callers of key"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.shared += 1
+            # Shield so one cancelled waiter doesn't cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = fn()
+            if inspect.isawaitable(result):
+                result = await result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+
+class ResponseCache:
+    """LRU/TTL cache of endpoint payloads keyed on route plus parameters"""
+
+    def __init__(
+        self,
+        maxsize: int = RESPONSE_CACHE_SIZE,
+        ttl: float = RESPONSE_CACHE_TTL,
+        shared: Optional[SharedCache] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self._entries: "OrderedDict[str, Tuple[Any, float, Tuple[str, ...]]]" = OrderedDict()
+        self._tag_index: Dict[str, Set[str]] = {}
+        # Bumped on invalidation so loads that started before it aren't stored
+        self._tag_generations: Dict[str, int] = {}
+        self._generation = 0
+        self._flight = SingleFlight()
+        # Called with the invalidated tags (None for a full clear), e.g. to
+        # drop other in-memory structures derived from the same data
+        self._listeners: List[Callable[[Optional[List[str]]], None]] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value) for a fresh entry, refreshing its LRU position"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = ()) -> None:
+        if not self.enabled:
+            return
+        tags = tuple(tags)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def get_or_load(self, key: str, loader: Callable[[], Any], tags: Iterable[str] = ()) -> Any:
+        """Return a cached payload or load it once, however many callers miss concurrently"""
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        tags = tuple(tags)
+        if not self.enabled:
+            return await self._load_through(key, loader, tags)
+        return await self._flight.do(key, lambda: self._load(key, loader, tags))
+
+    async def _load_through(self, key: str, loader: Callable[[], Any], tags: Tuple[str, ...]) -> Any:
+        """Read from the shared cache, falling back to the loader and filling it"""
+        versioned_key = None
+        if self.shared is not None and self.shared.available:
+            payload, versioned_key = await self.shared.lookup(key, tags)
+            if payload is not None:
+                return orjson.loads(payload)
+
+        value = loader()
+        if inspect.isawaitable(value):
+            value = await value
+
+        if versioned_key is not None:
+            await self.shared.store(versioned_key, orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY))
+        return value
+
+    async def _load(self, key: str, loader: Callable[[], Any], tags: Tuple[str, ...]) -> Any:
+        generation = self._generation
+        tag_generations = [self._tag_generations.get(tag, 0) for tag in tags]
+
+        value = await self._load_through(key, loader, tags)
+
+        # Don't store a payload read before an invalidation that raced with it
+        if generation == self._generation and tag_generations == [
+            self._tag_generations.get(tag, 0) for tag in tags
+        ]:
+            self.set(key, value, tags)
+        return value
+
+    def add_listener(self, listener: Callable[[Optional[List[str]]], None]) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, tags: Optional[List[str]]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(tags)
+            except Exception as e:
+                logger.error(f"Cache invalidation listener failed: {e}", exc_info=True)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Drop every entry carrying any of the given tags"""
+        tags = list(tags)
+        removed = 0
+        for tag in tags:
+            self._tag_generations[tag] = self._tag_generations.get(tag, 0) + 1
+            for key in list(self._tag_index.get(tag, ())):
+                self._remove(key)
+                removed += 1
+        self.invalidations += removed
+        self._notify(tags)
+        return removed
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._tag_index.clear()
+        self._notify(None)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "coalesced": self._flight.shared,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# Process-wide cache used by the API routes
+response_cache = ResponseCache(shared=shared_cache)
+
+def invalidate_cache(
+    state_ids: Iterable[int] = (),
+    district_ids: Iterable[int] = (),
+    states: bool = False,
+    rollup_state_ids: Iterable[int] = (),
+    ranking_tags: Iterable[str] = (),
+) -> int:
+    """
+    Invalidate cached responses after a data write, locally and (when Redis
+    is configured) in the shared cache and every other worker. Without
+    Redis, other workers expire their entries by TTL. ranking_tags are
+    those rankings.ranking_tags() returns for the re-ranked months.
+    """
+    tags: List[str] = [STATES_TAG] if states else []
+    tags.extend(state_tag(state_id) for state_id in set(state_ids))
+    tags.extend(district_tag(district_id) for district_id in set(district_ids))
+    rollup_state_ids = set(rollup_state_ids)
+    if rollup_state_ids:
+        tags.append(NATIONAL_ROLLUP_TAG)
+        tags.extend(state_rollup_tag(state_id) for state_id in rollup_state_ids)
+    tags.extend(ranking_tags)
+    if not tags:
+        return 0
+    removed = response_cache.invalidate_tags(tags)
+    shared_cache.invalidate(tags)
+    logger.debug(f"Invalidated {removed} cached responses for {len(tags)} tags")
+    return removed
@@ -0,0 +1,337 @@
+"""
+Columnar Metrics Store
+Optional in-memory copy of monthly_metrics (and each row's district
+ranking) held as one NumPy array per field, sorted by (district_id,
+period). A district's rows are a contiguous slice found by binary search
+over the district ids, so the district metrics, history and compare
+routes are answered from array slices without a database round trip or
+ORM objects (raw_data is never loaded).
+
+The store is built off the event loop and swapped in with a single
+reference assignment, so readers always see one complete snapshot. Any
+cache invalidation (i.e. a data write) marks it stale: routes fall back to
+the database until a reload, started after writes settle, replaces it. It
+is also reloaded every COLUMNAR_STORE_TTL seconds to pick up writes made by
+processes that can't notify this one. Each worker process holds its own
+copy.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from ..db.base import engine as default_engine
+from ..db.models import METRIC_FIELDS, District, DistrictRanking, MonthlyMetric
+from .history import HISTORY_FIELDS, HistorySeries
+from .metrics import COLUMNAR_STORE_BYTES, COLUMNAR_STORE_REFRESH_SECONDS, COLUMNAR_STORE_ROWS
+from .rankings import RANKING_METRICS, SCOPES
+
+logger = logging.getLogger(__name__)
+
+# Serve the district metric routes from memory
+COLUMNAR_STORE = os.getenv("COLUMNAR_STORE", "false").lower() == "true"
+# Reload interval (seconds), and the pause after a write before reloading
+COLUMNAR_STORE_TTL = float(os.getenv("COLUMNAR_STORE_TTL", "300"))
+COLUMNAR_STORE_RELOAD_DELAY = float(os.getenv("COLUMNAR_STORE_RELOAD_DELAY", "2"))
+
+# Rows fetched from the database per chunk while loading
+LOAD_CHUNK_SIZE = 50_000
+
+# Array dtype and NULL placeholder per column python type (default: timestamps)
+DTYPES = {bool: bool, int: np.int64, float: np.float64, date: "datetime64[D]"}
+NULL_FILL = {bool: False, int: 0, float: np.nan}
+
+METRIC_COLUMNS = (
+    "district_id", "state_id", "year", "month", "period", *METRIC_FIELDS,
+    "is_latest", "source_url", "updated_at",
+)
+RANKING_COLUMNS = tuple(
+    f"{name}_{part}"
+    for name in RANKING_METRICS
+    for part in ("value", *(f"{scope}_{field}" for scope in SCOPES for field in ("rank", "count")))
+)
+# has_ranking is False for rows the rankings haven't covered yet
+COLUMNS = (*METRIC_COLUMNS, "has_ranking", *RANKING_COLUMNS)
+
+# A row rebuilt from the arrays; has the attributes of MonthlyMetric and DistrictRanking used by the routes
+MetricRow = namedtuple("MetricRow", COLUMNS)
+DistrictName = namedtuple("DistrictName", ("id", "name"))
+
+
+def _to_array(values: Sequence[Any], kind: type, categories: Dict[Any, int]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Array for one column chunk, plus a null mask when it has NULLs. Strings
+    (a handful of distinct source URLs) are stored as codes into `categories`.
+    """
+    if kind is str:
+        codes = [categories.setdefault(value, len(categories)) for value in values]
+        return np.array(codes, dtype=np.int32), None
+    column = np.array(values, dtype=object)
+    nulls = column == None  # noqa: E711 - elementwise comparison
+    if nulls.any():
+        column[nulls] = NULL_FILL.get(kind, np.datetime64("NaT"))
+    else:
+        nulls = None
+    return column.astype(DTYPES.get(kind, "datetime64[us]")), nulls
+
+
+def _shrink(array: np.ndarray) -> np.ndarray:
+    """Narrowest integer dtype that holds the column's values"""
+    if array.dtype.kind != "i" or not len(array):
+        return array
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= array.min() and array.max() <= info.max:
+            return array.astype(dtype)
+    return array
+
+
+class MetricStore:
+    """One immutable snapshot of the metrics columns"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], nulls: Dict[str, np.ndarray],
+                 labels: Dict[str, np.ndarray], district_names: Dict[int, str], load_seconds: float):
+        self.columns = columns
+        self.nulls = nulls  # column -> null mask, only for columns with NULLs
+        self.labels = labels  # column -> values its codes stand for (string columns)
+        self.district_names = district_names
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.utcnow()
+        district_ids = columns["district_id"]
+        # Distinct districts and the offset where each one's rows start
+        self.district_ids, starts = np.unique(district_ids, return_index=True)
+        self.offsets = np.append(starts, len(district_ids)).astype(np.int64)
+
+    @classmethod
+    def load(cls, engine: Engine = default_engine) -> "MetricStore":
+        started = time.perf_counter()
+        ranking = [getattr(DistrictRanking, name) for name in RANKING_COLUMNS]
+        query = select(
+            *[getattr(MonthlyMetric, name) for name in METRIC_COLUMNS],
+            (DistrictRanking.id.is_not(None)).label("has_ranking"),
+            *ranking,
+        ).outerjoin(
+            DistrictRanking,
+            (DistrictRanking.district_id == MonthlyMetric.district_id) &
+            (DistrictRanking.period == MonthlyMetric.period)
+        ).order_by(MonthlyMetric.district_id, MonthlyMetric.period)
+
+        kinds = [column.type.python_type for column in query.selected_columns]
+        categories: Dict[str, Dict[Any, int]] = {name: {} for name in COLUMNS}
+        chunks: Dict[str, List[np.ndarray]] = {name: [] for name in COLUMNS}
+        null_chunks: Dict[str, List[Optional[np.ndarray]]] = {name: [] for name in COLUMNS}
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(query)
+            for rows in result.partitions(LOAD_CHUNK_SIZE):
+                for name, kind, values in zip(COLUMNS, kinds, zip(*rows)):
+                    array, nulls = _to_array(values, kind, categories[name])
+                    chunks[name].append(array)
+                    null_chunks[name].append(nulls)
+            district_names = dict(conn.execute(select(District.id, District.name)).all())
+
+        columns: Dict[str, np.ndarray] = {}
+        nulls: Dict[str, np.ndarray] = {}
+        for name in COLUMNS:
+            if not chunks[name]:
+                columns[name] = np.zeros(0, dtype=np.int64)
+                continue
+            columns[name] = _shrink(np.concatenate(chunks[name]))
+            if any(mask is not None for mask in null_chunks[name]):
+                nulls[name] = np.concatenate([
+                    np.zeros(len(array), dtype=bool) if mask is None else mask
+                    for array, mask in zip(chunks[name], null_chunks[name])
+                ])
+        labels = {
+            name: np.array(list(lookup), dtype=object) for name, lookup in categories.items() if lookup
+        }
+        return cls(columns, nulls, labels, district_names, time.perf_counter() - started)
+
+    def __len__(self) -> int:
+        return len(self.columns["district_id"])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [*self.columns.values(), *self.nulls.values(), self.district_ids, self.offsets]
+        return sum(array.nbytes for array in arrays)
+
+    def district_slice(self, district_id: int) -> slice:
+        """Rows of one district, in period order (empty if unknown)"""
+        index = np.searchsorted(self.district_ids, district_id)
+        if index == len(self.district_ids) or self.district_ids[index] != district_id:
+            return slice(0, 0)
+        return slice(int(self.offsets[index]), int(self.offsets[index + 1]))
+
+    def rows(self, positions: Any) -> List[MetricRow]:
+        """MetricRows for a slice or array of row positions, converted column-wise"""
+        values = []
+        for name in COLUMNS:
+            column = self.columns[name][positions]
+            if name in self.labels:
+                converted = self.labels[name][column].tolist()
+            elif column.dtype.kind == "M":
+                converted = [None if np.isnat(value) else value.item() for value in column]
+            else:
+                converted = column.tolist()
+            mask = self.nulls.get(name)
+            if mask is not None:
+                converted = [None if null else value for value, null in zip(converted, mask[positions].tolist())]
+            values.append(converted)
+        return [MetricRow(*row) for row in zip(*values)]
+
+    def latest(self, district_id: int, year: Optional[int] = None, month: Optional[int] = None) -> Optional[MetricRow]:
+        """The district's latest row, optionally within a year and/or for a month (as the DB route filters)"""
+        rows = self.district_slice(district_id)
+        periods = self.columns["period"][rows]
+        if year and month:
+            candidates = np.flatnonzero(periods == year * 100 + month)
+        elif year:
+            candidates = np.flatnonzero((periods >= year * 100 + 1) & (periods <= year * 100 + 12))
+        elif month:
+            candidates = np.flatnonzero(self.columns["month"][rows] == month)
+        else:
+            candidates = np.arange(len(periods))
+        if not len(candidates):
+            return None
+        return self.rows(np.array([rows.start + candidates[-1]]))[0]
+
+    def history_series(self, district_id: int, years: int) -> HistorySeries:
+        """The charted history columns from `years` before the district's latest month"""
+        rows = self.district_slice(district_id)
+        periods = self.columns["period"][rows]
+        if len(periods):
+            rows = slice(rows.start + int(np.searchsorted(periods, periods[-1] - years * 100)), rows.stop)
+        values = {}
+        for name, column in HISTORY_FIELDS.items():
+            array = self.columns[column][rows].astype(np.float64)
+            mask = self.nulls.get(column)
+            if mask is not None:
+                array[mask[rows]] = np.nan
+            values[name] = array
+        return HistorySeries(self.columns["period"][rows].astype(np.int64), values)
+
+    def compare(self, district_ids: Sequence[int], year: Optional[int] = None,
+                month: Optional[int] = None) -> List[Tuple[MetricRow, DistrictName]]:
+        """Rows per district as the DB compare route selects them (latest month when unfiltered)"""
+        positions = []
+        for district_id in district_ids:
+            if district_id not in self.district_names:
+                continue
+            rows = self.district_slice(district_id)
+            periods = self.columns["period"][rows]
+            if year and month:
+                selected = np.flatnonzero(periods == year * 100 + month)
+            elif year:
+                selected = np.flatnonzero((periods >= year * 100 + 1) & (periods <= year * 100 + 12))
+            elif month:
+                selected = np.flatnonzero(self.columns["month"][rows] == month)
+            else:
+                selected = np.arange(len(periods))[-1:]
+            positions.append(rows.start + selected)
+        if not positions:
+            return []
+        rows = self.rows(np.concatenate(positions))
+        return [(row, DistrictName(row.district_id, self.district_names[row.district_id])) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": len(self),
+            "districts": len(self.district_ids),
+            "bytes": self.nbytes,
+            "load_seconds": round(self.load_seconds, 3),
+            "loaded_at": self.loaded_at.isoformat(),
+        }
+
+
+class ColumnarStoreManager:
+    """Holds the current MetricStore and keeps it fresh"""
+
+    def __init__(self, enabled: bool = COLUMNAR_STORE, engine: Engine = default_engine):
+        self.enabled = enabled
+        self.engine = engine
+        self._store: Optional[MetricStore] = None
+        self._wanted = 0  # bumped by every write notification
+        self._loaded = 0  # value of _wanted the current store reflects
+        self._reload_task: Optional[asyncio.Task] = None
+        self.reloads = 0
+        self.errors = 0
+
+    def current(self) -> Optional[MetricStore]:
+        """The store, unless disabled, not loaded yet or stale after a write"""
+        if self._store is None or self._loaded != self._wanted:
+            return None
+        return self._store
+
+    async def reload(self) -> None:
+        """Build a new snapshot off the event loop and swap it in"""
+        wanted = self._wanted
+        started = time.perf_counter()
+        store = await asyncio.to_thread(MetricStore.load, self.engine)
+        elapsed = time.perf_counter() - started
+        self._store, self._loaded = store, wanted
+        self.reloads += 1
+        COLUMNAR_STORE_ROWS.set(len(store))
+        COLUMNAR_STORE_BYTES.set(store.nbytes)
+        COLUMNAR_STORE_REFRESH_SECONDS.observe(elapsed)
+        logger.info(
+            f"Columnar store loaded: {len(store)} rows, {len(store.district_ids)} districts, "
+            f"{store.nbytes / 1024 / 1024:.1f} MiB in {elapsed:.2f}s"
+        )
+
+    def on_invalidate(self, tags: Optional[List[str]]) -> None:
+        """response_cache listener: a write happened, so stop serving and reload once writes settle"""
+        if self._store is None:
+            return
+        self._wanted += 1
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.get_running_loop().create_task(self._reload_after_writes())
+
+    async def _reload_after_writes(self) -> None:
+        while self._loaded != self._wanted:
+            wanted = self._wanted
+            await asyncio.sleep(COLUMNAR_STORE_RELOAD_DELAY)
+            if wanted != self._wanted:
+                continue  # still being written to
+            try:
+                await self.reload()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Columnar store reload failed: {e}", exc_info=True)
+                return
+
+    async def run_refresh(self, interval: float = COLUMNAR_STORE_TTL) -> None:
+        """Reload periodically until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Columnar store refresh failed: {e}", exc_info=True)
+
+    async def close(self) -> None:
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+        self._store = None
+
+    def stats(self) -> Dict[str, Any]:
+        store = self._store
+        return {
+            "enabled": self.enabled,
+            "serving": self.current() is not None,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            **(store.stats() if store is not None else {}),
+        }
+
+
+# Process-wide store used by the API routes
+columnar_store = ColumnarStoreManager()
@@ -1,126 +1,309 @@
 import os
+import asyncio
 import logging
 import json
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from collections import deque
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from sqlalchemy.orm import Session
-import pandas as pd
 
-from ..db.models import State, District, MonthlyMetric, DataSnapshot, APICache
-from ..db.base import get_db
+from ..db.models import State, District, MonthlyMetric, DataSnapshot, APICache, METRIC_FIELDS, period_key
+from ..db.base import get_sync_db
+from ..db.instrumentation import track_queries
+from ..db.upsert import UPSERT_BATCH_SIZE, UpsertResult, bulk_upsert
+from .cache import NATIONAL_ROLLUP_TAG, invalidate_cache, state_rollup_tag
+from .data_versions import bump_versions, bump_written_districts, bump_written_metrics, bump_written_states
+from .http_client import fetch_json
+from .latest_metrics import on_metrics_written
+from .metrics import record_ingestion, record_retry
+from .rate_limit import TokenBucket, data_gov_limiter, parse_retry_after
+from .record_parser import parse_metric_record
+from .rankings import ranking_tags, refresh_rankings
+from .rollups import RollupTracker, collect_state_periods
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Concurrent API requests per sync_all_data run (overridable per call)
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "8"))
+
+# Records per page of a paginated resource, and pages requested ahead
+DATA_GOV_PAGE_SIZE = int(os.getenv("DATA_GOV_PAGE_SIZE", "1000"))
+DATA_GOV_PREFETCH = int(os.getenv("DATA_GOV_PREFETCH", "1"))
+
+# Dependent writes made in each upsert batch's transaction, per table
+WRITE_HOOKS = {
+    State: [bump_written_states],
+    District: [bump_written_districts],
+    MonthlyMetric: [on_metrics_written, bump_written_metrics],
+}
+
+class DistrictRef(NamedTuple):
+    """Plain district fields handed to fetch tasks instead of ORM objects"""
+    id: int
+    name: str
+    code: Optional[str]
+    state_id: int
+    state_code: str
+
 class DataGovClient:
     """Client for interacting with data.gov.in API"""
     
     BASE_URL = "https://api.data.gov.in/resource"
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, rate_limiter: TokenBucket = None, client: httpx.AsyncClient = None):
         self.api_key = api_key or os.getenv("DATA_GOV_API_KEY")
         if not self.api_key:
             raise ValueError("DATA_GOV_API_KEY environment variable not set")
         
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # None means the process-wide pooled client from http_client
+        self.client = client
+        self.rate_limiter = rate_limiter or data_gov_limiter
         
     async def close(self):
-        await self.client.aclose()
+        # The shared pool outlives any one client; only close one passed in
+        if self.client is not None:
+            await self.client.aclose()
         
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError))
+        retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError)),
+        before_sleep=record_retry,
     )
     async def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Dict:
-        """Make a request to the data.gov.in API with retries"""
+        """
+        Make a rate-limited request to the data.gov.in API with retries.
+        Identical concurrent requests share one upstream call.
+        """
         url = f"{self.BASE_URL}/{endpoint}"
         params = {"api-key": self.api_key, "format": "json", **params}
         
         try:
-            response = await self.client.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
+            return await fetch_json(url, params, client=self.client, limiter=self.rate_limiter)
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error {e.response.status_code} for {endpoint}: {e}")
             if e.response.status_code == 429:  # Rate limited
-                retry_after = int(e.response.headers.get("Retry-After", 60))
-                logger.warning(f"Rate limited. Retrying after {retry_after} seconds.")
-                await asyncio.sleep(retry_after)
+                # Pause every in-flight task, not just this one; the retry
+                # then waits on the limiter
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                self.rate_limiter.pause(retry_after)
             raise
         except Exception as e:
             logger.error(f"Error making request to {endpoint}: {e}")
             raise
+    
+    async def iter_pages(
+        self,
+        resource_id: str,
+        params: Optional[Dict[str, Any]] = None,
+        page_size: int = None,
+        prefetch: int = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield the records of an offset/limit paginated resource one page at a
+        time. Up to `prefetch` following pages are requested while the caller
+        processes the current one, so at most prefetch + 1 pages are held.
+        """
+        page_size = page_size or DATA_GOV_PAGE_SIZE
+        prefetch = max(1, prefetch or DATA_GOV_PREFETCH)
+        params = dict(params or {})
+        
+        def request(offset: int) -> Tuple[int, asyncio.Task]:
+            return offset, asyncio.create_task(
+                self._make_request(resource_id, {**params, "offset": offset, "limit": page_size})
+            )
+        
+        pending = deque([request(0)])
+        next_offset = page_size
+        try:
+            while pending:
+                offset, task = pending.popleft()
+                data = await task
+                records = data.get("records") or []
+                try:
+                    total = int(data.get("total"))
+                except (TypeError, ValueError):
+                    total = None
+                if len(records) < page_size or (total is not None and offset + len(records) >= total):
+                    yield records
+                    break
+                while len(pending) < prefetch and (total is None or next_offset < total):
+                    pending.append(request(next_offset))
+                    next_offset += page_size
+                yield records
+        finally:
+            for _, task in pending:
+                task.cancel()
+    
+    async def iter_records(self, resource_id: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the records of a paginated resource one at a time"""
+        async for records in self.iter_pages(resource_id, params, **kwargs):
+            for record in records:
+                yield record
 
 class DataIngestionService:
-    """Service for ingesting MGNREGA data from data.gov.in"""
+    """
+    Service for ingesting MGNREGA data from data.gov.in.
+    
+    Each sync step is split into an async fetch (API only, no database
+    access) and a synchronous write. sync_all_data runs fetches
+    concurrently and funnels every write through a single writer task, so
+    the session is only ever used by one task at a time. State and national
+    rollups and district rankings of the months written are refreshed once
+    each sync finishes.
+    """
     
     def __init__(self, db: Session):
         self.db = db
         self.client = DataGovClient()
+        self.rollups = RollupTracker()
         
-    async def sync_all_data(self):
-        """Synchronize all available MGNREGA data"""
-        logger.info("Starting full MGNREGA data synchronization")
+    async def sync_all_data(self, concurrency: int = None) -> bool:
+        """Synchronize all available MGNREGA data with up to `concurrency` requests in flight"""
+        concurrency = max(1, concurrency or SYNC_CONCURRENCY)
+        logger.info(f"Starting full MGNREGA data synchronization (concurrency {concurrency})")
         
-        try:
-            # Step 1: Sync states
-            await self.sync_states()
-            
-            # Step 2: Sync districts for each state
-            states = self.db.query(State).all()
-            for state in states:
-                await self.sync_districts(state.id)
-            
-            # Step 3: Sync metrics for each district
-            districts = self.db.query(District).all()
-            for district in districts:
-                await self.sync_district_metrics(district.id)
-                
-            logger.info("MGNREGA data synchronization completed successfully")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error during data synchronization: {e}", exc_info=True)
+        with track_queries("sync_all_data") as queries:
+            try:
+                succeeded = await self._sync_all(concurrency)
+            except Exception as e:
+                logger.error(f"Error during data synchronization: {e}", exc_info=True)
+                succeeded = False
+        logger.info(f"Synchronization ran {queries.count} statements ({queries.seconds:.2f}s in the database)")
+        return succeeded
+    
+    async def _sync_all(self, concurrency: int) -> bool:
+        # Step 1: Sync states
+        await self.sync_states()
+        
+        # Step 2: Sync districts for each state
+        states = self.db.query(State.id, State.code).all()
+        failures = await self._fan_out(
+            states,
+            lambda state: self.fetch_districts(state.code),
+            lambda state, data: self.upsert_districts(state.id, data),
+            lambda state: invalidate_cache(state_ids=[state.id]),
+            concurrency,
+        )
+        
+        # Step 3: Sync metrics for each district
+        districts = [
+            DistrictRef(*row)
+            for row in self.db.query(
+                District.id, District.name, District.code, District.state_id, State.code
+            ).join(State, District.state_id == State.id).all()
+        ]
+        failures += await self._fan_out(
+            districts,
+            self.fetch_district_metrics,
+            self.upsert_district_metrics,
+            lambda district: invalidate_cache(district_ids=[district.id]),
+            concurrency,
+        )
+        
+        # Step 4: Refresh rollups and rankings of the months that changed
+        await self.refresh_aggregates()
+        
+        if failures:
+            logger.error(f"MGNREGA data synchronization finished with {failures} failures")
             return False
+        logger.info("MGNREGA data synchronization completed successfully")
+        return True
+    
+    async def _fan_out(
+        self,
+        items: List[Any],
+        fetch: Callable[[Any], Awaitable[List[Dict[str, Any]]]],
+        write: Callable[[Any, List[Dict[str, Any]]], UpsertResult],
+        invalidate: Callable[[Any], None],
+        concurrency: int,
+    ) -> int:
+        """
+        Fetch every item with at most `concurrency` fetches in flight, writing
+        results from a single writer task as they arrive and invalidating
+        caches for items whose rows changed. Returns the number of items
+        that failed; one failure doesn't stop the rest.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        semaphore = asyncio.Semaphore(concurrency)
+        failures = 0
+        
+        async def produce(item):
+            nonlocal failures
+            async with semaphore:
+                try:
+                    data = await fetch(item)
+                except Exception as e:
+                    logger.error(f"Failed to fetch {item}: {e}")
+                    failures += 1
+                    return
+            await queue.put((item, data))
+        
+        async def consume():
+            nonlocal failures
+            while True:
+                item, data = await queue.get()
+                try:
+                    # Off the event loop so fetches keep going; this task is
+                    # still the only user of the session. Cache invalidation
+                    # stays on the loop thread.
+                    result = await asyncio.to_thread(write, item, data)
+                    if result.written:
+                        invalidate(item)
+                except Exception as e:
+                    logger.error(f"Failed to write {item}: {e}", exc_info=True)
+                    self.db.rollback()
+                    failures += 1
+                finally:
+                    queue.task_done()
+        
+        writer = asyncio.create_task(consume())
+        try:
+            await asyncio.gather(*(produce(item) for item in items))
+            await queue.join()
+        finally:
+            writer.cancel()
+        return failures
     
     async def sync_states(self) -> List[State]:
         """Synchronize states data"""
         logger.info("Synchronizing states...")
-        
+        states_data = await self.fetch_states()
+        if self.upsert_states(states_data).written:
+            invalidate_cache(states=True)
+        return self.db.query(State).filter(
+            State.code.in_([state_data["state_code"] for state_data in states_data])
+        ).all()
+    
+    async def fetch_states(self) -> List[Dict[str, Any]]:
         # This is a mock implementation - replace with actual API call
         # Example: data = await self.client._make_request("mgnrega_states", {})
         
         # Mock data - replace with actual API response
-        states_data = [
+        return [
             {"state_name": "Uttar Pradesh", "state_code": "UP"},
             {"state_name": "Bihar", "state_code": "BR"},
             # Add more states as needed
         ]
-        
-        states = []
-        for state_data in states_data:
-            state = self.db.query(State).filter(
-                State.code == state_data["state_code"]
-            ).first()
-            
-            if not state:
-                state = State(
-                    name=state_data["state_name"],
-                    code=state_data["state_code"]
-                )
-                self.db.add(state)
-                self.db.commit()
-                self.db.refresh(state)
-                logger.info(f"Added new state: {state.name} ({state.code})")
-            else:
-                logger.debug(f"State already exists: {state.name} ({state.code})")
-                
-            states.append(state)
-            
-        return states
+    
+    def upsert_states(self, states_data: List[Dict[str, Any]]) -> UpsertResult:
+        result = self._upsert(
+            State,
+            (
+                {"name": state_data["state_name"], "code": state_data["state_code"]}
+                for state_data in states_data
+            ),
+            conflict_columns=["code"],
+        )
+        logger.info(
+            f"States synchronized: {result.inserted} added, {result.updated} updated, "
+            f"{result.unchanged} unchanged"
+        )
+        return result
     
     async def sync_districts(self, state_id: int) -> List[District]:
         """Synchronize districts for a state"""
@@ -129,40 +312,43 @@ class DataIngestionService:
             raise ValueError(f"State with ID {state_id} not found")
             
         logger.info(f"Synchronizing districts for {state.name}...")
-        
+        districts_data = await self.fetch_districts(state.code)
+        if self.upsert_districts(state_id, districts_data).written:
+            invalidate_cache(state_ids=[state_id])
+        return self.db.query(District).filter(
+            District.state_id == state_id,
+            District.name.in_([district_data["district_name"] for district_data in districts_data])
+        ).all()
+    
+    async def fetch_districts(self, state_code: str) -> List[Dict[str, Any]]:
         # This is a mock implementation - replace with actual API call
-        # Example: data = await self.client._make_request("mgnrega_districts", {"filters[state_code]": state.code})
+        # Example: data = await self.client._make_request("mgnrega_districts", {"filters[state_code]": state_code})
         
         # Mock data - replace with actual API response
-        districts_data = [
+        return [
             {"district_name": "Lucknow", "district_code": "LKO"},
             {"district_name": "Varanasi", "district_code": "VNS"},
             # Add more districts as needed
         ]
-        
-        districts = []
-        for district_data in districts_data:
-            district = self.db.query(District).filter(
-                District.state_id == state_id,
-                District.name == district_data["district_name"]
-            ).first()
-            
-            if not district:
-                district = District(
-                    name=district_data["district_name"],
-                    code=district_data.get("district_code"),
-                    state_id=state_id
-                )
-                self.db.add(district)
-                self.db.commit()
-                self.db.refresh(district)
-                logger.info(f"Added new district: {district.name}, {state.code}")
-            else:
-                logger.debug(f"District already exists: {district.name}, {state.code}")
-                
-            districts.append(district)
-            
-        return districts
+    
+    def upsert_districts(self, state_id: int, districts_data: List[Dict[str, Any]]) -> UpsertResult:
+        result = self._upsert(
+            District,
+            (
+                {
+                    "state_id": state_id,
+                    "name": district_data["district_name"],
+                    "code": district_data.get("district_code"),
+                }
+                for district_data in districts_data
+            ),
+            conflict_columns=["state_id", "name"],
+        )
+        logger.info(
+            f"Districts synchronized for state {state_id}: {result.inserted} added, "
+            f"{result.updated} updated, {result.unchanged} unchanged"
+        )
+        return result
     
     async def sync_district_metrics(self, district_id: int) -> List[MonthlyMetric]:
         """Synchronize metrics for a district"""
@@ -170,17 +356,29 @@ class DataIngestionService:
         if not district:
             raise ValueError(f"District with ID {district_id} not found")
             
-        logger.info(f"Synchronizing metrics for {district.name}, {district.state.code}...")
-        
+        ref = DistrictRef(district.id, district.name, district.code, district.state_id, district.state.code)
+        logger.info(f"Synchronizing metrics for {ref.name}, {ref.state_code}...")
+        metrics_data = await self.fetch_district_metrics(ref)
+        if self.upsert_district_metrics(ref, metrics_data).written:
+            invalidate_cache(district_ids=[district_id])
+            await self.refresh_aggregates()
+        return self.db.query(MonthlyMetric).filter(
+            MonthlyMetric.district_id == district_id,
+            MonthlyMetric.period.in_([
+                period_key(metric_data["year"], metric_data["month"]) for metric_data in metrics_data
+            ])
+        ).order_by(MonthlyMetric.period).all()
+    
+    async def fetch_district_metrics(self, district: DistrictRef) -> List[Dict[str, Any]]:
         # This is a mock implementation - replace with actual API call
         # Example: data = await self.client._make_request("mgnrega_metrics", {
-        #     "filters[state_code]": district.state.code,
+        #     "filters[state_code]": district.state_code,
         #     "filters[district_code]": district.code
         # })
         
         # Mock data - replace with actual API response
         current_year = datetime.now().year
-        metrics_data = [
+        return [
             {
                 "year": current_year - 1,
                 "month": 12,
@@ -203,54 +401,154 @@ class DataIngestionService:
             },
             # Add more months as needed
         ]
+    
+    def upsert_district_metrics(self, district: DistrictRef, metrics_data: List[Dict[str, Any]]) -> UpsertResult:
+        source_url = "https://data.gov.in/..."  # Replace with actual source URL
+        result = self._upsert(
+            MonthlyMetric,
+            (
+                {
+                    "district_id": district.id,
+                    "state_id": district.state_id,
+                    "year": metric_data["year"],
+                    "month": metric_data["month"],
+                    "period": period_key(metric_data["year"], metric_data["month"]),
+                    **{field: metric_data[field] for field in METRIC_FIELDS},
+                    "source_url": source_url,
+                }
+                for metric_data in metrics_data
+            ),
+            conflict_columns=["district_id", "period"],
+        )
+        logger.info(
+            f"Metrics synchronized for {district.name}: {result.inserted} added, "
+            f"{result.updated} updated, {result.unchanged} unchanged"
+        )
+        return result
+    
+    async def sync_metrics_resource(
+        self,
+        resource_id: str,
+        filters: Optional[Dict[str, Any]] = None,
+        page_size: int = None,
+    ) -> UpsertResult:
+        """Stream every record of a metrics resource into monthly_metrics"""
+        params = {f"filters[{name}]": value for name, value in (filters or {}).items()}
+        logger.info(f"Streaming metrics resource {resource_id} {filters or ''}")
+        with track_queries("sync_metrics_resource") as queries:
+            result = await self.ingest_metric_records(
+                self.client.iter_records(resource_id, params, page_size=page_size)
+            )
+        logger.info(f"Resource {resource_id} ran {queries.count} statements ({queries.seconds:.2f}s in the database)")
+        return result
+    
+    async def ingest_metric_records(
+        self,
+        records: AsyncIterable[Dict[str, Any]],
+        batch_size: int = UPSERT_BATCH_SIZE,
+    ) -> UpsertResult:
+        """
+        Parse raw records as they arrive and upsert them batch by batch, so
+        memory stays bounded by one batch plus the prefetched pages. Each
+        batch is written off the event loop while the next pages download.
+        Records for districts that aren't in the database are skipped.
+        """
+        lookup = self._district_lookup()
+        total = UpsertResult()
+        batch: List[Dict[str, Any]] = []
+        parsed = skipped = 0
         
-        metrics = []
-        for metric_data in metrics_data:
-            # Check if we already have this data
-            existing = self.db.query(MonthlyMetric).filter(
-                MonthlyMetric.district_id == district_id,
-                MonthlyMetric.year == metric_data["year"],
-                MonthlyMetric.month == metric_data["month"]
-            ).first()
-            
-            if existing:
-                logger.debug(f"Metrics already exist for {district.name}, {metric_data['year']}-{metric_data['month']}")
-                metrics.append(existing)
+        async for record in records:
+            row = parse_metric_record(record)
+            district = None
+            if row is not None:
+                district = lookup.get((row["state_name"].lower(), row["district_name"].lower()))
+            if district is None:
+                skipped += 1
                 continue
-                
-            # Create new metric
-            metric = MonthlyMetric(
-                district_id=district_id,
-                state_id=district.state_id,
-                year=metric_data["year"],
-                month=metric_data["month"],
-                total_households=metric_data["total_households"],
-                sc_households=metric_data["sc_households"],
-                st_households=metric_data["st_households"],
-                women_households=metric_data["women_households"],
-                total_works=metric_data["total_works"],
-                completed_works=metric_data["completed_works"],
-                in_progress_works=metric_data["in_progress_works"],
-                total_funds=metric_data["total_funds"],
-                funds_utilized=metric_data["funds_utilized"],
-                wage_expenditure=metric_data["wage_expenditure"],
-                material_expenditure=metric_data["material_expenditure"],
-                total_person_days=metric_data["total_person_days"],
-                sc_person_days=metric_data["sc_person_days"],
-                st_person_days=metric_data["st_person_days"],
-                women_person_days=metric_data["women_person_days"],
-                is_latest=metric_data.get("is_latest", False),
-                source_url="https://data.gov.in/..."  # Replace with actual source URL
-            )
-            
-            self.db.add(metric)
+            parsed += 1
+            for key in ("state_name", "state_code", "district_name", "district_code"):
+                del row[key]
+            row["district_id"], row["state_id"] = district
+            batch.append(row)
+            if len(batch) >= batch_size:
+                total += await self._write_metric_rows(batch)
+                batch = []
+        if batch:
+            total += await self._write_metric_rows(batch)
+        await self.refresh_aggregates()
+        
+        logger.info(
+            f"Ingested {parsed} metric records ({skipped} skipped): {total.inserted} added, "
+            f"{total.updated} updated, {total.unchanged} unchanged"
+        )
+        return total
+    
+    def _district_lookup(self) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """(state name, district name), lowercased -> (district_id, state_id)"""
+        rows = self.db.query(
+            State.name, District.name, District.id, District.state_id
+        ).join(State, District.state_id == State.id).all()
+        return {
+            (state_name.lower(), district_name.lower()): (district_id, state_id)
+            for state_name, district_name, district_id, state_id in rows
+        }
+    
+    async def _write_metric_rows(self, rows: List[Dict[str, Any]]) -> UpsertResult:
+        result = await asyncio.to_thread(
+            self._upsert, MonthlyMetric, rows, conflict_columns=["district_id", "period"]
+        )
+        if result.written:
+            invalidate_cache(district_ids=[row["district_id"] for row in rows])
+        return result
+    
+    async def refresh_aggregates(self) -> None:
+        """
+        Recompute rollups and rankings for the state-months written so far,
+        then bump their data versions and drop their cached responses
+        """
+        keys = await asyncio.to_thread(self.rollups.refresh, self.db)
+        if keys:
+            state_ids = {state_id for state_id, _ in keys}
+            periods = {period for _, period in keys}
+            await asyncio.to_thread(refresh_rankings, self.db, periods)
+            # Only the re-ranked months' rank blocks change, not every district's
+            rank_tags = await asyncio.to_thread(ranking_tags, self.db, periods)
+            await asyncio.to_thread(self._bump_versions, [
+                NATIONAL_ROLLUP_TAG, *rank_tags, *(state_rollup_tag(state_id) for state_id in state_ids)
+            ])
+            invalidate_cache(rollup_state_ids=state_ids, ranking_tags=rank_tags)
+    
+    def _bump_versions(self, tags: List[str]) -> None:
+        try:
+            bump_versions(self.db, tags)
             self.db.commit()
-            self.db.refresh(metric)
-            
-            logger.info(f"Added metrics for {district.name}, {metric.year}-{metric.month}")
-            metrics.append(metric)
-            
-        return metrics
+        except Exception:
+            self.db.rollback()
+            raise
+    
+    def _upsert(self, table: Any, rows: Iterable[Dict[str, Any]], conflict_columns: List[str]) -> UpsertResult:
+        """
+        bulk_upsert with ingestion throughput recorded for /metrics; written
+        rows bump their data versions in the same transaction, metric rows
+        also move their districts' latest pointers and mark their state-months
+        for a rollup refresh if anything changed
+        """
+        started = time.perf_counter()
+        keys: Set[Tuple[int, int]] = set()
+        hooks = WRITE_HOOKS.get(table, [])
+        if table is MonthlyMetric:
+            rows = collect_state_periods(rows, keys)
+        
+        def on_write(db: Session, written: List[Tuple[Any, ...]]) -> None:
+            for hook in hooks:
+                hook(db, written)
+        
+        result = bulk_upsert(self.db, table, rows, conflict_columns=conflict_columns, on_write=on_write)
+        record_ingestion(table.__tablename__, result, time.perf_counter() - started)
+        if result.written:
+            self.rollups.add(keys)
+        return result
     
     async def create_snapshot(self, data_type: str, state_id: int = None, district_id: int = None) -> DataSnapshot:
         """Create a snapshot of the current data"""
@@ -271,9 +569,8 @@ class DataIngestionService:
 
 # For testing
 def test_sync():
-    db = next(get_db())
+    db = next(get_sync_db())
     try:
-        import asyncio
         service = DataIngestionService(db)
         asyncio.run(service.sync_all_data())
     finally:
@@ -0,0 +1,138 @@
+"""
+Data Versions
+A version number and last-modified time per response-cache tag
+(district:<id>, state:<id>, rankings, ...), kept in data_versions. Writers
+bump the tags whose data they changed inside the same transaction, so a
+tag's version changes exactly when the responses carrying it can change.
+HTTP ETags and Last-Modified headers are built from the versions of a
+route's tags (see services/http_cache.py).
+
+Reads go through a small per-process cache, dropped for a tag whenever
+the response cache invalidates it (including invalidations published by
+other workers) and otherwise kept for RESPONSE_CACHE_TTL seconds, so a
+conditional GET usually costs no query at all.
+"""
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..db.models import DataVersion, District, State
+from .cache import (
+    NATIONAL_ROLLUP_TAG, RESPONSE_CACHE_TTL, STATES_TAG,
+    district_tag, state_rollup_tag, state_tag,
+)
+from .rankings import ranking_tags
+
+
+class TagVersion(NamedTuple):
+    version: int
+    updated_at: Optional[datetime]
+
+
+# Tags that have never been bumped
+UNVERSIONED = TagVersion(0, None)
+
+
+def bump_versions(db: Session, tags: Iterable[str]) -> None:
+    """Increment the versions of `tags` in the caller's transaction; does not commit"""
+    tags = sorted(set(tags))
+    if not tags:
+        return
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    now = datetime.utcnow()
+    stmt = insert(DataVersion).values([{"tag": tag, "version": 1, "updated_at": now} for tag in tags])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["tag"],
+        set_={"version": DataVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+def bump_all_versions(db: Session) -> None:
+    """Bump every tag, e.g. after seeding or a bulk rebuild; does not commit"""
+    state_ids = db.execute(select(State.id)).scalars().all()
+    district_ids = db.execute(select(District.id)).scalars().all()
+    bump_versions(db, [
+        STATES_TAG, NATIONAL_ROLLUP_TAG, *ranking_tags(db),
+        *(state_tag(state_id) for state_id in state_ids),
+        *(state_rollup_tag(state_id) for state_id in state_ids),
+        *(district_tag(district_id) for district_id in district_ids),
+    ])
+
+
+# bulk_upsert on_write hooks: keys are the written rows' conflict columns
+
+def bump_written_states(db: Session, keys: Iterable[Tuple[str]]) -> None:
+    bump_versions(db, [STATES_TAG])
+
+
+def bump_written_districts(db: Session, keys: Iterable[Tuple[int, str]]) -> None:
+    """(state_id, name) keys; district names also appear in each district's own responses"""
+    state_ids = sorted({state_id for state_id, _ in keys})
+    district_ids = db.execute(select(District.id).where(District.state_id.in_(state_ids))).scalars()
+    bump_versions(db, [
+        *(state_tag(state_id) for state_id in state_ids),
+        *(district_tag(district_id) for district_id in district_ids),
+    ])
+
+
+def bump_written_metrics(db: Session, keys: Iterable[Tuple[int, int]]) -> None:
+    """(district_id, period) keys"""
+    bump_versions(db, {district_tag(district_id) for district_id, _ in keys})
+
+
+class DataVersionCache:
+    """Per-process cache of tag versions"""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[TagVersion, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def lookup(self, db: AsyncSession, tags: Iterable[str]) -> Dict[str, TagVersion]:
+        """Versions of `tags`, reading the ones not cached in a single query"""
+        now = time.monotonic()
+        found: Dict[str, TagVersion] = {}
+        missing: List[str] = []
+        for tag in tags:
+            entry = self._entries.get(tag)
+            if entry is not None and entry[1] > now:
+                found[tag] = entry[0]
+            else:
+                missing.append(tag)
+        self.hits += len(found)
+        if not missing:
+            return found
+        self.misses += len(missing)
+
+        result = await db.execute(
+            select(DataVersion.tag, DataVersion.version, DataVersion.updated_at).where(DataVersion.tag.in_(missing))
+        )
+        loaded = {tag: TagVersion(version, updated_at) for tag, version, updated_at in result}
+        expires_at = now + self.ttl
+        for tag in missing:
+            found[tag] = loaded.get(tag, UNVERSIONED)
+            if self.ttl > 0:
+                self._entries[tag] = (found[tag], expires_at)
+        return found
+
+    def invalidate(self, tags: Optional[List[str]]) -> None:
+        """Response cache listener: forget the invalidated tags (all of them on a clear)"""
+        if tags is None:
+            self._entries.clear()
+            return
+        for tag in tags:
+            self._entries.pop(tag, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Process-wide version cache used by the API routes
+data_versions = DataVersionCache()
@@ -0,0 +1,308 @@
+"""
+Bulk Export
+Monthly metrics joined to their district and state, filtered by state,
+district set and period range, streamed as CSV, NDJSON or Parquet.
+
+Rows are read through a server-side cursor (stream_results / yield_per)
+in partitions of EXPORT_CHUNK_ROWS and each partition is encoded and sent
+before the next is fetched, so memory stays flat whatever the export
+size. Parquet writes one row group per partition.
+
+Output is deterministic for a given data version (rows are ordered by
+district and period), so byte ranges of an export are stable. A Range
+request writes the export once to a spool file named after its ETag and
+serves ranges from the file; later ranges of the same version reuse it.
+"""
+import asyncio
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from ..db.base import AsyncSessionLocal
+from ..db.models import METRIC_FIELDS, District, MonthlyMetric, State, period_key
+
+# Rows fetched and encoded per partition (and per Parquet row group)
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+# Where Range requests spool exports, and how long spool files are kept
+EXPORT_SPOOL_DIR = Path(os.getenv("EXPORT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "mgnrega-exports")))
+EXPORT_SPOOL_TTL = float(os.getenv("EXPORT_SPOOL_TTL", "3600"))
+
+# Bytes read per chunk when serving a range from a spool file
+SPOOL_READ_SIZE = 256 * 1024
+
+# Exported columns: output name -> column
+EXPORT_COLUMNS = {
+    "state_id": State.id,
+    "state_code": State.code,
+    "state_name": State.name,
+    "district_id": District.id,
+    "district_code": District.code,
+    "district_name": District.name,
+    "year": MonthlyMetric.year,
+    "month": MonthlyMetric.month,
+    **{field: getattr(MonthlyMetric, field) for field in METRIC_FIELDS},
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parse_period(text: str) -> int:
+    """Period key of a YYYY-MM month; raises ValueError for anything else"""
+    year, _, month = text.partition("-")
+    if not (year.isdigit() and month.isdigit() and len(year) == 4 and 1 <= int(month) <= 12):
+        raise ValueError(f"Invalid month {text!r}, expected YYYY-MM")
+    return period_key(int(year), int(month))
+
+
+def export_query(
+    state_id: Optional[int] = None,
+    district_ids: Optional[Sequence[int]] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> Select:
+    """Exported rows in (district_id, period) order, the order of the metrics index"""
+    query = select(*EXPORT_COLUMNS.values()).join(
+        District, MonthlyMetric.district_id == District.id
+    ).join(
+        State, District.state_id == State.id
+    )
+    if state_id is not None:
+        query = query.filter(MonthlyMetric.state_id == state_id)
+    if district_ids:
+        query = query.filter(MonthlyMetric.district_id.in_(district_ids))
+    if start is not None:
+        query = query.filter(MonthlyMetric.period >= start)
+    if end is not None:
+        query = query.filter(MonthlyMetric.period <= end)
+    return query.order_by(MonthlyMetric.district_id, MonthlyMetric.period)
+
+
+class CsvEncoder:
+    def header(self) -> bytes:
+        return self.encode([list(EXPORT_COLUMNS)])
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode()
+
+    def close(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        names = list(EXPORT_COLUMNS)
+        return b"".join(orjson.dumps(dict(zip(names, row))) + b"\n" for row in rows)
+
+    def close(self) -> bytes:
+        return b""
+
+
+class ParquetEncoder:
+    """
+    Writes one row group per encode() into an in-memory sink that is drained
+    after each call. pyarrow is optional and imported here, on the first
+    Parquet export, rather than at app startup.
+    """
+
+    ARROW_TYPES = {int: "int64", float: "float64", str: "string"}
+
+    def __init__(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow")
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([
+            (name, getattr(pyarrow, self.ARROW_TYPES[column.type.python_type])())
+            for name, column in EXPORT_COLUMNS.items()
+        ])
+        self.sink = io.BytesIO()
+        self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema)
+
+    def _drain(self) -> bytes:
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+    def header(self) -> bytes:
+        return self._drain()
+
+    def encode(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        columns = list(zip(*rows))
+        self.writer.write_batch(self.pyarrow.record_batch(
+            [self.pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+        return self._drain()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self._drain()
+
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "parquet": ParquetEncoder}
+
+
+def format_available(format: str) -> bool:
+    return format != "parquet" or importlib.util.find_spec("pyarrow") is not None
+
+
+def encoder_for(format: str) -> Any:
+    """Encoder of a format; raises RuntimeError if its optional dependency is missing"""
+    return ENCODERS[format]()
+
+
+def iter_export(db: Session, query: Select, format: str, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Encoded chunks of an export read with a sync session (scripts)"""
+    encoder = encoder_for(format)
+    yield encoder.header()
+    result = db.execute(query.execution_options(stream_results=True, yield_per=chunk_rows))
+    for rows in result.partitions():
+        yield encoder.encode(rows)
+    yield encoder.close()
+
+
+async def stream_export(query: Select, format: str, chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    """
+    Encoded chunks of an export. Uses its own session, which stays open for
+    as long as the response streams; partitions are encoded off the event loop.
+    """
+    encoder = encoder_for(format)
+    yield encoder.header()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_rows))
+        async for rows in result.partitions():
+            yield await asyncio.to_thread(encoder.encode, rows)
+    yield encoder.close()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """gzip Content-Encoding of a chunk stream, compressed as it is sent"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    (first, last) byte of a single `bytes=` range. Returns None for a header
+    this doesn't serve as a range (multiple ranges, other units, malformed),
+    which gets the whole export; raises ValueError if it is unsatisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    first, dash, last = spec.strip().partition("-")
+    if unit.strip() != "bytes" or not dash or not (first or last):
+        return None
+    if not (first.isdigit() or not first) or not (last.isdigit() or not last):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError(header)
+        return max(0, size - int(last)), size - 1
+    first, last = int(first), min(int(last), size - 1) if last else size - 1
+    if first >= size:
+        raise ValueError(header)
+    if last < first:
+        return None
+    return first, last
+
+
+def _prune_spool(now: float) -> None:
+    for path in EXPORT_SPOOL_DIR.glob("*"):
+        try:
+            if now - path.stat().st_mtime > EXPORT_SPOOL_TTL:
+                path.unlink()
+        except OSError:  # already removed, or still open elsewhere (Windows)
+            pass
+
+
+def _open_spooled(path: Path) -> Tuple[BinaryIO, int]:
+    file = open(path, "rb")
+    return file, os.fstat(file.fileno()).st_size
+
+
+async def spool_export(name: str, query: Select, format: str) -> Tuple[BinaryIO, int]:
+    """
+    The export written to EXPORT_SPOOL_DIR/<name> (built unless a fresh copy
+    is there), opened for reading, and its size. The caller reads through the
+    open handle, which stays valid if another request prunes the file.
+    """
+    path = EXPORT_SPOOL_DIR / name
+    now = time.time()
+    try:
+        if now - path.stat().st_mtime <= EXPORT_SPOOL_TTL:
+            return _open_spooled(path)
+    except FileNotFoundError:
+        pass
+    EXPORT_SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    await asyncio.to_thread(_prune_spool, now)
+
+    # Written under a unique name and renamed, so concurrent builds never
+    # expose a partial file
+    partial = EXPORT_SPOOL_DIR / f".{name}.{uuid.uuid4().hex}"
+    try:
+        with open(partial, "wb") as file:
+            async for chunk in stream_export(query, format):
+                await asyncio.to_thread(file.write, chunk)
+        spooled = _open_spooled(partial)
+        os.replace(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
+    return spooled
+
+
+async def read_range(file: BinaryIO, first: int, last: int) -> AsyncIterator[bytes]:
+    """Bytes first..last (inclusive) of an open spool file, which is closed when done"""
+    with file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            data = await asyncio.to_thread(file.read, min(SPOOL_READ_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def accepts_gzip(header: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip"""
+    for coding in (header or "").lower().split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def export_filename(format: str, state_id: Optional[int], start: Optional[str], end: Optional[str]) -> str:
+    parts: List[str] = ["mgnrega-metrics"]
+    if state_id is not None:
+        parts.append(f"state-{state_id}")
+    if start or end:
+        parts.append(f"{start or 'start'}_{end or 'latest'}")
+    return f"{'-'.join(parts)}.{format}"
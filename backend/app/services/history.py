@@ -0,0 +1,240 @@
+"""
+District History
+Monthly history of a district, optionally rolled up into fiscal quarters or
+fiscal years (April-March, as MGNREGA reports) and downsampled to a point
+budget for long ranges.
+
+The database path reads the range in one statement: the district's latest
+period is a primary-key lookup of its latest-row pointer inside the same
+query, and the range is a single scan of the (district_id, period) index
+that selects only the charted columns. The columnar store hands over the same arrays from
+memory. Bucketing, aggregation and downsampling all work on NumPy arrays.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import Select, select
+
+from ..db.models import DistrictLatestMetric, MonthlyMetric
+
+# Charted fields: response name -> monthly_metrics column
+HISTORY_FIELDS = {
+    "households": "total_households",
+    "person_days": "total_person_days",
+    "works_completed": "completed_works",
+    "funds_utilized": "funds_utilized",
+}
+# Households are counted afresh every month, so a quarter / year reports
+# the monthly average; the other fields are flows and add up
+DEFAULT_AGGREGATION = {
+    "households": "avg",
+    "person_days": "sum",
+    "works_completed": "sum",
+    "funds_utilized": "sum",
+}
+AGGREGATIONS = ("sum", "avg")
+
+# First month of the fiscal year
+FISCAL_YEAR_START = 4
+
+_INTEGER_FIELDS = {
+    name for name, column in HISTORY_FIELDS.items()
+    if getattr(MonthlyMetric, column).type.python_type is int
+}
+
+
+@dataclass
+class HistorySeries:
+    """A district's months in period order, one float array per field (NaN = no value)"""
+    periods: np.ndarray
+    values: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+
+def history_query(district_id: int, years: int) -> Select:
+    """Periods and charted columns from `years` before the district's latest month"""
+    latest_period = select(DistrictLatestMetric.period).filter(
+        DistrictLatestMetric.district_id == district_id
+    ).scalar_subquery()
+    return select(
+        MonthlyMetric.period,
+        *[getattr(MonthlyMetric, column) for column in HISTORY_FIELDS.values()],
+    ).filter(
+        MonthlyMetric.district_id == district_id,
+        MonthlyMetric.period >= latest_period - years * 100
+    ).order_by(MonthlyMetric.period.asc())
+
+
+def series_from_rows(rows: List[Any]) -> HistorySeries:
+    """HistorySeries from history_query rows"""
+    if not rows:
+        return HistorySeries(np.zeros(0, dtype=np.int64), {name: np.zeros(0) for name in HISTORY_FIELDS})
+    # NULLs become NaN in a float array
+    table = np.array(rows, dtype=np.float64).reshape(len(rows), len(HISTORY_FIELDS) + 1)
+    return HistorySeries(
+        table[:, 0].astype(np.int64),
+        {name: table[:, index + 1] for index, name in enumerate(HISTORY_FIELDS)},
+    )
+
+
+def parse_aggregation(text: Optional[str]) -> Dict[str, str]:
+    """
+    Aggregation per field from `sum`, `avg` (every field) or pairs such as
+    `households:sum,funds_utilized:avg` (others keep their default).
+    Raises ValueError for unknown fields or aggregations.
+    """
+    aggregation = dict(DEFAULT_AGGREGATION)
+    if not text:
+        return aggregation
+    if text in AGGREGATIONS:
+        return {name: text for name in HISTORY_FIELDS}
+    for pair in text.split(","):
+        name, _, method = pair.strip().partition(":")
+        if name not in HISTORY_FIELDS or method not in AGGREGATIONS:
+            raise ValueError(f"Invalid aggregation {pair.strip()!r}")
+        aggregation[name] = method
+    return aggregation
+
+
+def fiscal_year(periods: np.ndarray) -> np.ndarray:
+    """Starting calendar year of each period's fiscal year"""
+    years, months = periods // 100, periods % 100
+    return years - (months < FISCAL_YEAR_START)
+
+
+def bucket_starts(periods: np.ndarray, granularity: str) -> np.ndarray:
+    """Period of the first month of each period's month / fiscal quarter / fiscal year"""
+    if granularity == "month":
+        return periods
+    fiscal_years = fiscal_year(periods)
+    # Months since the start of the fiscal year, 0-11
+    offsets = (periods % 100 - FISCAL_YEAR_START) % 12
+    if granularity == "fy":
+        offsets = np.zeros_like(offsets)
+    else:
+        offsets = offsets - offsets % 3
+    months = (FISCAL_YEAR_START - 1 + offsets) % 12 + 1
+    years = fiscal_years + (months < FISCAL_YEAR_START)
+    return years * 100 + months
+
+
+def aggregate(series: HistorySeries, granularity: str, aggregation: Dict[str, str]) -> HistorySeries:
+    """
+    One row per bucket (keyed by its first month's period) with each field
+    summed or averaged over the months that have a value; also returns the
+    number of months in each bucket as values["months"]
+    """
+    starts = bucket_starts(series.periods, granularity)
+    keys, inverse = np.unique(starts, return_inverse=True)
+    months = np.bincount(inverse, minlength=len(keys))
+    values = {"months": months.astype(np.float64)}
+    for name, column in series.values.items():
+        present = ~np.isnan(column)
+        totals = np.bincount(inverse, weights=np.where(present, column, 0.0), minlength=len(keys))
+        counts = np.bincount(inverse, weights=present, minlength=len(keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = totals / counts if aggregation[name] == "avg" else totals
+        values[name] = np.where(counts > 0, result, np.nan)
+    return HistorySeries(keys, values)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points of (x, y)
+    that keep the shape of the curve. y has one column per series; a point
+    is scored by the summed triangle area over all of them, so every series
+    keeps the same x positions. Each output bucket is scored in one array
+    operation (the loop runs once per output point, not per input point).
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # Interior points are split into threshold - 2 buckets; the first and
+    # last points are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for bucket in range(threshold - 2):
+        low, high = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_low, next_high = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_low, next_high = n - 1, n
+        mean_x = x[next_low:next_high].mean()
+        mean_y = y[next_low:next_high].mean(axis=0)
+        areas = np.abs(
+            (x[anchor] - mean_x) * (y[low:high] - y[anchor])
+            - (x[anchor] - x[low:high])[:, None] * (mean_y - y[anchor])
+        ).sum(axis=1)
+        anchor = low + int(np.argmax(areas))
+        selected[bucket + 1] = anchor
+    return selected
+
+
+def downsample(series: HistorySeries, points: int) -> HistorySeries:
+    """At most `points` rows of series chosen by LTTB over every field (scaled to 0-1)"""
+    if len(series) <= points:
+        return series
+    x = (series.periods // 100) * 12 + series.periods % 100
+    columns = []
+    for name in HISTORY_FIELDS:
+        column = series.values[name]
+        present = column[~np.isnan(column)]
+        if not len(present) or present.max() == present.min():
+            continue
+        columns.append(np.nan_to_num((column - present.min()) / (present.max() - present.min())))
+    y = np.column_stack(columns) if columns else np.zeros((len(series), 1))
+    keep = lttb(x.astype(np.float64), y, points)
+    return HistorySeries(series.periods[keep], {name: column[keep] for name, column in series.values.items()})
+
+
+def _value(value: float, integer: bool, average: bool) -> Any:
+    if np.isnan(value):
+        return None
+    if integer:
+        return int(round(value))
+    return round(value, 2) if average else value
+
+
+def history_points(
+    series: HistorySeries,
+    granularity: str = "month",
+    aggregation: Optional[Dict[str, str]] = None,
+    points: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    History as API points, oldest first. Monthly points are the district's
+    rows as stored; quarter / fy points are dated by their first month and
+    add the fiscal year label, quarter and number of months they cover.
+    """
+    aggregation = aggregation or DEFAULT_AGGREGATION
+    if granularity != "month":
+        series = aggregate(series, granularity, aggregation)
+    if points:
+        series = downsample(series, points)
+
+    periods = series.periods.tolist()
+    columns = {}
+    for name in HISTORY_FIELDS:
+        # A month is its own value whatever the aggregation
+        average = granularity != "month" and aggregation[name] == "avg"
+        integer = name in _INTEGER_FIELDS and not average
+        columns[name] = [_value(value, integer, average) for value in series.values[name].tolist()]
+    result = []
+    for index, period in enumerate(periods):
+        year, month = divmod(period, 100)
+        point: Dict[str, Any] = {"year": year, "month": month}
+        if granularity != "month":
+            start = year - (month < FISCAL_YEAR_START)
+            point["fiscal_year"] = f"{start}-{(start + 1) % 100:02d}"
+            if granularity == "quarter":
+                point["quarter"] = (month - FISCAL_YEAR_START) % 12 // 3 + 1
+            point["months"] = int(series.values["months"][index])
+        for name in HISTORY_FIELDS:
+            point[name] = columns[name][index]
+        result.append(point)
+    return result
@@ -0,0 +1,128 @@
+"""
+HTTP Caching
+Validators and Cache-Control for the read endpoints, so browsers and the
+nginx proxy cache can reuse responses and revalidate them cheaply.
+
+A response's strong ETag is derived from its cache key and the data
+versions of its tags (services/data_versions.py), and Last-Modified is the
+latest time any of those tags was bumped. Both are known before the payload
+is loaded, so a matching If-None-Match (or, without one, If-Modified-Since)
+is answered with 304 Not Modified without running the route's queries.
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import response_cache
+from .data_versions import data_versions
+
+# Freshness (seconds) of metric responses, and how long caches may keep
+# serving a stale copy while they revalidate it in the background
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "300"))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", "3600"))
+# Freshness of the state / district lists, which rarely change
+HTTP_CACHE_REFERENCE_MAX_AGE = int(os.getenv("HTTP_CACHE_REFERENCE_MAX_AGE", "3600"))
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Cache-Control of a route"""
+    max_age: int
+    stale_while_revalidate: int = 0
+
+    @property
+    def header(self) -> str:
+        directives = ["public", f"max-age={self.max_age}"]
+        if self.stale_while_revalidate:
+            directives.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        return ", ".join(directives)
+
+
+METRICS_POLICY = CachePolicy(HTTP_CACHE_MAX_AGE, HTTP_CACHE_STALE_WHILE_REVALIDATE)
+REFERENCE_POLICY = CachePolicy(HTTP_CACHE_REFERENCE_MAX_AGE, HTTP_CACHE_STALE_WHILE_REVALIDATE)
+
+
+def http_date(value: datetime) -> str:
+    """IMF-fixdate of a naive UTC datetime"""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        return parsed
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so W/ prefixes are ignored"""
+    if header.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in header.split(",")
+    )
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether the client's copy is current (RFC 9110: If-None-Match wins over If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    since = _parse_http_date(if_modified_since)
+    return since is not None and last_modified.replace(microsecond=0) <= since
+
+
+async def validators(db: AsyncSession, key: str, tags: Iterable[str]) -> Tuple[str, Optional[datetime]]:
+    """
+    (digest, last modified) of a response from its cache key and its tags'
+    data versions; the strong ETag is the quoted digest
+    """
+    tags = sorted(set(tags))
+    versions = await data_versions.lookup(db, tags)
+    fingerprint = ";".join(f"{tag}={versions[tag].version}" for tag in tags)
+    digest = hashlib.blake2b(f"{key}@{fingerprint}".encode(), digest_size=16).hexdigest()
+    # A tag that was never bumped has no time, and then neither has the response
+    updated = [versions[tag].updated_at for tag in tags]
+    last_modified = max(updated) if updated and None not in updated else None
+    return digest, last_modified
+
+
+async def conditional_response(
+    request: Request,
+    db: AsyncSession,
+    key: str,
+    load: Callable[[], Any],
+    tags: Iterable[str],
+    policy: CachePolicy = METRICS_POLICY,
+) -> Response:
+    """
+    The route's payload (through the response cache) with ETag,
+    Last-Modified and Cache-Control, or 304 if the client's copy is current
+    """
+    tags = sorted(set(tags))
+    digest, last_modified = await validators(db, key, tags)
+    etag = f'"{digest}"'
+
+    headers: Dict[str, str] = {"ETag": etag, "Cache-Control": policy.header}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    # Keyed on the versions too, so a payload is only ever sent with the ETag it was loaded under
+    payload = await response_cache.get_or_load(f"{key}@{digest}", load, tags=tags)
+    return ORJSONResponse(content=payload, headers=headers)
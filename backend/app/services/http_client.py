@@ -0,0 +1,116 @@
+"""
+Upstream HTTP Client
+Process-wide pooled httpx client for data.gov.in, shared by
+MGNREGAAPIService and DataGovClient so connections (and their TLS
+sessions) are kept alive and reused instead of set up per call.
+Concurrent identical GETs are coalesced into one upstream request.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Hashable, Optional
+
+import httpx
+
+from .cache import SingleFlight
+from .metrics import UPSTREAM_LATENCY
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "30"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "20"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "10"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+# Needs the h2 package (pip install httpx[http2]); ignored without it
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "false").lower() == "true"
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Shared by every upstream GET; waiters get the leader's result or exception
+upstream_flight = SingleFlight()
+upstream_requests = 0
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    The pooled client for the running event loop. A client can't be used
+    from another loop, so a new one is created when the loop changes (e.g.
+    successive asyncio.run() calls in scripts).
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        http2 = UPSTREAM_HTTP2 and _http2_available()
+        if UPSTREAM_HTTP2 and not http2:
+            logger.warning("UPSTREAM_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+        _client = httpx.AsyncClient(
+            timeout=UPSTREAM_TIMEOUT,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+def request_key(url: str, params: Dict[str, Any]) -> Hashable:
+    return url, tuple(sorted((str(name), str(value)) for name, value in params.items()))
+
+
+async def fetch_json(
+    url: str,
+    params: Dict[str, Any],
+    client: Optional[httpx.AsyncClient] = None,
+    limiter: Optional[TokenBucket] = None,
+) -> Any:
+    """
+    GET url and decode the JSON body, raising httpx.HTTPStatusError for
+    error responses. Concurrent calls with the same url and params share
+    one request, which alone takes a token from `limiter`.
+    """
+    async def load():
+        global upstream_requests
+        if limiter is not None:
+            await limiter.acquire()
+        upstream_requests += 1
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await (client or get_http_client()).get(url, params=params)
+            status = str(response.status_code)
+        finally:
+            UPSTREAM_LATENCY.labels(status=status).observe(time.perf_counter() - started)
+        response.raise_for_status()
+        return response.json()
+
+    return await upstream_flight.do(request_key(url, params), load)
+
+
+def upstream_stats() -> Dict[str, Any]:
+    return {
+        "requests": upstream_requests,
+        "coalesced": upstream_flight.shared,
+        "http2": bool(_client is not None and UPSTREAM_HTTP2 and _http2_available()),
+    }
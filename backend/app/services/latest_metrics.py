@@ -0,0 +1,144 @@
+"""
+Latest Metrics
+district_latest_metrics points at each district's latest monthly_metrics
+row (its period and row id), and monthly_metrics.is_latest flags that row.
+The routes read "latest" through the pointer, a primary-key lookup, rather
+than by sorting or grouping a district's months.
+
+The ingestion upsert refreshes the pointers and flags of the districts a
+batch wrote inside that batch's transaction, so a committed metric row
+never lacks its pointer. Pointers are recomputed from monthly_metrics (one
+max() per district on the (district_id, period) index) rather than
+compared with the written rows, so corrections and deletions are handled
+the same way. check_latest / repair_latest find and fix drift in existing
+databases (scripts/repair_latest.py).
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import DateTime, Select, delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from ..db.models import DistrictLatestMetric, MonthlyMetric
+
+logger = logging.getLogger(__name__)
+
+# Districts per pointer refresh statement
+DISTRICT_CHUNK_SIZE = 500
+
+
+def latest_rows(district_ids: Optional[Iterable[int]] = None) -> Select:
+    """district_id, state_id, period and metric_id of each district's latest row"""
+    metrics = MonthlyMetric.__table__
+    newest = select(
+        metrics.c.district_id, func.max(metrics.c.period).label("period")
+    ).group_by(metrics.c.district_id)
+    if district_ids is not None:
+        newest = newest.where(metrics.c.district_id.in_(district_ids))
+    newest = newest.subquery()
+    return select(
+        metrics.c.district_id,
+        metrics.c.state_id,
+        metrics.c.period,
+        metrics.c.id.label("metric_id"),
+    ).join(
+        newest,
+        (metrics.c.district_id == newest.c.district_id) & (metrics.c.period == newest.c.period)
+    )
+
+
+def _refresh(db: Session, district_ids: Optional[list]) -> None:
+    metrics = MonthlyMetric.__table__
+    pointers = DistrictLatestMetric.__table__
+    source = latest_rows(district_ids).subquery()
+    stale = delete(pointers)
+    flagged = [metrics.c.is_latest.is_(True)]
+    unflagged = [metrics.c.is_latest.is_not(True)]
+    if district_ids is not None:
+        stale = stale.where(pointers.c.district_id.in_(district_ids))
+        flagged.append(metrics.c.district_id.in_(district_ids))
+        unflagged.append(metrics.c.district_id.in_(district_ids))
+
+    db.execute(stale)
+    db.execute(insert(pointers).from_select(
+        ["district_id", "state_id", "period", "metric_id", "updated_at"],
+        select(
+            source.c.district_id, source.c.state_id, source.c.period, source.c.metric_id,
+            literal(datetime.utcnow(), DateTime),
+        ),
+    ))
+    # Only rows whose flag is wrong are rewritten, and updated_at is kept:
+    # the flag isn't data, so it mustn't move the rows' Last-Modified
+    latest_ids = select(pointers.c.metric_id)
+    if district_ids is not None:
+        latest_ids = latest_ids.where(pointers.c.district_id.in_(district_ids))
+    db.execute(update(metrics).where(*flagged, metrics.c.id.notin_(latest_ids)).values(
+        is_latest=False, updated_at=metrics.c.updated_at
+    ))
+    db.execute(update(metrics).where(*unflagged, metrics.c.id.in_(latest_ids)).values(
+        is_latest=True, updated_at=metrics.c.updated_at
+    ))
+
+
+def update_latest(db: Session, district_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Recompute the pointers and is_latest flags of `district_ids` (default:
+    every district) in the caller's transaction; does not commit
+    """
+    if district_ids is None:
+        _refresh(db, None)
+        return
+    district_ids = sorted(set(district_ids))
+    for start in range(0, len(district_ids), DISTRICT_CHUNK_SIZE):
+        _refresh(db, district_ids[start:start + DISTRICT_CHUNK_SIZE])
+
+
+def on_metrics_written(db: Session, keys: Iterable[Tuple[int, int]]) -> None:
+    """bulk_upsert on_write hook for monthly_metrics: keys are the written (district_id, period) pairs"""
+    update_latest(db, {district_id for district_id, _ in keys})
+
+
+def check_latest(db: Session) -> Dict[str, int]:
+    """
+    Count pointer and flag drift: districts with metrics but no pointer
+    (missing), pointers to a row that isn't the latest (stale), pointers for
+    districts without metrics (orphaned) and rows flagged wrongly (flags)
+    """
+    metrics = MonthlyMetric.__table__
+    pointers = DistrictLatestMetric.__table__
+    expected = latest_rows().subquery()
+
+    def count(query: Any) -> int:
+        return db.execute(select(func.count()).select_from(query.subquery())).scalar()
+
+    missing = count(select(expected.c.district_id).outerjoin(
+        pointers, pointers.c.district_id == expected.c.district_id
+    ).where(pointers.c.district_id.is_(None)))
+    stale = count(select(expected.c.district_id).join(
+        pointers, pointers.c.district_id == expected.c.district_id
+    ).where(
+        (pointers.c.metric_id != expected.c.metric_id) | (pointers.c.period != expected.c.period)
+    ))
+    orphaned = count(select(pointers.c.district_id).outerjoin(
+        expected, expected.c.district_id == pointers.c.district_id
+    ).where(expected.c.district_id.is_(None)))
+    latest_ids = select(expected.c.metric_id)
+    flags = count(select(metrics.c.id).where(
+        (metrics.c.is_latest.is_(True) & metrics.c.id.notin_(latest_ids)) |
+        (metrics.c.is_latest.is_not(True) & metrics.c.id.in_(latest_ids))
+    ))
+    return {"missing": missing, "stale": stale, "orphaned": orphaned, "flags": flags}
+
+
+def repair_latest(db: Session) -> Dict[str, int]:
+    """Rebuild every pointer and flag in one transaction; returns the drift found beforehand"""
+    drift = check_latest(db)
+    try:
+        update_latest(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info(f"Rebuilt latest-metric pointers: {drift}")
+    return drift
@@ -0,0 +1,228 @@
+"""
+Prometheus Metrics
+HTTP, cache, upstream and ingestion metrics, the ASGI middleware that
+records per-route request metrics, and the /metrics exposition.
+
+Requests are labelled with their route template (e.g.
+/api/v1/metrics/district/{district_id}), never the raw path, so label
+cardinality is bounded by the number of routes. When several worker
+processes share PROMETHEUS_MULTIPROC_DIR, /metrics aggregates them; the
+stats-based collectors (caches, pool) then report only the scraped worker.
+"""
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..db.instrumentation import QUERY_DEBUG_HEADER, current_query_stats, track_queries
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Label for requests that match no route (404s, scanners)
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being handled", ["method", "route"],
+    multiprocess_mode="livesum",
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size", ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL queries per HTTP request", ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request", ["method", "route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "data.gov.in request latency", ["status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "data.gov.in requests retried after a failure")
+
+INGESTION_ROWS = Counter(
+    "ingestion_rows_total", "Rows written by data ingestion", ["table", "outcome"]
+)
+INGESTION_BATCH_DURATION = Histogram(
+    "ingestion_batch_duration_seconds", "Time to upsert one ingestion batch", ["table"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+INGESTION_ROWS_PER_SECOND = Gauge(
+    "ingestion_rows_per_second", "Upsert throughput of the latest ingestion batch", ["table"],
+    multiprocess_mode="max",
+)
+
+COLUMNAR_STORE_ROWS = Gauge(
+    "columnar_store_rows", "Rows held by the in-memory columnar metrics store", multiprocess_mode="max"
+)
+COLUMNAR_STORE_BYTES = Gauge(
+    "columnar_store_bytes", "Array memory of the columnar metrics store (summed over workers)",
+    multiprocess_mode="livesum",
+)
+COLUMNAR_STORE_REFRESH_SECONDS = Histogram(
+    "columnar_store_refresh_seconds", "Time to load a columnar metrics store snapshot",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+
+# Collectors that read this process's own stats; in multiprocess mode
+# they report the worker that served the scrape
+_process_collectors = []
+
+
+def register_collector(collector: Any) -> None:
+    _process_collectors.append(collector)
+    REGISTRY.register(collector)
+
+
+def record_ingestion(table: str, result: Any, seconds: float) -> None:
+    """Record one bulk upsert (an UpsertResult) of ingested rows"""
+    for outcome in ("inserted", "updated", "unchanged"):
+        INGESTION_ROWS.labels(table=table, outcome=outcome).inc(getattr(result, outcome))
+    INGESTION_BATCH_DURATION.labels(table=table).observe(seconds)
+    rows = result.inserted + result.updated + result.unchanged
+    if seconds > 0 and rows:
+        INGESTION_ROWS_PER_SECOND.labels(table=table).set(rows / seconds)
+
+
+def record_retry(retry_state: Any) -> None:
+    """tenacity before_sleep hook"""
+    UPSTREAM_RETRIES.inc()
+
+
+class StatsCollector:
+    """
+    Exposes the counters of components that keep their own stats() dicts
+    (response / shared / API caches, upstream client) at scrape time
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Dict[str, Any]]]):
+        self.sources = sources
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Cache hits / lookups since start", labels=["cache"])
+        upstream = None
+        for name, stats in self.sources.items():
+            values = stats()
+            if name == "upstream":
+                upstream = values
+                continue
+            hits.add_metric([name], values.get("hits") or 0)
+            misses.add_metric([name], values.get("misses") or 0)
+            if values.get("hit_ratio") is not None:
+                ratio.add_metric([name], values["hit_ratio"])
+        yield hits
+        yield misses
+        yield ratio
+        if upstream is not None:
+            yield CounterMetricFamily(
+                "upstream_requests", "data.gov.in requests sent", value=upstream["requests"]
+            )
+            yield CounterMetricFamily(
+                "upstream_coalesced", "Requests served by another caller's in-flight request",
+                value=upstream["coalesced"],
+            )
+
+
+def route_template(scope: Scope) -> str:
+    """The path template of the route that will handle this request"""
+    app = scope.get("app")
+    partial: Optional[str] = None
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path  # path matches, method doesn't (405)
+    return partial or UNMATCHED_ROUTE
+
+
+def query_debug_headers() -> List[Tuple[bytes, bytes]]:
+    """Query count / DB time of the current request as response headers"""
+    stats = current_query_stats()
+    if stats is None:
+        return []
+    milliseconds = f"{stats.seconds * 1000:.2f}"
+    return [
+        (b"x-db-queries", str(stats.count).encode()),
+        (b"x-db-time-ms", milliseconds.encode()),
+        (b"server-timing", f'db;dur={milliseconds};desc="{stats.count} queries"'.encode()),
+    ]
+
+
+class PrometheusMiddleware:
+    """
+    Records latency, size, status and SQL usage of every HTTP request, and
+    with QUERY_DEBUG_HEADER set reports query count and DB time in the
+    response headers (as of when the response starts)
+    """
+
+    def __init__(self, app: ASGIApp, debug_headers: bool = QUERY_DEBUG_HEADER):
+        self.app = app
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.debug_headers:
+                    message = {**message, "headers": [*message.get("headers", ()), *query_debug_headers()]}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method=method, route=route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            with track_queries(f"{method} {route}") as queries:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            REQUEST_COUNT.labels(method=method, route=route, status=str(status)).inc()
+            REQUEST_LATENCY.labels(method=method, route=route).observe(elapsed)
+            RESPONSE_SIZE.labels(method=method, route=route).observe(size)
+            REQUEST_QUERIES.labels(method=method, route=route).observe(queries.count)
+            REQUEST_DB_TIME.labels(method=method, route=route).observe(queries.seconds)
+
+
+def metrics_payload() -> Tuple[bytes, str]:
+    """Exposition body and content type for /metrics"""
+    registry = REGISTRY
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _process_collectors:
+            registry.register(collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -10,7 +10,11 @@ from sqlalchemy.orm import Session
 from tenacity import retry, stop_after_attempt, wait_exponential
 import os
 
-from ..db.models import State, District, MonthlyMetric, APICache
+from ..db.models import State, District, MonthlyMetric, period_key
+from .api_cache import api_cache
+from .http_client import fetch_json
+from .rate_limit import data_gov_limiter, parse_retry_after
+from .data_ingestion import DataIngestionService
 
 logger = logging.getLogger(__name__)
 
@@ -32,27 +36,23 @@ class MGNREGAAPIService:
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def fetch_from_api(self, endpoint: str, params: Dict) -> Optional[Dict]:
         """
-        Fetch data from data.gov.in API with retry logic
+        Fetch data from data.gov.in API with retry logic, over the shared
+        connection pool; identical concurrent fetches share one request
         """
+        params = {**params, 'api-key': self.api_key, 'format': 'json'}
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                params['api-key'] = self.api_key
-                params['format'] = 'json'
-                
-                response = await client.get(
-                    f"{self.base_url}/{endpoint}",
-                    params=params
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 429:
-                    logger.warning("Rate limit hit, will retry...")
-                    raise Exception("Rate limit exceeded")
-                else:
-                    logger.error(f"API error: {response.status_code}")
-                    return None
-                    
+            return await fetch_json(
+                f"{self.base_url}/{endpoint}",
+                params,
+                limiter=data_gov_limiter
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                logger.warning("Rate limit hit, will retry...")
+                data_gov_limiter.pause(parse_retry_after(e.response.headers.get("Retry-After")))
+                raise Exception("Rate limit exceeded")
+            logger.error(f"API error: {e.response.status_code}")
+            return None
         except Exception as e:
             logger.error(f"Error fetching from API: {str(e)}")
             raise
@@ -61,33 +61,16 @@ class MGNREGAAPIService:
         """
         Get cached API response if available and not expired
         """
-        cache_entry = self.db.query(APICache).filter(
-            APICache.endpoint == endpoint,
-            APICache.parameters == parameters,
-            APICache.expires_at > datetime.utcnow()
-        ).first()
-        
-        if cache_entry:
+        cached = api_cache.get(self.db, endpoint, parameters)
+        if cached is not None:
             logger.info(f"Cache hit for {endpoint}")
-            return cache_entry.response
-        
-        return None
+        return cached
     
     def cache_data(self, endpoint: str, parameters: Dict, response: Dict, ttl_hours: int = 24):
         """
-        Cache API response with expiration
+        Cache API response with expiration, replacing any earlier entry
         """
-        expires_at = datetime.utcnow() + timedelta(hours=ttl_hours)
-        
-        cache_entry = APICache(
-            endpoint=endpoint,
-            parameters=parameters,
-            response=response,
-            expires_at=expires_at
-        )
-        
-        self.db.add(cache_entry)
-        self.db.commit()
+        api_cache.set(self.db, endpoint, parameters, response, ttl=timedelta(hours=ttl_hours))
         logger.info(f"Cached data for {endpoint}")
     
     async def get_district_data(
@@ -141,34 +124,26 @@ class MGNREGAAPIService:
         
         state = self.db.query(State).filter(State.id == district.state_id).first()
         
-        # Fetch data from API
-        data = await self.get_district_data(
-            state_code=state.code,
-            district_code=district.code
-        )
-        
-        if not data:
-            logger.warning(f"No data available for district {district.name}")
-            return False
-        
-        # Parse and store in database
-        # This would parse the actual API response structure
-        # For now, this is a placeholder
+        # Stream every page of the district's records into the database
+        # rather than loading the whole response into memory
+        service = None
         try:
-            # Extract metrics from API response
-            # The actual structure depends on data.gov.in response format
-            records = data.get('records', [])
-            
-            for record in records:
-                # Create or update monthly metric
-                # This is example code - adjust based on actual API response
-                pass
-            
-            return True
-            
+            service = DataIngestionService(self.db)
+            result = await service.sync_metrics_resource(
+                MGNREGA_RESOURCE_ID,
+                {"state_name": state.name, "district_name": district.name},
+            )
         except Exception as e:
             logger.error(f"Error syncing data: {str(e)}")
             return False
+        finally:
+            if service is not None:
+                await service.client.close()
+        
+        if not result.batches:
+            logger.warning(f"No data available for district {district.name}")
+            return False
+        return True
     
     def get_fallback_data(self, district_id: int, year: int, month: int) -> Optional[Dict]:
         """
@@ -176,8 +151,7 @@ class MGNREGAAPIService:
         """
         metric = self.db.query(MonthlyMetric).filter(
             MonthlyMetric.district_id == district_id,
-            MonthlyMetric.year == year,
-            MonthlyMetric.month == month
+            MonthlyMetric.period == period_key(year, month)
         ).first()
         
         if metric:
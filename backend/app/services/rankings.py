@@ -0,0 +1,205 @@
+"""
+District Rankings
+Monthly rank and percentile of every district, within its state and
+nationally, on person days, fund utilization and works completed, kept in
+district_rankings (one row per district and month).
+
+Ranks are computed by window functions in a single INSERT ... SELECT, for
+the months ingestion wrote or for all of them. Every rank is a unique
+position (ties go to the lower district id), so the top N, bottom N and
+the N either side of a district are all range scans on a (scope, period,
+rank) index. A district with no value for a metric (e.g. no funds
+allotted that month) is left unranked for it.
+"""
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Select, case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from ..db.models import District, DistrictLatestMetric, DistrictRanking, MonthlyMetric, period_key
+from .cache import LATEST_RANKINGS_TAG, RANKINGS_TAG, ranking_period_tag
+
+logger = logging.getLogger(__name__)
+
+# Ranked metrics; higher values rank first
+RANKING_METRICS = ("person_days", "fund_utilization", "works_completed")
+SCOPES = ("state", "national")
+
+
+def _metric_values(metrics: Any) -> Dict[str, Any]:
+    return {
+        "person_days": metrics.c.total_person_days,
+        "fund_utilization": case(
+            (metrics.c.total_funds > 0, metrics.c.funds_utilized * 100.0 / metrics.c.total_funds)
+        ),
+        "works_completed": metrics.c.completed_works,
+    }
+
+
+def refresh_rankings(db: Session, periods: Optional[Iterable[int]] = None) -> int:
+    """Recompute the rankings of `periods` (default: every month); returns rows written"""
+    started = time.perf_counter()
+    metrics = MonthlyMetric.__table__
+    source = select(
+        metrics.c.district_id,
+        metrics.c.state_id,
+        metrics.c.period,
+        *[value.label(f"{name}_value") for name, value in _metric_values(metrics).items()],
+    )
+    stale = delete(DistrictRanking)
+    if periods is not None:
+        periods = sorted(set(periods))
+        if not periods:
+            return 0
+        source = source.where(metrics.c.period.in_(periods))
+        stale = stale.where(DistrictRanking.period.in_(periods))
+    source = source.subquery()
+
+    columns = [source.c.district_id, source.c.state_id, source.c.period]
+    for name in RANKING_METRICS:
+        value = source.c[f"{name}_value"]
+        columns.append(value)
+        for scope in SCOPES:
+            partition = [source.c.state_id, source.c.period] if scope == "state" else [source.c.period]
+            # Unranked (NULL) values get their own partition so they don't take up positions
+            position = func.row_number().over(
+                partition_by=[*partition, value.is_(None)],
+                order_by=[value.desc(), source.c.district_id],
+            )
+            columns.append(case((value.is_not(None), position)).label(f"{name}_{scope}_rank"))
+            columns.append(func.count(value).over(partition_by=partition).label(f"{name}_{scope}_count"))
+
+    try:
+        db.execute(stale)
+        written = db.execute(
+            insert(DistrictRanking).from_select([column.name for column in columns], select(*columns))
+        ).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    scope = f"{len(periods)} months" if periods is not None else "all months"
+    logger.info(f"Ranked {written} district-months ({scope}) in {time.perf_counter() - started:.2f}s")
+    return written
+
+
+def ranking_tags(db: Session, periods: Optional[Iterable[int]] = None) -> List[str]:
+    """
+    Cache tags that re-ranking `periods` (default: every ranked month)
+    changes: the leaderboards, those months' rank blocks and, if one of them
+    is a district's latest month, the latest-month rank blocks. Call after
+    the latest-metric pointers are up to date.
+    """
+    if periods is None:
+        periods = db.execute(select(DistrictRanking.period).distinct()).scalars().all()
+    periods = sorted(set(periods))
+    tags = [RANKINGS_TAG, *(ranking_period_tag(period) for period in periods)]
+    if periods and db.execute(
+        select(DistrictLatestMetric.district_id).where(DistrictLatestMetric.period.in_(periods)).limit(1)
+    ).first():
+        tags.append(LATEST_RANKINGS_TAG)
+    return tags
+
+
+def rank_block_tags(year: Optional[int] = None, month: Optional[int] = None) -> List[str]:
+    """Tags of the rank block in a district's metrics for a year / month filter (none: its latest month)"""
+    if year and month:
+        return [ranking_period_tag(period_key(year, month))]
+    if year:
+        return [ranking_period_tag(period_key(year, month)) for month in range(1, 13)]
+    if month:
+        # That month of any year
+        return [RANKINGS_TAG]
+    return [LATEST_RANKINGS_TAG]
+
+
+def percentile(rank: Optional[int], count: int) -> Optional[float]:
+    """Share of the other ranked districts this one is ahead of (100 = first, 0 = last)"""
+    if rank is None or not count:
+        return None
+    if count == 1:
+        return 100.0
+    return round(100 * (count - rank) / (count - 1), 1)
+
+
+# Columns read by rank_block, for selecting them without the ORM entity
+RANK_BLOCK_COLUMNS = tuple(
+    getattr(DistrictRanking, f"{name}_{column}")
+    for name in RANKING_METRICS
+    for column in ("value", *(f"{scope}_{part}" for scope in SCOPES for part in ("rank", "count")))
+)
+
+
+def rank_block(ranking: Any) -> Optional[Dict[str, Any]]:
+    """A district's value, rank and percentile for every metric and scope (a DistrictRanking or a row of RANK_BLOCK_COLUMNS)"""
+    if ranking is None:
+        return None
+    block = {}
+    for name in RANKING_METRICS:
+        block[name] = {"value": getattr(ranking, f"{name}_value")}
+        for scope in SCOPES:
+            rank = getattr(ranking, f"{name}_{scope}_rank")
+            count = getattr(ranking, f"{name}_{scope}_count")
+            block[name][scope] = {"rank": rank, "of": count, "percentile": percentile(rank, count)}
+    return block
+
+
+def leaderboard_query(
+    metric: str,
+    state_id: Optional[int] = None,
+    period: Optional[int] = None,
+    mode: str = "top",
+    limit: int = 10,
+    district_id: Optional[int] = None,
+) -> Select:
+    """
+    One month's leaderboard for a metric, nationally or within a state: the
+    `limit` best ("top") or worst ("bottom") ranked districts, or ("around")
+    the `limit` either side of district_id. Defaults to the latest month
+    ranked in that scope. Rows: district_id, district_name, state_id,
+    period, value, rank, count.
+    """
+    scope = "state" if state_id is not None else "national"
+    rank = getattr(DistrictRanking, f"{metric}_{scope}_rank")
+
+    in_scope = [] if state_id is None else [DistrictRanking.state_id == state_id]
+    if period is None:
+        period = select(func.max(DistrictRanking.period)).where(*in_scope).scalar_subquery()
+    query = select(
+        DistrictRanking.district_id,
+        District.name.label("district_name"),
+        DistrictRanking.state_id,
+        DistrictRanking.period,
+        getattr(DistrictRanking, f"{metric}_value").label("value"),
+        rank.label("rank"),
+        getattr(DistrictRanking, f"{metric}_{scope}_count").label("count"),
+    ).join(District, DistrictRanking.district_id == District.id).where(
+        *in_scope, DistrictRanking.period == period, rank.is_not(None)
+    )
+
+    if mode == "around":
+        own_rank = select(rank).where(
+            DistrictRanking.district_id == district_id, DistrictRanking.period == period
+        ).scalar_subquery()
+        return query.where(rank.between(own_rank - limit, own_rank + limit)).order_by(rank)
+    if mode == "bottom":
+        return query.order_by(rank.desc()).limit(limit)
+    return query.where(rank <= limit).order_by(rank)
+
+
+def leaderboard_entries(rows: List[Any]) -> List[Dict[str, Any]]:
+    """Leaderboard rows as API entries, best rank first"""
+    return [
+        {
+            "rank": row.rank,
+            "district_id": row.district_id,
+            "district_name": row.district_name,
+            "state_id": row.state_id,
+            "value": row.value,
+            "percentile": percentile(row.rank, row.count),
+        }
+        for row in sorted(rows, key=lambda row: row.rank)
+    ]
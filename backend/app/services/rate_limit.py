@@ -0,0 +1,96 @@
+"""
+Rate Limiting
+Async token-bucket limiter for outbound API calls, shared by every task
+that talks to the same upstream so concurrent fan-out stays within its
+limits.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# data.gov.in request budget (requests per second / burst size)
+DATA_GOV_RATE_LIMIT = float(os.getenv("DATA_GOV_RATE_LIMIT", "2"))
+DATA_GOV_BURST = int(os.getenv("DATA_GOV_BURST", "5"))
+
+
+def parse_retry_after(value: Optional[str], default: float = 60.0) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent"""
+        if self.rate <= 0:
+            return
+        # Created lazily (and per event loop) so a module-level bucket works
+        # across asyncio.run() calls
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        started = time.monotonic()
+        # Waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        self.acquired += 1
+        self.waited_seconds += time.monotonic() - started
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for `seconds`, e.g. after a 429 with Retry-After"""
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            logger.warning(f"Rate limited by upstream; pausing requests for {seconds:.0f}s")
+            self._paused_until = until
+            # Resume gently rather than with a full burst
+            self._tokens = 0.0
+            self._updated = until
+
+
+# Process-wide budget for data.gov.in, shared by every DataGovClient
+data_gov_limiter = TokenBucket(DATA_GOV_RATE_LIMIT, DATA_GOV_BURST)
@@ -0,0 +1,113 @@
+"""
+Record Parser
+Converts raw data.gov.in MGNREGA records ("District-wise MGNREGA Data at a
+Glance") into MonthlyMetric row values, one record at a time so large
+resources can be streamed.
+"""
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from ..db.models import period_key
+
+logger = logging.getLogger(__name__)
+
+MONTHS = {
+    name: number
+    for number, names in enumerate(
+        [
+            ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+            ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+            ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"),
+            ("dec", "december"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+
+# Expenditure fields are published in Rs. lakhs; MonthlyMetric stores INR
+LAKH = 100_000
+
+# MonthlyMetric column -> record field
+INT_FIELDS = {
+    "total_households": "Total_Households_Worked",
+    "total_works": "Total_No_of_Works_Takenup",
+    "completed_works": "Number_of_Completed_Works",
+    "in_progress_works": "Number_of_Ongoing_Works",
+    "total_person_days": "Persondays_of_Central_Liability_so_far",
+    "sc_person_days": "SC_persondays",
+    "st_person_days": "ST_persondays",
+    "women_person_days": "Women_Persondays",
+}
+AMOUNT_FIELDS = {
+    "funds_utilized": "Total_Exp",
+    "wage_expenditure": "Wages",
+    "material_expenditure": "Material_and_skilled_Wages",
+}
+
+
+def _number(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None  # "NA", "-", ""
+
+
+def parse_month(value: Any) -> Optional[int]:
+    """Month number from "Dec", "December" or "12" """
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if text.isdigit():
+        month = int(text)
+        return month if 1 <= month <= 12 else None
+    return MONTHS.get(text)
+
+
+def parse_fin_year_month(fin_year: Any, month: Any) -> Optional[Tuple[int, int]]:
+    """
+    Calendar (year, month) for a financial-year month. The Indian financial
+    year "2023-2024" (or "2023-24") runs April 2023 to March 2024.
+    """
+    month_number = parse_month(month)
+    if month_number is None or fin_year is None:
+        return None
+    start = str(fin_year).strip().split("-")[0]
+    if not start.isdigit() or len(start) != 4:
+        return None
+    year = int(start)
+    return (year + 1 if month_number <= 3 else year), month_number
+
+
+def parse_metric_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    MonthlyMetric values plus the state / district identifiers of a record,
+    or None when the record has no usable period or district.
+    """
+    period = parse_fin_year_month(record.get("fin_year"), record.get("month"))
+    district_name = (record.get("district_name") or "").strip()
+    if period is None or not district_name:
+        return None
+    year, month = period
+
+    row: Dict[str, Any] = {
+        "state_name": (record.get("state_name") or "").strip(),
+        "state_code": record.get("state_code"),
+        "district_name": district_name,
+        "district_code": record.get("district_code"),
+        "year": year,
+        "month": month,
+        "period": period_key(year, month),
+    }
+    for column, field in INT_FIELDS.items():
+        value = _number(record.get(field))
+        row[column] = int(round(value)) if value is not None else 0
+    for column, field in AMOUNT_FIELDS.items():
+        value = _number(record.get(field))
+        row[column] = value * LAKH if value is not None else 0.0
+    row["raw_data"] = record
+    return row
@@ -0,0 +1,198 @@
+"""
+Monthly Rollups
+State x month and India x month totals of every monthly metric, kept in
+state_monthly_rollups / national_monthly_rollups so state and national
+views read one row per month instead of aggregating monthly_metrics on
+every request.
+
+Ingestion records the (state, period) pairs it wrote and refreshes only
+those: each pair is re-aggregated from its districts' rows, then the
+national rows of the touched periods are re-summed from the state
+rollups. Re-aggregating (rather than applying deltas) keeps corrected and
+re-ingested months exact for the cost of reading a few dozen district rows
+per pair. rebuild_rollups recomputes everything, aggregating states in
+parallel.
+"""
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import cast, delete, exists, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from ..db.base import SessionLocal
+from ..db.models import METRIC_FIELDS, MonthlyMetric, NationalMonthlyRollup, State, StateMonthlyRollup
+from ..db.upsert import UpsertResult, bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+# Threads aggregating states in parallel during a full rebuild
+ROLLUP_WORKERS = int(os.getenv("ROLLUP_WORKERS", "4"))
+
+# (state_id, period) pairs per refresh query
+KEY_CHUNK_SIZE = 500
+
+StatePeriod = Tuple[int, int]
+
+
+def _sums(source: Any, target: Any) -> List[Any]:
+    """SUM of every metric column, typed like the rollup column it fills"""
+    return [
+        cast(func.coalesce(func.sum(source.c[name]), 0), target.c[name].type).label(name)
+        for name in METRIC_FIELDS
+    ]
+
+
+def aggregate_states(
+    db: Session,
+    state_ids: Optional[List[int]] = None,
+    keys: Optional[List[StatePeriod]] = None,
+) -> List[Dict[str, Any]]:
+    """state_monthly_rollups rows computed from monthly_metrics, for some states or the given pairs"""
+    metrics = MonthlyMetric.__table__
+    query = select(
+        metrics.c.state_id,
+        metrics.c.period,
+        func.min(metrics.c.year).label("year"),
+        func.min(metrics.c.month).label("month"),
+        func.count().label("district_count"),
+        *_sums(metrics, StateMonthlyRollup.__table__),
+    ).group_by(metrics.c.state_id, metrics.c.period)
+    if state_ids is not None:
+        query = query.where(metrics.c.state_id.in_(state_ids))
+    if keys is not None:
+        query = query.where(tuple_(metrics.c.state_id, metrics.c.period).in_(keys))
+    return [dict(row._mapping) for row in db.execute(query)]
+
+
+def aggregate_national(db: Session, periods: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """national_monthly_rollups rows summed from state_monthly_rollups"""
+    states = StateMonthlyRollup.__table__
+    query = select(
+        states.c.period,
+        func.min(states.c.year).label("year"),
+        func.min(states.c.month).label("month"),
+        func.count().label("state_count"),
+        cast(func.sum(states.c.district_count), NationalMonthlyRollup.district_count.type).label("district_count"),
+        *_sums(states, NationalMonthlyRollup.__table__),
+    ).group_by(states.c.period)
+    if periods is not None:
+        query = query.where(states.c.period.in_(periods))
+    return [dict(row._mapping) for row in db.execute(query)]
+
+
+def refresh_rollups(db: Session, keys: Iterable[StatePeriod]) -> UpsertResult:
+    """
+    Recompute the state rollups of the given (state_id, period) pairs and the
+    national rollups of their periods. Pairs with no district rows left are
+    removed.
+    """
+    keys = sorted(set(keys))
+    total = UpsertResult()
+    if not keys:
+        return total
+    started = time.perf_counter()
+
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        chunk = keys[start:start + KEY_CHUNK_SIZE]
+        rows = aggregate_states(db, keys=chunk)
+        total += bulk_upsert(db, StateMonthlyRollup, rows, conflict_columns=["state_id", "period"])
+        emptied = set(chunk) - {(row["state_id"], row["period"]) for row in rows}
+        if emptied:
+            db.execute(delete(StateMonthlyRollup).where(
+                tuple_(StateMonthlyRollup.state_id, StateMonthlyRollup.period).in_(sorted(emptied))
+            ))
+            db.commit()
+
+    total += refresh_national_rollups(db, sorted({period for _, period in keys}))
+    logger.info(
+        f"Refreshed rollups for {len(keys)} state-months in {time.perf_counter() - started:.2f}s: "
+        f"{total.written} written, {total.unchanged} unchanged"
+    )
+    return total
+
+
+def refresh_national_rollups(db: Session, periods: Optional[List[int]] = None) -> UpsertResult:
+    """Re-sum the national rollups of `periods` (default: every month) from the state rollups"""
+    rows = aggregate_national(db, periods)
+    result = bulk_upsert(db, NationalMonthlyRollup, rows, conflict_columns=["period"])
+    found = {row["period"] for row in rows}
+    stale = delete(NationalMonthlyRollup).where(NationalMonthlyRollup.period.notin_(found))
+    if periods is not None:
+        stale = stale.where(NationalMonthlyRollup.period.in_(periods))
+    db.execute(stale)
+    db.commit()
+    return result
+
+
+def rebuild_rollups(workers: int = ROLLUP_WORKERS) -> Dict[str, Any]:
+    """
+    Recompute every rollup from monthly_metrics. The states are split into
+    `workers` groups aggregated in parallel, each on its own session; rows
+    are written from this thread as groups finish, so there's one writer.
+    """
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        state_ids = list(db.execute(select(State.id).order_by(State.id)).scalars())
+    workers = max(1, min(workers, len(state_ids)))
+    groups = [state_ids[index::workers] for index in range(workers)]
+
+    def aggregate(group: List[int]) -> List[Dict[str, Any]]:
+        with SessionLocal() as session:
+            return aggregate_states(session, state_ids=group)
+
+    with SessionLocal() as db, ThreadPoolExecutor(max_workers=workers) as pool:
+        # Each task runs in a copy of this context so its queries are still tracked
+        futures = [pool.submit(contextvars.copy_context().run, aggregate, group) for group in groups]
+        rows = (row for future in futures for row in future.result())
+        total = bulk_upsert(db, StateMonthlyRollup, rows, conflict_columns=["state_id", "period"])
+
+        # State-months (or whole states) that no longer have any district rows
+        db.execute(delete(StateMonthlyRollup).where(~exists().where(
+            MonthlyMetric.state_id == StateMonthlyRollup.state_id,
+            MonthlyMetric.period == StateMonthlyRollup.period,
+        )))
+        db.commit()
+
+        total += refresh_national_rollups(db)
+        periods = db.execute(select(func.count()).select_from(NationalMonthlyRollup)).scalar()
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Rebuilt rollups for {len(state_ids)} states and {periods} months in {elapsed:.2f}s: "
+        f"{total.written} written, {total.unchanged} unchanged"
+    )
+    return {
+        "states": len(state_ids),
+        "periods": periods,
+        "written": total.written,
+        "unchanged": total.unchanged,
+        "seconds": round(elapsed, 3),
+    }
+
+
+def collect_state_periods(rows: Iterable[Dict[str, Any]], keys: Set[StatePeriod]) -> Iterator[Dict[str, Any]]:
+    """Pass monthly_metrics rows through, adding their (state_id, period) to keys"""
+    for row in rows:
+        keys.add((row["state_id"], row["period"]))
+        yield row
+
+
+class RollupTracker:
+    """(state_id, period) pairs written since the last refresh"""
+
+    def __init__(self):
+        self.pending: Set[StatePeriod] = set()
+
+    def add(self, keys: Iterable[StatePeriod]) -> None:
+        self.pending.update(keys)
+
+    def refresh(self, db: Session) -> Set[StatePeriod]:
+        """Refresh the rollups of the pending pairs; returns the pairs refreshed"""
+        keys, self.pending = self.pending, set()
+        if keys:
+            refresh_rollups(db, keys)
+        return keys
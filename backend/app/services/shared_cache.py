@@ -0,0 +1,210 @@
+"""
+Shared Cache
+Redis-backed L2 cache for serialized endpoint responses, shared by every
+uvicorn worker and replica, with versioned keys and pub/sub invalidation.
+
+Keys embed the current version of each invalidation tag, so bumping a tag
+version makes every response that depends on it unreachable at once; the
+orphaned keys simply age out by TTL. Redis being down or slow never fails a
+request: errors open a short circuit breaker and the caller falls through
+to the database.
+
+Clients can be injected (e.g. fakeredis.aioredis.FakeRedis and
+fakeredis.FakeRedis sharing a FakeServer) to run without a Redis server.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+SHARED_CACHE_TTL = int(os.getenv("SHARED_CACHE_TTL", "3600"))
+
+# Bump when response payload shapes change so old entries are never served
+SCHEMA_VERSION = 1
+KEY_PREFIX = f"mgnrega:cache:v{SCHEMA_VERSION}"
+TAG_VERSION_PREFIX = "mgnrega:tagver"
+INVALIDATION_CHANNEL = "mgnrega:invalidate"
+
+
+class SharedCache:
+    """L2 response cache stored in Redis"""
+
+    def __init__(
+        self,
+        url: str = REDIS_URL,
+        ttl: int = SHARED_CACHE_TTL,
+        client: Any = None,
+        sync_client: Any = None,
+        socket_timeout: float = 0.25,
+        retry_after: float = 30.0,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.socket_timeout = socket_timeout
+        self.retry_after = retry_after
+        self._client = client
+        self._sync_client = sync_client
+        self._down_until = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.stores = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.url) or self._client is not None
+
+    @property
+    def available(self) -> bool:
+        return self.configured and time.monotonic() >= self._down_until
+
+    def _get_client(self):
+        if self._client is None:
+            import redis.asyncio as aioredis
+            self._client = aioredis.from_url(
+                self.url,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_timeout,
+            )
+        return self._client
+
+    def _get_sync_client(self):
+        if self._sync_client is None:
+            import redis
+            self._sync_client = redis.Redis.from_url(
+                self.url,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_timeout,
+            )
+        return self._sync_client
+
+    def _mark_down(self, action: str, exc: Exception) -> None:
+        self.errors += 1
+        if time.monotonic() >= self._down_until:
+            logger.warning(
+                f"Shared cache unavailable during {action} ({exc}); "
+                f"bypassing it for {self.retry_after:.0f}s"
+            )
+        self._down_until = time.monotonic() + self.retry_after
+
+    @staticmethod
+    def _tag_version_keys(tags: Iterable[str]) -> List[str]:
+        return [f"{TAG_VERSION_PREFIX}:{tag}" for tag in tags]
+
+    async def lookup(self, key: str, tags: Iterable[str] = ()) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Return (payload, versioned_key). The versioned key is what store()
+        must write to; both are None when Redis is unavailable.
+        """
+        if not self.available:
+            return None, None
+        tags = sorted(set(tags))
+        try:
+            client = self._get_client()
+            versions = await client.mget(self._tag_version_keys(tags)) if tags else []
+            suffix = ".".join((v.decode() if isinstance(v, bytes) else v) or "0" for v in versions)
+            versioned_key = f"{KEY_PREFIX}:{key}@{suffix}"
+            payload = await client.get(versioned_key)
+        except Exception as exc:
+            self._mark_down("lookup", exc)
+            return None, None
+
+        if payload is None:
+            self.misses += 1
+            return None, versioned_key
+        self.hits += 1
+        return payload, versioned_key
+
+    async def store(self, versioned_key: Optional[str], payload: bytes) -> None:
+        if versioned_key is None or not self.available:
+            return
+        try:
+            await self._get_client().set(versioned_key, payload, ex=self.ttl)
+            self.stores += 1
+        except Exception as exc:
+            self._mark_down("store", exc)
+
+    def invalidate(self, tags: Iterable[str]) -> bool:
+        """
+        Bump tag versions and notify every worker. Synchronous so that scripts
+        and the ingestion job can call it without an event loop.
+        """
+        tags = sorted(set(tags))
+        if not tags or not self.available:
+            return False
+        try:
+            pipe = self._get_sync_client().pipeline()
+            for version_key in self._tag_version_keys(tags):
+                pipe.incr(version_key)
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps({"tags": tags}))
+            pipe.execute()
+            return True
+        except Exception as exc:
+            self._mark_down("invalidate", exc)
+            return False
+
+    async def listen(self, on_invalidate: Callable[[List[str]], Any]) -> None:
+        """Apply invalidations published by other processes until cancelled"""
+        if not self.configured:
+            return
+        backoff = 1.0
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._get_client().pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                backoff = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        tags = json.loads(message["data"])["tags"]
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning(f"Ignoring malformed invalidation message: {message!r}")
+                        continue
+                    result = on_invalidate(tags)
+                    if inspect.isawaitable(result):
+                        await result
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.errors += 1
+                logger.warning(f"Invalidation listener disconnected ({exc}); retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    async def close(self) -> None:
+        if self._client is not None:
+            try:
+                await self._client.close()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "configured": self.configured,
+            "available": self.available,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "stores": self.stores,
+            "errors": self.errors,
+        }
+
+
+# Process-wide L2 cache; inert unless REDIS_URL is set
+shared_cache = SharedCache()
@@ -0,0 +1,235 @@
+"""
+District Spatial Index
+In-memory district lookup by location, built once from the database and
+rebuilt lazily after districts change. A point resolves to the district
+whose stored boundary contains it; nearest centroid is the fallback when
+no boundary matches or none are loaded.
+
+Centroids are stored as unit vectors on the sphere, so the nearest district
+is the one with the largest dot product with the query point; no
+trigonometry runs per candidate. Queries are answered for whole blocks of
+points with a single matrix product, which for India's ~750 districts is
+faster than walking a KD-tree from Python and needs no extra dependency.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import District, State
+from .boundaries import DistrictBoundaryIndex
+from .cache import STATES_TAG
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Query points per matrix product; bounds temporary memory to ~BLOCK * N floats
+QUERY_BLOCK_SIZE = 4096
+
+def to_unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Convert degrees latitude/longitude to (N, 3) unit vectors"""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+def dot_to_km(dot: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from the dot product of two unit vectors"""
+    return EARTH_RADIUS_KM * np.arccos(np.clip(dot, -1.0, 1.0))
+
+
+def location_confidence(distance_km: float) -> float:
+    """Confidence of a nearest-centroid match (closer = higher confidence)"""
+    # Within 50km = high confidence, beyond 200km = low confidence
+    return round(max(0, min(100, 100 - (distance_km / 2))), 2)
+
+
+class DistrictSpatialIndex:
+    """Boundary and nearest-centroid lookup over all districts"""
+
+    def __init__(
+        self,
+        rows: Sequence[Tuple[int, str, int, str, Optional[float], Optional[float]]],
+        boundaries: Optional[DistrictBoundaryIndex] = None,
+    ):
+        """rows: (district_id, district_name, state_id, state_name, lat, lon)"""
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.names = [row[1] for row in rows]
+        self.state_ids = np.array([row[2] for row in rows], dtype=np.int64)
+        self.state_names = [row[3] for row in rows]
+        lats = np.array([np.nan if row[4] is None else row[4] for row in rows], dtype=np.float64)
+        lons = np.array([np.nan if row[5] is None else row[5] for row in rows], dtype=np.float64)
+        self.points = to_unit_vectors(lats, lons).reshape(-1, 3)
+        self.has_centroid = ~(np.isnan(lats) | np.isnan(lons))
+        self.boundaries = boundaries
+        self._positions = {int(district_id): i for i, district_id in enumerate(self.ids)}
+        # Candidate positions (districts with a centroid), overall and per state
+        self._candidates = np.flatnonzero(self.has_centroid)
+        self._by_state: Dict[int, np.ndarray] = {
+            int(state_id): np.flatnonzero(self.has_centroid & (self.state_ids == state_id))
+            for state_id in np.unique(self.state_ids)
+        }
+        # Districts with a centroid, a boundary or both, each counted once
+        located = set(self.ids[self._candidates].tolist())
+        if boundaries:
+            located.update(boundaries.district_ids)
+        self._located = len(located)
+
+    def __len__(self) -> int:
+        """Number of districts that can be located"""
+        return self._located
+
+    def position(self, district_id: Optional[int]) -> Optional[int]:
+        return self._positions.get(district_id)
+
+    def nearest(
+        self,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        k: int = 1,
+        state_id: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest districts for each query point.
+        Returns (positions, distances_km), both shaped (len(points), k'),
+        where k' = min(k, candidates) and rows are sorted nearest first.
+        """
+        if state_id is None:
+            candidates = self._candidates
+        else:
+            candidates = self._by_state.get(state_id, np.empty(0, dtype=np.int64))
+
+        queries = to_unit_vectors(lats, lons).reshape(-1, 3)
+        k = min(k, len(candidates))
+        if k == 0 or len(queries) == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty
+
+        points = self.points[candidates]
+        positions = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float64)
+        for start in range(0, len(queries), QUERY_BLOCK_SIZE):
+            block = slice(start, start + QUERY_BLOCK_SIZE)
+            dots = queries[block] @ points.T
+            if k < dots.shape[1]:
+                top = np.argpartition(-dots, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(dots.shape[1]), dots.shape).copy()
+            top_dots = np.take_along_axis(dots, top, axis=1)
+            order = np.argsort(-top_dots, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            positions[block] = candidates[top]
+            distances[block] = dot_to_km(np.take_along_axis(top_dots, order, axis=1))
+        return positions, distances
+
+    def describe(self, position: int, distance_km: Optional[float]) -> Dict[str, Any]:
+        return {
+            "id": int(self.ids[position]),
+            "name": self.names[position],
+            "state_name": self.state_names[position],
+            "state_id": int(self.state_ids[position]),
+            "distance_km": None if distance_km is None else round(float(distance_km), 2),
+        }
+
+    def containing(self, lat: float, lon: float, state_id: Optional[int] = None) -> Optional[int]:
+        """Position of the district whose boundary contains the point"""
+        if not self.boundaries:
+            return None
+        position = self.position(self.boundaries.locate(lat, lon))
+        if position is None or (state_id is not None and self.state_ids[position] != state_id):
+            return None
+        return position
+
+    def detect(
+        self,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        k: int = 1,
+        state_id: Optional[int] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Resolve each point to a district (None if nothing matches). Boundary
+        matches have confidence 100; otherwise the nearest centroid is used
+        with a distance-based confidence. For k > 1 the k nearest centroids
+        are listed as well.
+        """
+        positions, distances = self.nearest(lats, lons, k=k, state_id=state_id)
+        queries = to_unit_vectors(lats, lons).reshape(-1, 3)
+        results = []
+        for i, (lat, lon) in enumerate(zip(lats, lons)):
+            inside = self.containing(lat, lon, state_id)
+            if inside is not None:
+                distance = (
+                    float(dot_to_km(queries[i] @ self.points[inside]))
+                    if self.has_centroid[inside] else None
+                )
+                result = self.describe(inside, distance)
+                result["confidence"] = 100.0
+                result["method"] = "boundary"
+            elif positions.shape[1]:
+                result = self.describe(positions[i, 0], distances[i, 0])
+                result["confidence"] = location_confidence(float(distances[i, 0]))
+                result["method"] = "centroid"
+            else:
+                results.append(None)
+                continue
+            if k > 1:
+                result["nearest"] = [
+                    self.describe(position, distance)
+                    for position, distance in zip(positions[i], distances[i])
+                ]
+            results.append(result)
+        return results
+
+
+_index: Optional[DistrictSpatialIndex] = None
+_generation = 0  # bumped on invalidation so a build that raced it is discarded
+_build_lock = asyncio.Lock()
+
+async def build_spatial_index(db: AsyncSession) -> DistrictSpatialIndex:
+    result = await db.execute(
+        select(
+            District.id, District.name, State.id, State.name,
+            District.centroid_lat, District.centroid_lon
+        ).join(
+            State, District.state_id == State.id
+        )
+    )
+    rows = result.all()
+    result = await db.execute(
+        select(District.id, District.boundary).filter(District.boundary.isnot(None))
+    )
+    # Parsing full-resolution boundaries takes seconds; keep it off the event loop
+    boundaries = await asyncio.to_thread(DistrictBoundaryIndex, result.all())
+    index = await asyncio.to_thread(DistrictSpatialIndex, rows, boundaries)
+    logger.info(
+        f"Built district spatial index: {int(index.has_centroid.sum())} centroids, "
+        f"{len(boundaries)} boundaries ({boundaries.vertex_count} vertices)"
+    )
+    return index
+
+async def get_spatial_index(db: AsyncSession) -> DistrictSpatialIndex:
+    """Return the current index, building it on first use or after invalidation"""
+    global _index
+    index = _index
+    if index is not None:
+        return index
+    async with _build_lock:
+        if _index is not None:
+            return _index
+        generation = _generation
+        index = await build_spatial_index(db)
+        if generation == _generation:
+            _index = index
+        return index
+
+def invalidate_spatial_index(tags: Optional[List[str]] = None) -> None:
+    """Drop the index when a district list changes; rebuilt on next lookup"""
+    global _index, _generation
+    if tags is None or any(tag == STATES_TAG or tag.startswith("state:") for tag in tags):
+        _index = None
+        _generation += 1
@@ -0,0 +1,145 @@
+"""
+Concurrency benchmark
+Starts the API under uvicorn (one worker) and measures requests/sec and
+latency with many concurrent clients. The response cache is disabled so
+every request exercises the database path.
+
+Usage:
+    python benchmarks/concurrency.py --clients 100 --duration 10
+    python benchmarks/concurrency.py --database-url sqlite:////tmp/bench.db
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+ROUTES = [
+    "/api/v1/states",
+    "/api/v1/districts?state_id={state_id}",
+    "/api/v1/metrics/district/{district_id}",
+    "/api/v1/metrics/district/{district_id}/history?years=2",
+    "/api/v1/metrics/compare?district_ids={district_id},{other_id}",
+]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(database_url: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "RESPONSE_CACHE_SIZE": "0",
+        "REDIS_URL": "",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--port", str(port), "--workers", "1", "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/v1/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+async def run_load(base_url: str, clients: int, duration: float, grace: float = 5.0) -> dict:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        await wait_ready(client)
+        states = (await client.get("/api/v1/states")).json()
+        districts = []
+        for state in states:
+            districts.extend((await client.get("/api/v1/districts", params={"state_id": state["id"]})).json())
+        if not districts:
+            raise RuntimeError("Database has no districts; seed it first")
+
+        latencies = []
+        errors = {}
+        deadline = time.monotonic() + duration
+
+        def record_error(kind) -> None:
+            errors[kind] = errors.get(kind, 0) + 1
+
+        async def worker(seed: int):
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                district = rng.choice(districts)
+                other = rng.choice(districts)
+                url = rng.choice(ROUTES).format(
+                    state_id=district["state_id"], district_id=district["id"], other_id=other["id"]
+                )
+                start = time.perf_counter()
+                try:
+                    # Requests stuck well past the deadline count as timeouts
+                    response = await client.get(url, timeout=deadline - time.monotonic() + grace)
+                except httpx.HTTPError as exc:
+                    record_error(type(exc).__name__)
+                    continue
+                if response.status_code >= 500:
+                    record_error(f"HTTP {response.status_code}")
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    percentile = lambda q: latencies[max(int(len(latencies) * q) - 1, 0)] * 1000 if latencies else float("nan")
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "max_ms": percentile(1.0),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./mgnrega.db"))
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=0, help="Server port (default: any free port)")
+    args = parser.parse_args()
+
+    port = args.port or free_port()
+    server = start_server(args.database_url, port)
+    try:
+        result = asyncio.run(run_load(f"http://127.0.0.1:{port}", args.clients, args.duration))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            # A worker with a blocked event loop can't shut down gracefully
+            server.kill()
+            server.wait()
+
+    print(f"clients={args.clients} duration={args.duration:.0f}s")
+    errors = ", ".join(f"{kind}={count}" for kind, count in sorted(result["errors"].items()))
+    print(f"  successful requests: {result['requests']}")
+    print(f"  errors: {errors or 'none'}")
+    print(f"  throughput: {result['rps']:.1f} req/s")
+    print(f"  latency p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms max={result['max_ms']:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Serialization benchmark
+Measures CPU time per response of the list_states, list_districts and
+compare_districts payloads built two ways against the same database:
+
+  orm   ORM instances -> dicts -> jsonable_encoder -> json.dumps
+        (the routes before they read Core rows and rendered with orjson)
+  core  Core rows of the needed columns -> dicts -> orjson.dumps
+        (the routes now)
+
+and then CPU per request of the routes themselves, in-process through the
+TestClient with the response cache disabled, so the share of a request
+spent outside serialization is visible too. CPU is process time, so it
+excludes waiting on the database server.
+
+Usage:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --database-url sqlite:////tmp/bench.db --repeat 500
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Districts in each compared set
+COMPARE_DISTRICTS = 10
+
+def cpu_per_call(fn, repeat: int) -> float:
+    """Median process time of fn() in microseconds, over `repeat` calls in batches"""
+    batches = []
+    batch = max(1, repeat // 10)
+    for _ in range(10):
+        started = time.process_time()
+        for _ in range(batch):
+            fn()
+        batches.append((time.process_time() - started) / batch)
+    return statistics.median(batches) * 1e6
+
+def legacy_render(payload) -> bytes:
+    """What a response_model=dict route with the default JSONResponse sent"""
+    from fastapi.encoders import jsonable_encoder
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def render(payload) -> bytes:
+    """What ORJSONResponse sends"""
+    import orjson
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./mgnrega.db"))
+    parser.add_argument("--repeat", type=int, default=200, help="Calls timed per payload and path")
+    parser.add_argument("--year", type=int, help="Year compared (default: latest month)")
+    args = parser.parse_args()
+
+    os.environ.update({"DATABASE_URL": args.database_url, "REDIS_URL": "", "RESPONSE_CACHE_SIZE": "0"})
+    sys.path.insert(0, str(BACKEND_DIR))
+    import logging
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+
+    from app.db.base import SessionLocal
+    from app.db.models import District, DistrictLatestMetric, MonthlyMetric, State, period_key
+    from app.main import (
+        COMPARISON_COLUMNS, DISTRICT_COLUMNS, STATE_COLUMNS, app, format_district, format_state,
+    )
+
+    logging.disable(logging.INFO)
+
+    with SessionLocal() as db:
+        # The state with the most districts, and a spread of districts to compare
+        state_id = db.execute(
+            select(District.state_id).group_by(District.state_id).order_by(func.count().desc()).limit(1)
+        ).scalar()
+        if state_id is None:
+            raise SystemExit("Database has no districts; seed it first")
+        district_ids = db.execute(select(District.id).order_by(District.id)).scalars().all()
+        step = max(1, len(district_ids) // COMPARE_DISTRICTS)
+        compared = district_ids[::step][:COMPARE_DISTRICTS]
+
+        def compare_filter(query):
+            if args.year:
+                return query.filter(MonthlyMetric.district_id.in_(compared), MonthlyMetric.period.between(
+                    period_key(args.year, 1), period_key(args.year, 12)
+                ))
+            return query.join(
+                DistrictLatestMetric, DistrictLatestMetric.metric_id == MonthlyMetric.id
+            ).filter(DistrictLatestMetric.district_id.in_(compared))
+
+        paths = {
+            "list_states": {
+                "orm": lambda: [format_state(state) for state in db.execute(select(State)).scalars().all()],
+                "core": lambda: [format_state(state) for state in db.execute(select(*STATE_COLUMNS))],
+            },
+            "list_districts": {
+                "orm": lambda: [
+                    format_district(district)
+                    for district in db.execute(select(District).filter(District.state_id == state_id)).scalars().all()
+                ],
+                "core": lambda: [
+                    format_district(district)
+                    for district in db.execute(select(*DISTRICT_COLUMNS).filter(District.state_id == state_id))
+                ],
+            },
+            "compare_districts": {
+                "orm": lambda: [
+                    {
+                        "district_id": metric.district_id,
+                        "district_name": district.name,
+                        "year": metric.year,
+                        "month": metric.month,
+                        "total_households": metric.total_households,
+                        "total_person_days": metric.total_person_days,
+                        "completed_works": metric.completed_works,
+                        "funds_utilized": metric.funds_utilized,
+                        "wage_expenditure": metric.wage_expenditure,
+                    }
+                    for metric, district in db.execute(compare_filter(
+                        select(MonthlyMetric, District).join(District, MonthlyMetric.district_id == District.id)
+                    )).all()
+                ],
+                "core": lambda: [
+                    dict(row._mapping)
+                    for row in db.execute(compare_filter(
+                        select(*COMPARISON_COLUMNS).join(District, MonthlyMetric.district_id == District.id)
+                    ))
+                ],
+            },
+        }
+
+        print(f"{'payload':20} {'path':5} {'items':>6} {'KiB':>7} {'load us':>9} {'encode us':>10} {'total us':>9}")
+        for name, builders in paths.items():
+            totals = {}
+            for path, build in builders.items():
+                encode = legacy_render if path == "orm" else render
+                payload = build()
+                # Expunge between calls so every ORM call hydrates fresh instances
+                load = cpu_per_call(lambda: (build(), db.expunge_all()), args.repeat)
+                encoding = cpu_per_call(lambda: encode(payload), args.repeat)
+                totals[path] = load + encoding
+                print(
+                    f"{name:20} {path:5} {len(payload):6} {len(encode(payload)) / 1024:7.1f} "
+                    f"{load:9.1f} {encoding:10.1f} {load + encoding:9.1f}"
+                )
+            print(f"{'':20} core uses {totals['core'] / totals['orm']:.0%} of the orm CPU")
+
+    routes = {
+        "list_states": "/api/v1/states",
+        "list_districts": f"/api/v1/districts?state_id={state_id}",
+        "compare_districts": "/api/v1/metrics/compare?district_ids=" + ",".join(map(str, compared)) + (
+            f"&year={args.year}" if args.year else ""
+        ),
+    }
+    print(f"\n{'route (in-process)':20} {'CPU us/request':>15}")
+    with TestClient(app) as client:
+        for name, url in routes.items():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}: {response.text[:200]}")
+            print(f"{name:20} {cpu_per_call(lambda: client.get(url), args.repeat):15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Startup benchmark
+Measures how long `import app.main` takes and how long uvicorn needs from
+launch to the first 200 from /api/v1/ready (migrations and the seed check
+included), and exits non-zero when either exceeds its budget so it can
+gate CI.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --import-budget 2.5 --ready-budget 6 --runs 5
+    python benchmarks/startup.py --database-url sqlite:////tmp/bench.db
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def server_env(database_url: str) -> dict:
+    return {**os.environ, "DATABASE_URL": database_url, "REDIS_URL": ""}
+
+def measure_import(database_url: str) -> float:
+    """Seconds to import the app in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=server_env(database_url),
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure_ready(database_url: str, timeout: float = 120.0) -> float:
+    """Seconds from launching uvicorn to the first 200 from /api/v1/ready"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--port", str(port), "--workers", "1", "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=server_env(database_url),
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5.0) as client:
+            while time.perf_counter() - started < timeout:
+                if server.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {server.returncode}")
+                try:
+                    if client.get("/api/v1/ready").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.02)
+        raise RuntimeError("Server did not become ready")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./mgnrega.db"))
+    parser.add_argument("--runs", type=int, default=3, help="Median of this many runs is compared")
+    parser.add_argument("--import-budget", type=float, default=2.5, help="Seconds allowed for `import app.main`")
+    parser.add_argument("--ready-budget", type=float, default=6.0, help="Seconds allowed until /api/v1/ready")
+    args = parser.parse_args()
+
+    # The first launch may migrate and seed; budgets cover warm restarts
+    measure_ready(args.database_url)
+
+    imports = [measure_import(args.database_url) for _ in range(args.runs)]
+    readies = [measure_ready(args.database_url) for _ in range(args.runs)]
+
+    failed = False
+    for name, samples, budget in (
+        ("import app.main", imports, args.import_budget),
+        ("launch -> ready", readies, args.ready_budget),
+    ):
+        median = statistics.median(samples)
+        ok = median <= budget
+        failed |= not ok
+        print(f"  {name}: median={median:.2f}s max={max(samples):.2f}s budget={budget:.2f}s {'OK' if ok else 'OVER BUDGET'}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
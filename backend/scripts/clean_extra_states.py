@@ -7,8 +7,15 @@ import os
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import func
+
 from app.db.base import SessionLocal
-from app.db.models import State, District, MonthlyMetric
+from app.db.instrumentation import track_queries
+from app.db.models import State, District, MonthlyMetric, StateMonthlyRollup, DistrictRanking, DistrictLatestMetric
+from app.services.cache import district_tag, invalidate_cache
+from app.services.data_versions import bump_all_versions, bump_versions
+from app.services.rankings import ranking_tags, refresh_rankings
+from app.services.rollups import refresh_national_rollups
 
 def clean_extra_states():
     """Remove states that are not in the required 5"""
@@ -37,25 +44,59 @@ def clean_extra_states():
         for state in states_to_delete:
             print(f"  - {state.name} ({state.code})")
         
-        # Delete related data first
-        for state in states_to_delete:
-            # Delete monthly metrics
-            metrics_deleted = db.query(MonthlyMetric).filter(
-                MonthlyMetric.state_id == state.id
-            ).delete()
-            print(f"  Deleted {metrics_deleted} metrics for {state.name}")
-            
-            # Delete districts
-            districts_deleted = db.query(District).filter(
-                District.state_id == state.id
-            ).delete()
-            print(f"  Deleted {districts_deleted} districts for {state.name}")
-            
-            # Delete state
-            db.delete(state)
-            print(f"  Deleted state: {state.name}")
+        # Delete related data first, for all states at once
+        state_ids = [state.id for state in states_to_delete]
+        all_state_ids = [state.id for state in all_states]
+        district_ids = [
+            district_id for district_id, in
+            db.query(District.id).filter(District.state_id.in_(state_ids))
+        ]
+        # Clients holding ETags of the deleted districts must not get 304s
+        bump_versions(db, [district_tag(district_id) for district_id in district_ids])
+        pointers_deleted = db.query(DistrictLatestMetric).filter(
+            DistrictLatestMetric.state_id.in_(state_ids)
+        ).delete(synchronize_session=False)
+        print(f"  Deleted {pointers_deleted} latest-metric pointers")
+        
+        metrics_deleted = db.query(MonthlyMetric).filter(
+            MonthlyMetric.state_id.in_(state_ids)
+        ).delete(synchronize_session=False)
+        print(f"  Deleted {metrics_deleted} metrics")
+        
+        rollups_deleted = db.query(StateMonthlyRollup).filter(
+            StateMonthlyRollup.state_id.in_(state_ids)
+        ).delete(synchronize_session=False)
+        print(f"  Deleted {rollups_deleted} state rollups")
+        
+        rankings_deleted = db.query(DistrictRanking).filter(
+            DistrictRanking.state_id.in_(state_ids)
+        ).delete(synchronize_session=False)
+        print(f"  Deleted {rankings_deleted} district rankings")
+        
+        districts_deleted = db.query(District).filter(
+            District.state_id.in_(state_ids)
+        ).delete(synchronize_session=False)
+        print(f"  Deleted {districts_deleted} districts")
+        
+        states_deleted = db.query(State).filter(
+            State.id.in_(state_ids)
+        ).delete(synchronize_session=False)
+        print(f"  Deleted {states_deleted} states")
+        
+        db.commit()
         
+        # National totals and ranks no longer include the deleted states
+        refresh_national_rollups(db)
+        refresh_rankings(db)
+        bump_all_versions(db)
         db.commit()
+        invalidate_cache(
+            state_ids=state_ids,
+            district_ids=district_ids,
+            states=True,
+            rollup_state_ids=all_state_ids,
+            ranking_tags=ranking_tags(db),
+        )
         
         print("\n" + "=" * 60)
         print("✓ Cleanup completed successfully!")
@@ -63,10 +104,12 @@ def clean_extra_states():
         
         # Print summary
         remaining_states = db.query(State).all()
+        district_counts = dict(
+            db.query(District.state_id, func.count(District.id)).group_by(District.state_id).all()
+        )
         print(f"\nRemaining states: {len(remaining_states)}")
         for state in remaining_states:
-            district_count = db.query(District).filter(District.state_id == state.id).count()
-            print(f"  - {state.name} ({state.code}): {district_count} districts")
+            print(f"  - {state.name} ({state.code}): {district_counts.get(state.id, 0)} districts")
         
     except Exception as e:
         print(f"\n✗ Error during cleanup: {str(e)}")
@@ -76,4 +119,6 @@ def clean_extra_states():
         db.close()
 
 if __name__ == "__main__":
-    clean_extra_states()
+    with track_queries("clean_extra_states") as queries:
+        clean_extra_states()
+    print(f"\n{queries.count} statements, {queries.seconds:.2f}s in the database")
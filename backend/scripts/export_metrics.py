@@ -0,0 +1,63 @@
+"""
+Export monthly metrics with their district and state as CSV, NDJSON or
+Parquet, streamed from the database in chunks (the same output as
+/api/v1/export/metrics)
+"""
+import sys
+import os
+import argparse
+import gzip
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.base import SessionLocal
+from app.db.instrumentation import track_queries
+from app.services.export import (
+    EXPORT_CHUNK_ROWS, ENCODERS, export_query, format_available, iter_export, parse_period,
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export monthly metrics")
+    parser.add_argument("output", help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=sorted(ENCODERS), default="csv")
+    parser.add_argument("--state-id", type=int)
+    parser.add_argument("--district-ids", help="Comma-separated district IDs")
+    parser.add_argument("--start", type=parse_period, help="First month, YYYY-MM")
+    parser.add_argument("--end", type=parse_period, help="Last month, YYYY-MM")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS,
+                        help="Rows fetched and written per chunk")
+    args = parser.parse_args()
+    if not format_available(args.format):
+        parser.error(f"{args.format} export requires pyarrow")
+    district_ids = [int(id) for id in args.district_ids.split(",")] if args.district_ids else None
+
+    # Progress goes to stderr so stdout can carry the export
+    log = sys.stderr if args.output == "-" else sys.stdout
+    print("=" * 60, file=log)
+    print("Exporting Monthly Metrics", file=log)
+    print("=" * 60, file=log)
+
+    query = export_query(args.state_id, district_ids, args.start, args.end)
+    target = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    stream = gzip.GzipFile(fileobj=target, mode="wb") if args.gzip else target
+    started = time.perf_counter()
+    written = 0
+    try:
+        with track_queries("export_metrics") as queries, SessionLocal() as db:
+            for chunk in iter_export(db, query, args.format, args.chunk_rows):
+                stream.write(chunk)
+                written += len(chunk)
+    finally:
+        if stream is not target:
+            stream.close()
+        if target is not sys.stdout.buffer:
+            target.close()
+
+    print(f"\n✓ {written / 2**20:.1f} MiB of {args.format} in {time.perf_counter() - started:.1f}s", file=log)
+    print(f"  {queries.count} statements, {queries.seconds:.2f}s in the database", file=log)
+
+if __name__ == "__main__":
+    main()
@@ -9,17 +9,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.db.base import Base, engine
 from app.db.models import State, District, MonthlyMetric, APICache, DataSnapshot
+from app.db.migrations import upgrade_database
 
 def init_database():
-    """Create all database tables"""
+    """Create or migrate all database tables"""
     print("=" * 60)
     print("Initializing Database Tables")
     print("=" * 60)
     
     try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        print("✓ All tables created successfully!")
+        # Create tables on a fresh database, otherwise apply pending migrations
+        upgrade_database(engine)
+        print("✓ Database schema is up to date!")
         
         # List created tables
         print("\nCreated tables:")
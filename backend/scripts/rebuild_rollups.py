@@ -0,0 +1,47 @@
+"""
+Rebuild the state and national monthly rollups and the district rankings
+from monthly_metrics
+"""
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+
+from app.db.base import SessionLocal
+from app.db.instrumentation import track_queries
+from app.db.models import State
+from app.services.cache import NATIONAL_ROLLUP_TAG, invalidate_cache, state_rollup_tag
+from app.services.data_versions import bump_versions
+from app.services.rankings import ranking_tags, refresh_rankings
+from app.services.rollups import ROLLUP_WORKERS, rebuild_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the state / national rollups and district rankings")
+    parser.add_argument("--workers", type=int, default=ROLLUP_WORKERS,
+                        help="States aggregated in parallel")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("Rebuilding Monthly Rollups and Rankings")
+    print("=" * 60)
+    
+    with track_queries("rebuild_rollups") as queries, SessionLocal() as db:
+        summary = rebuild_rollups(args.workers)
+        ranked = refresh_rankings(db)
+        state_ids = db.execute(select(State.id)).scalars().all()
+        rank_tags = ranking_tags(db)
+        bump_versions(db, [NATIONAL_ROLLUP_TAG, *rank_tags, *(state_rollup_tag(state_id) for state_id in state_ids)])
+        db.commit()
+        invalidate_cache(rollup_state_ids=state_ids, ranking_tags=rank_tags)
+    
+    print(f"\n✓ Rollups: {summary['states']} states x {summary['periods']} months in {summary['seconds']:.2f}s")
+    print(f"  Rows written: {summary['written']}, unchanged: {summary['unchanged']}")
+    print(f"✓ Rankings: {ranked} district-months")
+    print(f"  {queries.count} statements, {queries.seconds:.2f}s in the database")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Check the district latest-metric pointers and is_latest flags against
+monthly_metrics, and rebuild them if they have drifted
+"""
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+
+from app.db.base import SessionLocal
+from app.db.instrumentation import track_queries
+from app.db.models import District
+from app.services.cache import district_tag, invalidate_cache
+from app.services.data_versions import bump_versions
+from app.services.latest_metrics import check_latest, repair_latest
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and repair the latest-metric pointers")
+    parser.add_argument("--check", action="store_true",
+                        help="Only report drift; exit with status 1 if any is found")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("Latest-Metric Pointers")
+    print("=" * 60)
+    
+    with track_queries("repair_latest") as queries, SessionLocal() as db:
+        drift = check_latest(db) if args.check else repair_latest(db)
+        if any(drift.values()) and not args.check:
+            # Cached latest metrics may have come from the drifted pointers
+            district_ids = db.execute(select(District.id)).scalars().all()
+            bump_versions(db, [district_tag(district_id) for district_id in district_ids])
+            db.commit()
+            invalidate_cache(district_ids=district_ids)
+    
+    print(f"\nDistricts without a pointer: {drift['missing']}")
+    print(f"Pointers to an older month:  {drift['stale']}")
+    print(f"Pointers without metrics:    {drift['orphaned']}")
+    print(f"Rows flagged wrongly:        {drift['flags']}")
+    print(f"  {queries.count} statements, {queries.seconds:.2f}s in the database")
+    
+    if not any(drift.values()):
+        print("\n✓ Pointers and flags are consistent")
+    elif args.check:
+        print("\n✗ Drift found; run without --check to repair")
+        sys.exit(1)
+    else:
+        print("\n✓ Pointers and flags rebuilt")
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,26 @@ Seed script to populate the database with sample MGNREGA data
 """
 import sys
 import os
+import argparse
+import math
+import time
 from datetime import datetime, timedelta
 import random
 
+import numpy as np
+from sqlalchemy import select
+
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.db.base import SessionLocal
-from app.db.models import State, District, MonthlyMetric
+from app.db.models import State, District, MonthlyMetric, period_key
+from app.db.upsert import UpsertResult, bulk_insert, bulk_upsert
+from app.services.cache import invalidate_cache
+from app.services.data_versions import bump_all_versions
+from app.services.latest_metrics import update_latest
+from app.services.rankings import ranking_tags, refresh_rankings
+from app.services.rollups import rebuild_rollups
 
 # Sample district data for multiple states
 DISTRICTS_BY_STATE = {
@@ -91,6 +103,7 @@ def seed_states(db):
             print(f"  Exists: {state_data['name']}")
     
     db.commit()
+    invalidate_cache(states=True)
     print(f"✓ States seeded: {len(states_data)}")
 
 def seed_districts(db):
@@ -98,6 +111,7 @@ def seed_districts(db):
     print("\nSeeding districts for all states...")
     
     total_districts = 0
+    changed_states = set()
     for state_code, districts_list in DISTRICTS_BY_STATE.items():
         state = db.query(State).filter(State.code == state_code).first()
         if not state:
@@ -122,10 +136,12 @@ def seed_districts(db):
                 db.add(district)
                 print(f"    Added: {district_data['name']}")
                 total_districts += 1
+                changed_states.add(state.id)
             else:
                 print(f"    Exists: {district_data['name']}")
     
     db.commit()
+    invalidate_cache(state_ids=changed_states)
     print(f"\n✓ Districts seeded: {total_districts} new districts")
 
 def generate_monthly_metrics(district_id, state_id, year, month):
@@ -169,6 +185,7 @@ def seed_monthly_metrics(db):
     months_to_generate = 12
     
     total_added = 0
+    changed_districts = set()
     for district in districts:
         for i in range(months_to_generate):
             date = current_date - timedelta(days=30 * i)
@@ -178,8 +195,7 @@ def seed_monthly_metrics(db):
             # Check if already exists
             existing = db.query(MonthlyMetric).filter(
                 MonthlyMetric.district_id == district.id,
-                MonthlyMetric.year == year,
-                MonthlyMetric.month == month
+                MonthlyMetric.period == period_key(year, month)
             ).first()
             
             if not existing:
@@ -196,12 +212,240 @@ def seed_monthly_metrics(db):
                 metric = MonthlyMetric(**metrics)
                 db.add(metric)
                 total_added += 1
+                changed_districts.add(district.id)
         
         print(f"  Added metrics for: {district.name}")
     
     db.commit()
+    invalidate_cache(district_ids=changed_districts)
     print(f"✓ Monthly metrics seeded: {total_added} records")
 
+# All states and union territories for the national generator:
+# (name, code, number of districts, (min lat, max lat, min lon, max lon))
+NATIONAL_STATES = [
+    ("Andhra Pradesh", "AP", 26, (12.6, 19.9, 76.7, 84.8)),
+    ("Arunachal Pradesh", "AR", 26, (26.6, 29.5, 91.5, 97.4)),
+    ("Assam", "AS", 35, (24.1, 28.0, 89.7, 96.1)),
+    ("Bihar", "BR", 38, (24.3, 27.5, 83.3, 88.3)),
+    ("Chhattisgarh", "CG", 33, (17.8, 24.1, 80.2, 84.4)),
+    ("Goa", "GA", 2, (14.9, 15.8, 73.7, 74.3)),
+    ("Gujarat", "GJ", 33, (20.1, 24.7, 68.2, 74.5)),
+    ("Haryana", "HR", 22, (27.7, 30.9, 74.5, 77.6)),
+    ("Himachal Pradesh", "HP", 12, (30.4, 33.2, 75.6, 79.0)),
+    ("Jharkhand", "JH", 24, (21.9, 25.3, 83.3, 87.9)),
+    ("Karnataka", "KA", 31, (11.6, 18.5, 74.0, 78.6)),
+    ("Kerala", "KL", 14, (8.2, 12.8, 74.9, 77.4)),
+    ("Madhya Pradesh", "MP", 55, (21.1, 26.9, 74.0, 82.8)),
+    ("Maharashtra", "MH", 36, (15.6, 22.0, 72.6, 80.9)),
+    ("Manipur", "MN", 16, (23.8, 25.7, 93.0, 94.8)),
+    ("Meghalaya", "ML", 12, (25.0, 26.1, 89.8, 92.8)),
+    ("Mizoram", "MZ", 11, (21.9, 24.5, 92.2, 93.4)),
+    ("Nagaland", "NL", 16, (25.2, 27.0, 93.3, 95.2)),
+    ("Odisha", "OD", 30, (17.8, 22.6, 81.4, 87.5)),
+    ("Punjab", "PB", 23, (29.5, 32.5, 73.9, 76.9)),
+    ("Rajasthan", "RJ", 50, (23.0, 30.2, 69.5, 78.3)),
+    ("Sikkim", "SK", 6, (27.1, 28.1, 88.0, 88.9)),
+    ("Tamil Nadu", "TN", 38, (8.1, 13.6, 76.2, 80.3)),
+    ("Telangana", "TG", 33, (15.8, 19.9, 77.2, 81.3)),
+    ("Tripura", "TR", 8, (22.9, 24.5, 91.2, 92.3)),
+    ("Uttar Pradesh", "UP", 75, (23.9, 30.4, 77.1, 84.6)),
+    ("Uttarakhand", "UK", 13, (28.7, 31.5, 77.6, 81.0)),
+    ("West Bengal", "WB", 23, (21.5, 27.2, 85.8, 89.9)),
+    ("Andaman and Nicobar Islands", "AN", 3, (6.7, 13.7, 92.2, 93.9)),
+    ("Chandigarh", "CH", 1, (30.67, 30.8, 76.7, 76.85)),
+    ("Dadra and Nagar Haveli and Daman and Diu", "DN", 3, (20.0, 20.8, 72.8, 73.2)),
+    ("Delhi", "DL", 11, (28.4, 28.9, 76.8, 77.35)),
+    ("Jammu and Kashmir", "JK", 20, (32.3, 34.7, 73.4, 76.8)),
+    ("Ladakh", "LA", 2, (32.3, 36.0, 75.3, 79.9)),
+    ("Lakshadweep", "LD", 1, (8.2, 12.3, 71.7, 74.0)),
+    ("Puducherry", "PY", 4, (10.8, 12.1, 79.6, 79.9)),
+]
+
+def district_grid(count, bbox, rng, boundaries=False, edge_vertices=8):
+    """
+    Lay `count` districts out as a grid of cells over a state's bounding
+    box: each gets a centroid jittered inside its cell and, optionally, the
+    cell as a GeoJSON polygon with `edge_vertices` points per side (cells
+    tile the box, so neighbouring boundaries share edges)
+    """
+    min_lat, max_lat, min_lon, max_lon = bbox
+    cols = max(1, round(math.sqrt(count * (max_lon - min_lon) / (max_lat - min_lat))))
+    rows = math.ceil(count / cols)
+    cell_lat = (max_lat - min_lat) / rows
+    cell_lon = (max_lon - min_lon) / cols
+
+    cells = []
+    for index in range(count):
+        row, col = divmod(index, cols)
+        south = min_lat + row * cell_lat
+        west = min_lon + col * cell_lon
+        cell = {
+            "lat": round(south + cell_lat * rng.uniform(0.25, 0.75), 4),
+            "lon": round(west + cell_lon * rng.uniform(0.25, 0.75), 4),
+            "boundary": None,
+        }
+        if boundaries:
+            north, east = south + cell_lat, west + cell_lon
+            steps = [i / edge_vertices for i in range(edge_vertices)]
+            ring = (
+                [[west + cell_lon * t, south] for t in steps]
+                + [[east, south + cell_lat * t] for t in steps]
+                + [[east - cell_lon * t, north] for t in steps]
+                + [[west, north - cell_lat * t] for t in steps]
+            )
+            ring.append(ring[0])
+            cell["boundary"] = {
+                "type": "Polygon",
+                "coordinates": [[[round(lon, 5), round(lat, 5)] for lon, lat in ring]],
+            }
+        cells.append(cell)
+    return cells
+
+def national_periods(years, end_year, end_month):
+    """(year, month) for `years` years of months ending at end_year / end_month, oldest first"""
+    last = end_year * 12 + end_month - 1
+    return [(index // 12, index % 12 + 1) for index in range(last - years * 12 + 1, last + 1)]
+
+def generate_metric_rows(rng, districts, periods):
+    """
+    MonthlyMetric rows for every district and period, vectorized with NumPy
+    but drawn from the same distributions as generate_monthly_metrics
+    """
+    n = len(districts) * len(periods)
+    district_ids = np.repeat([d["id"] for d in districts], len(periods))
+    state_ids = np.repeat([d["state_id"] for d in districts], len(periods))
+    years = np.tile([year for year, _ in periods], len(districts))
+    months = np.tile([month for _, month in periods], len(districts))
+
+    def share(base, low, high):
+        return (base * rng.uniform(low, high, n)).astype(np.int64)
+
+    households = rng.integers(5000, 15000, n, endpoint=True)
+    person_days = households * rng.integers(20, 40, n, endpoint=True)
+    funds = (person_days * rng.integers(250, 350, n, endpoint=True)).astype(np.float64)
+    columns = {
+        "district_id": district_ids,
+        "state_id": state_ids,
+        "year": years,
+        "month": months,
+        "period": years * 100 + months,
+        "total_households": households,
+        "sc_households": share(households, 0.15, 0.25),
+        "st_households": share(households, 0.05, 0.15),
+        "women_households": share(households, 0.40, 0.55),
+        "total_works": rng.integers(30, 80, n, endpoint=True),
+        "completed_works": rng.integers(15, 40, n, endpoint=True),
+        "in_progress_works": rng.integers(10, 30, n, endpoint=True),
+        "total_funds": funds,
+        "funds_utilized": funds * rng.uniform(0.70, 0.95, n),
+        "wage_expenditure": funds * rng.uniform(0.55, 0.70, n),
+        "material_expenditure": funds * rng.uniform(0.15, 0.30, n),
+        "total_person_days": person_days,
+        "sc_person_days": share(person_days, 0.15, 0.25),
+        "st_person_days": share(person_days, 0.05, 0.15),
+        "women_person_days": share(person_days, 0.40, 0.55),
+    }
+    latest = years * 100 + months == period_key(*periods[-1])
+    names = list(columns)
+    values = [columns[name].tolist() for name in names]
+    for row_values, is_latest in zip(zip(*values), latest.tolist()):
+        row = dict(zip(names, row_values))
+        row["is_latest"] = is_latest
+        row["source_url"] = "https://data.gov.in/mgnrega"
+        yield row
+
+def seed_national(db, seed=42, years=10, boundaries=False, end=None, batch_size=None):
+    """
+    Seed every state / UT with ~750 districts and `years` years of monthly
+    metrics. Deterministic for a given seed and end month (whatever ids the
+    rows get); a first load is bulk inserted and re-runs upsert, so they
+    rewrite nothing.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    layout_rng = random.Random(seed)
+    today = datetime.now()
+    end_year, end_month = end or (today.year, today.month)
+    periods = national_periods(years, end_year, end_month)
+    options = {"batch_size": batch_size} if batch_size else {}
+
+    print(f"Seeding national dataset (seed={seed}, {len(periods)} months to {end_year}-{end_month:02d})...")
+    bulk_upsert(
+        db, State,
+        [{"name": name, "code": code} for name, code, _, _ in NATIONAL_STATES],
+        conflict_columns=["code"],
+    )
+    state_ids = dict(db.execute(select(State.code, State.id)).all())
+
+    district_rows = []
+    for name, code, count, bbox in NATIONAL_STATES:
+        for number, cell in enumerate(district_grid(count, bbox, layout_rng, boundaries), start=1):
+            district_rows.append({
+                "name": f"{name} District {number}" if count > 1 else name,
+                "code": f"{code}{number:03d}",
+                "state_id": state_ids[code],
+                "centroid_lat": cell["lat"],
+                "centroid_lon": cell["lon"],
+                "boundary": cell["boundary"],
+            })
+    bulk_upsert(db, District, district_rows, conflict_columns=["state_id", "name"], **options)
+    district_ids = {
+        (state_id, name): district_id
+        for district_id, state_id, name in db.execute(select(District.id, District.state_id, District.name))
+    }
+    districts = [
+        {"id": district_ids[(row["state_id"], row["name"])], "state_id": row["state_id"]}
+        for row in district_rows
+    ]
+    print(f"  States: {len(state_ids)}, districts: {len(districts)} (boundaries: {'yes' if boundaries else 'no'})")
+
+    # A first load skips conflict handling entirely; re-runs upsert so
+    # nothing is duplicated. One state at a time keeps the rows out of memory
+    fresh = db.execute(select(MonthlyMetric.id).limit(1)).first() is None
+    result = UpsertResult()
+    for _, code, _, _ in NATIONAL_STATES:
+        state_districts = [d for d in districts if d["state_id"] == state_ids[code]]
+        metric_rows = generate_metric_rows(rng, state_districts, periods)
+        if fresh:
+            result.inserted += bulk_insert(db, MonthlyMetric, metric_rows, **options)
+        else:
+            result += bulk_upsert(
+                db, MonthlyMetric, metric_rows, conflict_columns=["district_id", "period"], **options
+            )
+
+    invalidate_cache(
+        state_ids=state_ids.values(),
+        district_ids=[d["id"] for d in districts],
+        states=True,
+    )
+    elapsed = time.perf_counter() - started
+    rows = result.inserted + result.updated + result.unchanged
+    print(
+        f"✓ Monthly metrics: {rows} rows ({result.inserted} inserted, {result.updated} updated, "
+        f"{result.unchanged} unchanged) in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)"
+    )
+    seed_aggregates(db)
+
+def seed_aggregates(db):
+    """
+    Point every district at its latest month and rebuild the state / national
+    rollups and district rankings from the seeded metrics
+    """
+    update_latest(db)
+    db.commit()
+    print("✓ Latest-metric pointers rebuilt")
+    summary = rebuild_rollups()
+    print(
+        f"✓ Rollups: {summary['states']} states x {summary['periods']} months "
+        f"({summary['written']} written) in {summary['seconds']:.1f}s"
+    )
+    started = time.perf_counter()
+    ranked = refresh_rankings(db)
+    print(f"✓ Rankings: {ranked} district-months in {time.perf_counter() - started:.1f}s")
+    bump_all_versions(db)
+    db.commit()
+    invalidate_cache(rollup_state_ids=db.execute(select(State.id)).scalars(), ranking_tags=ranking_tags(db))
+
 def main():
     """Main seeding function"""
     print("=" * 60)
@@ -213,6 +457,7 @@ def main():
         seed_states(db)
         seed_districts(db)
         seed_monthly_metrics(db)
+        seed_aggregates(db)
         
         print("\n" + "=" * 60)
         print("✓ Database seeding completed successfully!")
@@ -235,5 +480,28 @@ def main():
     finally:
         db.close()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed the MGNREGA database")
+    parser.add_argument("--national", action="store_true",
+                        help="Generate all states / UTs (~750 districts) instead of the 5-state sample")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for --national")
+    parser.add_argument("--years", type=int, default=10, help="Years of monthly metrics for --national")
+    parser.add_argument("--end", help="Last month for --national as YYYY-MM (default: current month)")
+    parser.add_argument("--boundaries", action="store_true", help="Also generate district boundary polygons")
+    parser.add_argument("--batch-size", type=int, help="Rows per upsert transaction")
+    return parser.parse_args()
+
+def national_main(args):
+    end = tuple(int(part) for part in args.end.split("-")) if args.end else None
+    db = SessionLocal()
+    try:
+        seed_national(db, args.seed, args.years, args.boundaries, end, args.batch_size)
+    finally:
+        db.close()
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.national:
+        national_main(args)
+    else:
+        main()
@@ -2,16 +2,8 @@
 # Railway startup script
 
 echo "=== MGNREGA Backend Startup ==="
-echo "Checking for database..."
-
-# Always initialize database (idempotent - creates tables if not exist)
-echo "Running database initialization..."
-python scripts/init_db.py
-
-# Check if database has data
-echo "Checking if database needs seeding..."
-python scripts/seed_data.py
-
+# Migrations and the initial seed run once inside the app's lifespan hook
+# (guarded by a lock, so several workers can start together); poll
+# /api/v1/ready rather than /api/v1/health to know when it has finished.
 echo "Starting FastAPI server..."
-# Start the server
-uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000}
+exec uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000}
@@ -1,7 +1,7 @@
 'use client';
 
 import { useState, useEffect } from 'react';
-import { useStates, useDistricts } from '@/hooks/useDistrict';
+import { useStates, useDistricts, useDistrictDashboard } from '@/hooks/useDistrict';
 import { useGeolocation } from '@/hooks/useGeolocation';
 import DistrictSelector from '@/components/DistrictSelector';
 import MetricsOverview from '@/components/MetricsOverview';
@@ -15,6 +15,8 @@ export default function HomePage() {
 
   const { data: states, isLoading: statesLoading } = useStates();
   const { data: districts, isLoading: districtsLoading } = useDistricts(selectedState);
+  // Latest metrics and history arrive together; the components below read them from the query cache
+  const { isLoading: dashboardLoading } = useDistrictDashboard(selectedDistrict, 1);
   const { detectedDistrict, loading: geoLoading, error: geoError, requestLocation } = useGeolocation();
 
   // Auto-select state and district when location is detected
@@ -127,7 +129,13 @@ export default function HomePage() {
         </section>
 
         {/* Metrics Display */}
-        {selectedDistrict && (
+        {selectedDistrict && dashboardLoading && (
+          <div className="flex justify-center items-center py-12">
+            <LoadingSpinner size="lg" />
+          </div>
+        )}
+
+        {selectedDistrict && !dashboardLoading && (
           <>
             <MetricsOverview districtId={selectedDistrict} />
             <HistoricalChart districtId={selectedDistrict} />
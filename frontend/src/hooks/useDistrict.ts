@@ -1,4 +1,4 @@
-import { useQuery, UseQueryResult } from '@tanstack/react-query';
+import { useQuery, useQueryClient, UseQueryResult } from '@tanstack/react-query';
 import { api } from '@/lib/api';
 
 export interface District {
@@ -46,6 +46,11 @@ export interface DistrictMetrics {
     st: number;
     women: number;
   };
+  rank: Record<string, {
+    value: number | null;
+    state: RankPosition;
+    national: RankPosition;
+  }> | null;
   metadata: {
     is_latest: boolean;
     source_url: string;
@@ -62,6 +67,29 @@ export interface HistoricalMetric {
   funds_utilized: number;
 }
 
+export interface RankPosition {
+  rank: number | null;
+  of: number;
+  percentile: number | null;
+}
+
+export interface PeerDistrict {
+  rank: number;
+  district_id: number;
+  district_name: string;
+  state_id: number;
+  value: number;
+  percentile: number | null;
+}
+
+export interface DistrictDashboard {
+  district?: District;
+  state?: State;
+  latest?: DistrictMetrics | null;
+  history?: HistoricalMetric[];
+  peers?: PeerDistrict[];
+}
+
 /**
  * Hook to fetch all states
  */
@@ -131,3 +159,32 @@ export const useSearchDistricts = (query: string): UseQueryResult<District[], Er
     staleTime: 5 * 60 * 1000, // 5 minutes
   });
 };
+
+/**
+ * Hook to fetch a district's dashboard bundle in one request. The latest
+ * metrics and history are also stored under the keys used by
+ * useDistrictMetrics / useDistrictHistory, so components using those hooks
+ * read them from the cache instead of fetching again.
+ */
+export const useDistrictDashboard = (
+  districtId: number | null,
+  years: number = 1,
+  peers: number = 0
+): UseQueryResult<DistrictDashboard, Error> => {
+  const queryClient = useQueryClient();
+  return useQuery({
+    queryKey: ['districtDashboard', districtId, years, peers],
+    queryFn: () => api.getDistrictDashboard(districtId!, years, peers),
+    enabled: !!districtId,
+    staleTime: 1 * 60 * 60 * 1000, // 1 hour
+    cacheTime: 24 * 60 * 60 * 1000, // 24 hours
+    onSuccess: (dashboard: DistrictDashboard) => {
+      if (dashboard.latest) {
+        queryClient.setQueryData(['districtMetrics', districtId, undefined, undefined], dashboard.latest);
+      }
+      if (dashboard.history) {
+        queryClient.setQueryData(['districtHistory', districtId, years], dashboard.history);
+      }
+    },
+  });
+};
@@ -73,9 +73,22 @@ export const api = {
   },
 
   // District history
-  getDistrictHistory: async (districtId: number, years: number = 2) => {
+  getDistrictHistory: async (
+    districtId: number,
+    years: number = 2,
+    granularity: 'month' | 'quarter' | 'fy' = 'month',
+    points?: number
+  ) => {
     const response = await apiClient.get(`/api/v1/metrics/district/${districtId}/history`, {
-      params: { years },
+      params: { years, granularity, points },
+    });
+    return response.data;
+  },
+
+  // District dashboard - district, state, latest metrics, history and peers in one request
+  getDistrictDashboard: async (districtId: number, years: number = 1, peers: number = 0, fields?: string[]) => {
+    const response = await apiClient.get(`/api/v1/dashboard/${districtId}`, {
+      params: { years, peers, fields: fields?.join(',') },
     });
     return response.data;
   },
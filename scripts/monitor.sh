@@ -51,6 +51,8 @@ docker-compose ps --format "table {{.Service}}\t{{.Status}}" 2>/dev/null || {
 echo ""
 echo "━━━ Service Health ━━━"
 check_service "Backend API      " "curl -f http://localhost:8000/api/v1/health"
+check_service "Backend Ready    " "curl -f http://localhost:8000/api/v1/ready"
+check_service "Backend Metrics  " "curl -f http://localhost:8000/metrics"
 check_service "Frontend         " "curl -f http://localhost:3000"
 check_service "PostgreSQL       " "docker-compose exec -T db pg_isready -U postgres"
 check_service "Redis            " "docker-compose exec -T redis redis-cli ping"
@@ -118,6 +120,7 @@ echo "━━━ Access URLs ━━━"
 echo -e "${BLUE}Frontend:${NC}  http://localhost:3000"
 echo -e "${BLUE}Backend:${NC}   http://localhost:8000"
 echo -e "${BLUE}API Docs:${NC}  http://localhost:8000/api/docs"
+echo -e "${BLUE}Metrics:${NC}   http://localhost:8000/metrics"
 
 # Last update
 echo ""